@@ -0,0 +1,28 @@
+-- Пакетная запись метрик виральности
+-- Принимает JSON-массив [{id, viral_score, engagement_rate, zscore, median_multiplier}]
+-- и обновляет все посты одним запросом. Возвращает id обновленных постов:
+-- id из запроса, которых нет в ответе, не найдены в таблице posts.
+
+CREATE OR REPLACE FUNCTION public.bulk_update_post_viral_metrics(updates JSONB)
+RETURNS TABLE (post_id TEXT)
+LANGUAGE sql
+AS $$
+    UPDATE public.posts p
+    SET viral_score = u.viral_score,
+        engagement_rate = u.engagement_rate,
+        zscore = u.zscore,
+        median_multiplier = u.median_multiplier,
+        last_viral_calculation = NOW(),
+        updated_at = NOW()
+    FROM jsonb_to_recordset(updates) AS u(
+        id TEXT,
+        viral_score NUMERIC,
+        engagement_rate NUMERIC,
+        zscore NUMERIC,
+        median_multiplier NUMERIC
+    )
+    WHERE p.id = u.id
+    RETURNING p.id;
+$$;
+
+GRANT EXECUTE ON FUNCTION public.bulk_update_post_viral_metrics(JSONB) TO anon, authenticated;
@@ -0,0 +1,12 @@
+-- Чекпоинт догрузки истории (backfill) для новых каналов
+-- backfill_offset_id - id самого старого уже сохраненного сообщения,
+-- после перезапуска догрузка продолжается с сообщений старше него.
+
+ALTER TABLE public.channels
+    ADD COLUMN IF NOT EXISTS backfill_status TEXT DEFAULT 'pending',
+    ADD COLUMN IF NOT EXISTS backfill_offset_id BIGINT,
+    ADD COLUMN IF NOT EXISTS backfill_updated_at TIMESTAMP WITH TIME ZONE,
+    ADD COLUMN IF NOT EXISTS backfill_completed_at TIMESTAMP WITH TIME ZONE;
+
+-- Статусы: pending, running, completed, failed
+CREATE INDEX IF NOT EXISTS idx_channels_backfill_status ON public.channels(backfill_status);
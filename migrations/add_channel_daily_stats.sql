@@ -0,0 +1,214 @@
+-- Дневные агрегаты по каналам для дашбордов
+-- channel_daily_stats - одна строка на (канал, день UTC). Строки пересчитываются
+-- триггерами уровня оператора только для затронутых дней, поэтому дашборды
+-- читают сотни строк вместо сканирования posts.
+-- Вирусным считается пост с viral_score >= 1.0 (порог детектора по умолчанию).
+
+CREATE TABLE IF NOT EXISTS public.channel_daily_stats (
+    channel_username TEXT NOT NULL,
+    day DATE NOT NULL,
+    posts_count INTEGER NOT NULL DEFAULT 0,
+    total_views BIGINT NOT NULL DEFAULT 0,
+    total_reactions BIGINT NOT NULL DEFAULT 0,
+    total_forwards BIGINT NOT NULL DEFAULT 0,
+    total_replies BIGINT NOT NULL DEFAULT 0,
+    avg_engagement_rate NUMERIC,
+    median_engagement_rate NUMERIC,
+    p90_engagement_rate NUMERIC,
+    max_viral_score NUMERIC,
+    viral_count INTEGER NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT TIMEZONE('utc'::text, NOW()) NOT NULL,
+    PRIMARY KEY (channel_username, day)
+);
+
+ALTER TABLE public.channel_daily_stats ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Authenticated users can view channel_daily_stats" ON channel_daily_stats
+    FOR SELECT TO authenticated USING (true);
+
+CREATE INDEX IF NOT EXISTS idx_channel_daily_stats_day ON public.channel_daily_stats(day);
+
+-- Пересчет дней: channel_usernames[i] и days[i] задают один день канала.
+-- Посты пишутся параллельными пачками, и соседние пачки канала попадают в
+-- один день, поэтому дни блокируются advisory-блокировками в фиксированном
+-- порядке: пересчеты одного дня идут по очереди, и следующий видит строки
+-- предыдущего. Строки обновляются через ON CONFLICT, а не DELETE + INSERT
+CREATE OR REPLACE FUNCTION public.refresh_channel_daily_stats(channel_usernames TEXT[], days DATE[])
+RETURNS VOID
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+BEGIN
+    PERFORM pg_advisory_xact_lock(hashtext(b.channel_username), b.day - DATE '2000-01-01')
+    FROM (
+        SELECT DISTINCT * FROM unnest(channel_usernames, days) AS u(channel_username, day)
+        ORDER BY 1, 2
+    ) b;
+
+    INSERT INTO channel_daily_stats (
+        channel_username, day, posts_count, total_views, total_reactions, total_forwards,
+        total_replies, avg_engagement_rate, median_engagement_rate, p90_engagement_rate,
+        max_viral_score, viral_count, updated_at
+    )
+    SELECT b.channel_username, b.day, COUNT(*),
+           COALESCE(SUM(p.views), 0), COALESCE(SUM(p.reactions), 0),
+           COALESCE(SUM(p.forwards), 0), COALESCE(SUM(p.replies), 0),
+           AVG(p.engagement_rate),
+           percentile_cont(0.5) WITHIN GROUP (ORDER BY p.engagement_rate),
+           percentile_cont(0.9) WITHIN GROUP (ORDER BY p.engagement_rate),
+           MAX(p.viral_score),
+           COUNT(*) FILTER (WHERE p.viral_score >= 1.0),
+           NOW()
+    FROM (SELECT DISTINCT * FROM unnest(channel_usernames, days) AS u(channel_username, day)) b
+    JOIN posts p
+      ON p.channel_username = b.channel_username
+     AND p.date >= (b.day::timestamp AT TIME ZONE 'UTC')
+     AND p.date < ((b.day + 1)::timestamp AT TIME ZONE 'UTC')
+    GROUP BY b.channel_username, b.day
+    ON CONFLICT (channel_username, day) DO UPDATE SET
+        posts_count = EXCLUDED.posts_count,
+        total_views = EXCLUDED.total_views,
+        total_reactions = EXCLUDED.total_reactions,
+        total_forwards = EXCLUDED.total_forwards,
+        total_replies = EXCLUDED.total_replies,
+        avg_engagement_rate = EXCLUDED.avg_engagement_rate,
+        median_engagement_rate = EXCLUDED.median_engagement_rate,
+        p90_engagement_rate = EXCLUDED.p90_engagement_rate,
+        max_viral_score = EXCLUDED.max_viral_score,
+        viral_count = EXCLUDED.viral_count,
+        updated_at = EXCLUDED.updated_at;
+
+    -- Дни, в которых не осталось постов
+    DELETE FROM channel_daily_stats s
+    USING unnest(channel_usernames, days) AS b(channel_username, day)
+    WHERE s.channel_username = b.channel_username AND s.day = b.day
+      AND NOT EXISTS (
+          SELECT 1 FROM posts p
+          WHERE p.channel_username = b.channel_username
+            AND p.date >= (b.day::timestamp AT TIME ZONE 'UTC')
+            AND p.date < ((b.day + 1)::timestamp AT TIME ZONE 'UTC')
+      );
+END;
+$$;
+
+-- Дневной ряд по всем каналам: суммы за день, средний engagement
+-- взвешивается по количеству постов (агрегация в БД, без лимита строк API)
+CREATE OR REPLACE FUNCTION public.get_daily_stats_totals(p_date_from DATE, p_date_to DATE)
+RETURNS TABLE (
+    day DATE,
+    channels BIGINT,
+    posts_count BIGINT,
+    total_views BIGINT,
+    total_reactions BIGINT,
+    total_forwards BIGINT,
+    total_replies BIGINT,
+    viral_count BIGINT,
+    max_viral_score NUMERIC,
+    avg_engagement_rate NUMERIC
+)
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT s.day,
+           COUNT(*),
+           SUM(s.posts_count),
+           SUM(s.total_views),
+           SUM(s.total_reactions),
+           SUM(s.total_forwards),
+           SUM(s.total_replies),
+           SUM(s.viral_count),
+           MAX(s.max_viral_score),
+           SUM(s.avg_engagement_rate * s.posts_count)
+               / NULLIF(SUM(s.posts_count) FILTER (WHERE s.avg_engagement_rate IS NOT NULL), 0)
+    FROM public.channel_daily_stats s
+    WHERE s.day >= p_date_from AND s.day <= p_date_to
+    GROUP BY s.day
+    ORDER BY s.day;
+$$;
+
+-- Итоги одного канала по дневным агрегатам (одна строка вместо суммирования
+-- всех дней на клиенте)
+CREATE OR REPLACE FUNCTION public.get_channel_stats_totals(p_channel_username TEXT)
+RETURNS TABLE (
+    total_posts BIGINT,
+    total_views BIGINT,
+    total_reactions BIGINT,
+    total_forwards BIGINT
+)
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT COALESCE(SUM(s.posts_count), 0),
+           COALESCE(SUM(s.total_views), 0),
+           COALESCE(SUM(s.total_reactions), 0),
+           COALESCE(SUM(s.total_forwards), 0)
+    FROM public.channel_daily_stats s
+    WHERE s.channel_username = p_channel_username;
+$$;
+
+CREATE OR REPLACE FUNCTION public.channel_daily_stats_apply()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+    v_channels TEXT[];
+    v_days DATE[];
+BEGIN
+    IF TG_OP = 'TRUNCATE' THEN
+        DELETE FROM channel_daily_stats;
+        RETURN NULL;
+    ELSIF TG_OP = 'INSERT' THEN
+        SELECT array_agg(channel_username), array_agg(day) INTO v_channels, v_days
+        FROM (SELECT DISTINCT channel_username, (date AT TIME ZONE 'UTC')::date AS day FROM new_rows) b;
+    ELSIF TG_OP = 'DELETE' THEN
+        SELECT array_agg(channel_username), array_agg(day) INTO v_channels, v_days
+        FROM (SELECT DISTINCT channel_username, (date AT TIME ZONE 'UTC')::date AS day FROM old_rows) b;
+    ELSE
+        SELECT array_agg(channel_username), array_agg(day) INTO v_channels, v_days
+        FROM (
+            SELECT channel_username, (date AT TIME ZONE 'UTC')::date AS day FROM new_rows
+            UNION
+            SELECT channel_username, (date AT TIME ZONE 'UTC')::date AS day FROM old_rows
+        ) b;
+    END IF;
+
+    IF v_channels IS NOT NULL THEN
+        PERFORM refresh_channel_daily_stats(v_channels, v_days);
+    END IF;
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS channel_daily_stats_insert ON public.posts;
+CREATE TRIGGER channel_daily_stats_insert
+    AFTER INSERT ON public.posts
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION public.channel_daily_stats_apply();
+
+DROP TRIGGER IF EXISTS channel_daily_stats_update ON public.posts;
+CREATE TRIGGER channel_daily_stats_update
+    AFTER UPDATE ON public.posts
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION public.channel_daily_stats_apply();
+
+DROP TRIGGER IF EXISTS channel_daily_stats_delete ON public.posts;
+CREATE TRIGGER channel_daily_stats_delete
+    AFTER DELETE ON public.posts
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION public.channel_daily_stats_apply();
+
+DROP TRIGGER IF EXISTS channel_daily_stats_truncate ON public.posts;
+CREATE TRIGGER channel_daily_stats_truncate
+    AFTER TRUNCATE ON public.posts
+    FOR EACH STATEMENT EXECUTE FUNCTION public.channel_daily_stats_apply();
+
+-- Начальное заполнение по существующим постам
+SELECT public.refresh_channel_daily_stats(array_agg(channel_username), array_agg(day))
+FROM (SELECT DISTINCT channel_username, (date AT TIME ZONE 'UTC')::date AS day FROM public.posts) b;
+
+GRANT SELECT ON public.channel_daily_stats TO anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.get_daily_stats_totals(DATE, DATE) TO anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.get_channel_stats_totals(TEXT) TO anon, authenticated;
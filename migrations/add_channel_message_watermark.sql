@@ -0,0 +1,17 @@
+-- Watermark для инкрементального парсинга каналов
+-- last_message_id - максимальный message_id, уже сохраненный для канала.
+-- Парсер запрашивает у Telegram только сообщения новее этого значения.
+
+ALTER TABLE public.channels
+    ADD COLUMN IF NOT EXISTS last_message_id BIGINT;
+
+-- Заполняем watermark для уже спарсенных каналов
+UPDATE public.channels c
+SET last_message_id = p.max_message_id
+FROM (
+    SELECT channel_username, MAX(message_id) AS max_message_id
+    FROM public.posts
+    GROUP BY channel_username
+) p
+WHERE c.username = p.channel_username
+  AND c.last_message_id IS NULL;
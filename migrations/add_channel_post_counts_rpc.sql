@@ -0,0 +1,16 @@
+-- Количество постов по каналам одним запросом
+-- Используется списком базовых метрик каналов вместо count-запроса на каждый канал.
+-- channel_usernames = NULL - по всем каналам.
+
+CREATE OR REPLACE FUNCTION public.count_posts_by_channel(channel_usernames TEXT[] DEFAULT NULL)
+RETURNS TABLE (channel_username TEXT, posts_count BIGINT)
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT p.channel_username, COUNT(*) AS posts_count
+    FROM public.posts p
+    WHERE channel_usernames IS NULL OR p.channel_username = ANY(channel_usernames)
+    GROUP BY p.channel_username;
+$$;
+
+GRANT EXECUTE ON FUNCTION public.count_posts_by_channel(TEXT[]) TO anon, authenticated;
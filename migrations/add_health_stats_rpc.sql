@@ -0,0 +1,27 @@
+-- Агрегаты анализа для виджета состояния системы (/api/stats/health)
+-- Одна функция вместо выгрузки post_analysis и token_usage: количество
+-- LLM-запросов, среднее время обработки и доля неудачных анализов с момента p_since.
+
+CREATE INDEX IF NOT EXISTS idx_post_analysis_created_at ON public.post_analysis(created_at);
+CREATE INDEX IF NOT EXISTS idx_token_usage_created_at ON public.token_usage(created_at);
+
+CREATE OR REPLACE FUNCTION public.get_analysis_health_stats(p_since TIMESTAMP WITH TIME ZONE)
+RETURNS TABLE (
+    llm_requests BIGINT,
+    analyses_count BIGINT,
+    failed_count BIGINT,
+    avg_processing_time NUMERIC
+)
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT
+        (SELECT COUNT(*) FROM public.token_usage t WHERE t.created_at >= p_since),
+        COUNT(*),
+        COUNT(*) FILTER (WHERE a.status = 'failed'),
+        AVG(a.processing_time_seconds)
+    FROM public.post_analysis a
+    WHERE a.created_at >= p_since;
+$$;
+
+GRANT EXECUTE ON FUNCTION public.get_analysis_health_stats(TIMESTAMP WITH TIME ZONE) TO anon, authenticated;
@@ -0,0 +1,9 @@
+-- Индексы для keyset-пагинации списка постов
+-- GET /api/posts сортирует по (поле сортировки, id) и продолжает выборку с курсора,
+-- поэтому каждой странице нужен индекс по той же паре колонок.
+
+CREATE INDEX IF NOT EXISTS idx_posts_date_id ON public.posts(date, id);
+CREATE INDEX IF NOT EXISTS idx_posts_viral_score_id ON public.posts(viral_score, id);
+CREATE INDEX IF NOT EXISTS idx_posts_views_id ON public.posts(views, id);
+CREATE INDEX IF NOT EXISTS idx_posts_engagement_rate_id ON public.posts(engagement_rate, id);
+CREATE INDEX IF NOT EXISTS idx_posts_channel_date_id ON public.posts(channel_username, date, id);
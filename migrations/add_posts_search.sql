@@ -0,0 +1,94 @@
+-- Полнотекстовый поиск по постам
+-- search_vector - tsvector по названию канала и тексту поста (русская и английская
+-- конфигурации). GIN-индекс по нему обслуживает search_posts, а также фильтр
+-- search_term в списке постов и в get_posts_stats (вместо ILIKE '%...%').
+
+ALTER TABLE public.posts ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('russian'::regconfig, COALESCE(channel_title, '')), 'A') ||
+        setweight(to_tsvector('russian'::regconfig, COALESCE(full_text, text_preview, '')), 'B') ||
+        setweight(to_tsvector('english'::regconfig, COALESCE(full_text, text_preview, '')), 'C')
+    ) STORED;
+
+CREATE INDEX IF NOT EXISTS idx_posts_search_vector ON public.posts USING GIN (search_vector);
+
+-- Поиск с ранжированием и фрагментами текста
+-- search_query - строка в синтаксисе веб-поиска ("точная фраза", -исключение, or)
+CREATE OR REPLACE FUNCTION public.search_posts(
+    search_query TEXT,
+    p_channel_username TEXT DEFAULT NULL,
+    p_limit INTEGER DEFAULT 20,
+    p_offset INTEGER DEFAULT 0
+)
+RETURNS TABLE (
+    id TEXT,
+    message_id BIGINT,
+    channel_username TEXT,
+    channel_title TEXT,
+    date TIMESTAMP WITH TIME ZONE,
+    text_preview TEXT,
+    permalink TEXT,
+    views INTEGER,
+    forwards INTEGER,
+    reactions INTEGER,
+    viral_score NUMERIC,
+    rank REAL,
+    snippet TEXT
+)
+LANGUAGE sql
+STABLE
+AS $$
+    WITH q AS (
+        SELECT websearch_to_tsquery('russian'::regconfig, search_query) ||
+               websearch_to_tsquery('english'::regconfig, search_query) AS ts
+    ),
+    matches AS (
+        SELECT p.*, ts_rank_cd(p.search_vector, q.ts) AS rank, q.ts
+        FROM public.posts p, q
+        WHERE p.search_vector @@ q.ts
+          AND (p_channel_username IS NULL OR p.channel_username = p_channel_username)
+        ORDER BY rank DESC, p.date DESC
+        LIMIT p_limit OFFSET p_offset
+    )
+    -- ts_headline считается только для строк страницы
+    SELECT m.id, m.message_id, m.channel_username, m.channel_title, m.date,
+           m.text_preview, m.permalink, m.views, m.forwards, m.reactions, m.viral_score,
+           m.rank,
+           ts_headline(
+               'russian'::regconfig, COALESCE(m.full_text, m.text_preview, ''), m.ts,
+               'StartSel=<mark>, StopSel=</mark>, MaxWords=35, MinWords=15, MaxFragments=2'
+           ) AS snippet
+    FROM matches m
+    ORDER BY m.rank DESC, m.date DESC;
+$$;
+
+-- Суммы по фильтрам списка постов: search_term ищется по search_vector
+CREATE OR REPLACE FUNCTION public.get_posts_stats(
+    p_channel_username TEXT DEFAULT NULL,
+    p_date_from TIMESTAMP WITH TIME ZONE DEFAULT NULL,
+    p_date_to TIMESTAMP WITH TIME ZONE DEFAULT NULL,
+    p_min_views INTEGER DEFAULT NULL,
+    p_min_engagement NUMERIC DEFAULT NULL,
+    p_search_term TEXT DEFAULT NULL
+)
+RETURNS TABLE (total_posts BIGINT, total_views BIGINT, total_reactions BIGINT, total_forwards BIGINT)
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT COUNT(*), COALESCE(SUM(p.views), 0), COALESCE(SUM(p.reactions), 0), COALESCE(SUM(p.forwards), 0)
+    FROM public.posts p
+    WHERE (p_channel_username IS NULL OR p.channel_username = p_channel_username)
+      AND (p_date_from IS NULL OR p.date >= p_date_from)
+      AND (p_date_to IS NULL OR p.date <= p_date_to)
+      AND (p_min_views IS NULL OR p.views >= p_min_views)
+      AND (p_min_engagement IS NULL OR p.engagement_rate >= p_min_engagement)
+      AND (
+          p_search_term IS NULL
+          OR p.search_vector @@ (
+              websearch_to_tsquery('russian'::regconfig, p_search_term) ||
+              websearch_to_tsquery('english'::regconfig, p_search_term)
+          )
+      );
+$$;
+
+GRANT EXECUTE ON FUNCTION public.search_posts(TEXT, TEXT, INTEGER, INTEGER) TO anon, authenticated;
@@ -0,0 +1,142 @@
+-- Агрегаты для GET /api/posts/stats на стороне БД
+-- posts_totals - итоги по всей таблице posts, поддерживаются триггерами уровня
+-- оператора (одно обновление на INSERT/UPDATE/DELETE, а не на каждую строку).
+-- get_posts_stats - суммы по тем же фильтрам, что и список постов.
+
+CREATE TABLE IF NOT EXISTS public.posts_totals (
+    id BOOLEAN PRIMARY KEY DEFAULT true CHECK (id),
+    total_posts BIGINT NOT NULL DEFAULT 0,
+    total_views BIGINT NOT NULL DEFAULT 0,
+    total_reactions BIGINT NOT NULL DEFAULT 0,
+    total_forwards BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT TIMEZONE('utc'::text, NOW()) NOT NULL
+);
+
+ALTER TABLE public.posts_totals ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Authenticated users can view posts_totals" ON posts_totals
+    FOR SELECT TO authenticated USING (true);
+
+-- Начальные итоги по существующим постам
+INSERT INTO public.posts_totals (id, total_posts, total_views, total_reactions, total_forwards)
+SELECT true, COUNT(*), COALESCE(SUM(views), 0), COALESCE(SUM(reactions), 0), COALESCE(SUM(forwards), 0)
+FROM public.posts
+ON CONFLICT (id) DO UPDATE
+SET total_posts = EXCLUDED.total_posts,
+    total_views = EXCLUDED.total_views,
+    total_reactions = EXCLUDED.total_reactions,
+    total_forwards = EXCLUDED.total_forwards,
+    updated_at = NOW();
+
+CREATE OR REPLACE FUNCTION public.posts_totals_apply()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+BEGIN
+    IF TG_OP = 'TRUNCATE' THEN
+        UPDATE posts_totals
+        SET total_posts = 0, total_views = 0, total_reactions = 0, total_forwards = 0,
+            updated_at = NOW();
+    ELSIF TG_OP = 'INSERT' THEN
+        UPDATE posts_totals t
+        SET total_posts = t.total_posts + d.posts,
+            total_views = t.total_views + d.views,
+            total_reactions = t.total_reactions + d.reactions,
+            total_forwards = t.total_forwards + d.forwards,
+            updated_at = NOW()
+        FROM (
+            SELECT COUNT(*) AS posts, COALESCE(SUM(views), 0) AS views,
+                   COALESCE(SUM(reactions), 0) AS reactions, COALESCE(SUM(forwards), 0) AS forwards
+            FROM new_rows
+        ) d
+        WHERE d.posts > 0;
+    ELSIF TG_OP = 'DELETE' THEN
+        UPDATE posts_totals t
+        SET total_posts = t.total_posts - d.posts,
+            total_views = t.total_views - d.views,
+            total_reactions = t.total_reactions - d.reactions,
+            total_forwards = t.total_forwards - d.forwards,
+            updated_at = NOW()
+        FROM (
+            SELECT COUNT(*) AS posts, COALESCE(SUM(views), 0) AS views,
+                   COALESCE(SUM(reactions), 0) AS reactions, COALESCE(SUM(forwards), 0) AS forwards
+            FROM old_rows
+        ) d
+        WHERE d.posts > 0;
+    ELSIF TG_OP = 'UPDATE' THEN
+        UPDATE posts_totals t
+        SET total_views = t.total_views + d.views,
+            total_reactions = t.total_reactions + d.reactions,
+            total_forwards = t.total_forwards + d.forwards,
+            updated_at = NOW()
+        FROM (
+            SELECT COALESCE(n.views, 0) - COALESCE(o.views, 0) AS views,
+                   COALESCE(n.reactions, 0) - COALESCE(o.reactions, 0) AS reactions,
+                   COALESCE(n.forwards, 0) - COALESCE(o.forwards, 0) AS forwards
+            FROM (SELECT SUM(views) AS views, SUM(reactions) AS reactions, SUM(forwards) AS forwards
+                  FROM new_rows) n,
+                 (SELECT SUM(views) AS views, SUM(reactions) AS reactions, SUM(forwards) AS forwards
+                  FROM old_rows) o
+        ) d
+        WHERE d.views <> 0 OR d.reactions <> 0 OR d.forwards <> 0;
+    END IF;
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS posts_totals_insert ON public.posts;
+CREATE TRIGGER posts_totals_insert
+    AFTER INSERT ON public.posts
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION public.posts_totals_apply();
+
+DROP TRIGGER IF EXISTS posts_totals_update ON public.posts;
+CREATE TRIGGER posts_totals_update
+    AFTER UPDATE ON public.posts
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION public.posts_totals_apply();
+
+DROP TRIGGER IF EXISTS posts_totals_delete ON public.posts;
+CREATE TRIGGER posts_totals_delete
+    AFTER DELETE ON public.posts
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION public.posts_totals_apply();
+
+DROP TRIGGER IF EXISTS posts_totals_truncate ON public.posts;
+CREATE TRIGGER posts_totals_truncate
+    AFTER TRUNCATE ON public.posts
+    FOR EACH STATEMENT EXECUTE FUNCTION public.posts_totals_apply();
+
+-- Суммы по фильтрам списка постов (NULL - фильтр не задан)
+CREATE OR REPLACE FUNCTION public.get_posts_stats(
+    p_channel_username TEXT DEFAULT NULL,
+    p_date_from TIMESTAMP WITH TIME ZONE DEFAULT NULL,
+    p_date_to TIMESTAMP WITH TIME ZONE DEFAULT NULL,
+    p_min_views INTEGER DEFAULT NULL,
+    p_min_engagement NUMERIC DEFAULT NULL,
+    p_search_term TEXT DEFAULT NULL
+)
+RETURNS TABLE (total_posts BIGINT, total_views BIGINT, total_reactions BIGINT, total_forwards BIGINT)
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT COUNT(*), COALESCE(SUM(p.views), 0), COALESCE(SUM(p.reactions), 0), COALESCE(SUM(p.forwards), 0)
+    FROM public.posts p
+    WHERE (p_channel_username IS NULL OR p.channel_username = p_channel_username)
+      AND (p_date_from IS NULL OR p.date >= p_date_from)
+      AND (p_date_to IS NULL OR p.date <= p_date_to)
+      AND (p_min_views IS NULL OR p.views >= p_min_views)
+      AND (p_min_engagement IS NULL OR p.engagement_rate >= p_min_engagement)
+      AND (
+          p_search_term IS NULL
+          OR p.full_text ILIKE '%' || p_search_term || '%'
+          OR p.text_preview ILIKE '%' || p_search_term || '%'
+          OR p.channel_title ILIKE '%' || p_search_term || '%'
+          OR p.channel_username ILIKE '%' || p_search_term || '%'
+      );
+$$;
+
+GRANT SELECT ON public.posts_totals TO anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.get_posts_stats(TEXT, TIMESTAMP WITH TIME ZONE, TIMESTAMP WITH TIME ZONE, INTEGER, NUMERIC, TEXT) TO anon, authenticated;
@@ -8,7 +8,7 @@ import logging
 import os
 import jwt
 from datetime import datetime, timedelta
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
 from fastapi import BackgroundTasks, FastAPI, HTTPException, Request, Depends, Header
 from fastapi.middleware.cors import CORSMiddleware
@@ -23,6 +23,10 @@ logger = logging.getLogger(__name__)
 from src.app.llm.orchestrator import LLMOrchestrator
 from src.app.prompts import prompt_manager
 from src.app.settings import settings
+from src.app.async_db import AsyncSupabaseClient
+from src.app.cache import TTLCache
+from src.app.pagination import apply_keyset, encode_cursor
+from src.app.stats_service import StatsService
 from src.app.supabase_client import SupabaseManager
 from src.app.telegram_client import TelegramAnalyzer
 from src.app.telegram_bot import TelegramBotService
@@ -180,10 +184,26 @@ telegram_analyzer = None
 telegram_available = False
 telegram_authorization_needed = False
 
+# Пул сессий для парсинга (создается, если в TELEGRAM_SESSIONS больше одной сессии)
+telegram_pool = None
+
+# Догрузка истории новых каналов и ее фоновые задачи
+channel_backfill = None
+backfill_tasks = set()
+
+# Планировщик парсинга по parse_frequency_hours
+parse_scheduler = None
+
+# Прогресс массового парсинга по сессиям: session_id -> состояние каналов.
+# Завершенные сессии переносятся в кэш и через час удаляются
+bulk_parsing_progress: Dict[int, Dict[str, Any]] = {}
+finished_bulk_progress = TTLCache(ttl_seconds=3600, max_size=100)
+
 
 async def init_telegram():
     """Асинхронная инициализация Telegram клиента."""
     global telegram_analyzer, telegram_available, telegram_authorization_needed
+    global telegram_pool
 
     try:
         telegram_analyzer = TelegramAnalyzer()
@@ -199,6 +219,12 @@ async def init_telegram():
         telegram_available = True
         telegram_authorization_needed = False
         logger.info("TelegramAnalyzer успешно инициализирован и подключен")
+
+        if len(settings.telegram_sessions) > 1:
+            from src.app.session_pool import TelegramSessionPool
+
+            telegram_pool = TelegramSessionPool(primary_analyzer=telegram_analyzer)
+            await telegram_pool.connect()
     except ValueError as e:
         logger.warning(f"Не настроены API ключи Telegram: {e}")
         telegram_analyzer = None
@@ -209,8 +235,67 @@ async def init_telegram():
         telegram_available = False
 
 
+def get_channel_backfill():
+    """Общий экземпляр догрузки истории каналов."""
+    global channel_backfill
+
+    if channel_backfill is None:
+        from src.app.backfill import ChannelBackfill
+
+        channel_backfill = ChannelBackfill(telegram_analyzer, supabase_manager)
+    return channel_backfill
+
+
+def start_channel_backfill(channel_username: str) -> None:
+    """Запускает догрузку истории канала фоновой задачей, если она еще не идет."""
+    backfill = get_channel_backfill()
+    if backfill.is_running(channel_username):
+        return
+
+    task = asyncio.create_task(backfill.backfill_channel(channel_username))
+    # Держим ссылку на задачу, пока она выполняется
+    backfill_tasks.add(task)
+    task.add_done_callback(backfill_tasks.discard)
+
+
+async def scheduled_parse_channel(channel_username: str) -> Tuple[int, str]:
+    """Плановый парсинг канала: новые посты после watermark с сохранением в БД."""
+    telegram_connected = False
+    if telegram_available and telegram_analyzer:
+        await telegram_analyzer.connect()
+        telegram_connected = telegram_analyzer.is_connected
+
+    return await parse_bulk_channel(
+        channel_username,
+        settings.parse_scheduler_days_back,
+        settings.parse_scheduler_max_posts,
+        True,
+        telegram_connected,
+        True,
+    )
+
+
+def get_parse_scheduler():
+    """Общий экземпляр планировщика парсинга."""
+    global parse_scheduler
+
+    if parse_scheduler is None:
+        from src.app.parse_scheduler import ParseScheduler
+
+        parse_scheduler = ParseScheduler(supabase_manager, scheduled_parse_channel)
+    return parse_scheduler
+
+
+def get_parsing_client():
+    """Клиент для парсинга каналов: пул сессий, если настроен, иначе основной клиент."""
+    return telegram_pool or telegram_analyzer
+
+
 # Инициализация будет выполнена в startup event
 supabase_manager = SupabaseManager()
+# Асинхронный доступ к БД: запросы выполняются в пуле потоков, не блокируя event loop
+async_db = AsyncSupabaseClient(supabase_manager)
+stats_service = StatsService(supabase_manager)
 report_generator = ReportGenerator(supabase_manager)
 
 
@@ -223,9 +308,26 @@ async def startup_event():
     # Инициализируем Telegram асинхронно
     await init_telegram()
 
+    # Фоновая проверка соединения с БД вместо проверочного запроса на каждый вызов
+    supabase_manager.start_health_monitor()
+
+    # Прогреваем фильтр обработанных постов для проверки дубликатов
+    await asyncio.to_thread(supabase_manager.warm_processed_filter)
+
+    if settings.parse_scheduler_enabled and telegram_available:
+        get_parse_scheduler().start()
+
     logger.info("✅ API сервер готов к работе")
 
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Остановка фоновых задач при завершении сервера."""
+    if parse_scheduler:
+        await parse_scheduler.stop()
+    supabase_manager.stop_health_monitor()
+
+
 # Pydantic модели для запросов/ответов
 class PostData(BaseModel):
     message_id: str
@@ -256,6 +358,8 @@ class ParsingRequest(BaseModel):
     channel_username: str
     days_back: int = 7
     max_posts: int = 100
+    save_to_db: bool = True
+    incremental: bool = True
 
 
 class ViralReportRequest(BaseModel):
@@ -277,6 +381,18 @@ class BulkParsingRequest(BaseModel):
     days_back: int = 7
     max_posts: int = 100
     save_to_db: bool = True
+    incremental: bool = True
+
+
+class BackfillRequest(BaseModel):
+    channels: List[str]
+    history_days: Optional[int] = None
+    force: bool = False
+
+
+class MetricsRefreshRequest(BaseModel):
+    days_back: int = 7
+    channels: Optional[List[str]] = None
 
 
 class ParsingResponse(BaseModel):
@@ -303,6 +419,7 @@ class HealthResponse(BaseModel):
     llm_status: Dict[str, bool]
     telegram_status: str = "unknown"
     telegram_authorization_needed: bool = False
+    database_status: Optional[Dict[str, Any]] = None
 
 
 # Эндпоинты
@@ -351,9 +468,32 @@ async def health_check():
         llm_status=orchestrator.get_processor_status(),
         telegram_status=telegram_status,
         telegram_authorization_needed=telegram_authorization_needed,
+        database_status=supabase_manager.get_health_status(),
     )
 
 
+@app.get("/api/telegram/rate-limits", tags=["telegram"])
+async def get_telegram_rate_limits():
+    """Активные паузы FloodWait и статистика ожидания запросов к Telegram."""
+    if not telegram_analyzer:
+        raise HTTPException(status_code=503, detail="Telegram клиент недоступен")
+
+    return telegram_analyzer.request_governor.get_status()
+
+
+@app.get("/api/telegram/sessions", tags=["telegram"])
+async def get_telegram_sessions():
+    """Состояние сессий пула парсинга."""
+    if telegram_pool:
+        return telegram_pool.get_status()
+
+    return {
+        "total": 1 if telegram_analyzer else 0,
+        "healthy": 1 if telegram_available else 0,
+        "sessions": [],
+    }
+
+
 # Telegram авторизация эндпоинты
 @app.post("/api/telegram/start-auth", tags=["telegram"])
 async def start_telegram_auth():
@@ -889,11 +1029,10 @@ async def test_prompt_template(template_name: str, variables: Dict[str, Any]):
 async def get_all_prompts_db():
     """Получить все промпты из базы данных."""
     try:
-        result = (
+        result = await async_db.execute(
             supabase_manager.client.table("llm_prompts")
             .select("*")
             .order("created_at", desc=True)
-            .execute()
         )
 
         if hasattr(result, "error") and result.error:
@@ -915,11 +1054,8 @@ async def get_all_prompts_db():
 async def get_prompt_db(prompt_id: int):
     """Получить конкретный промпт из базы данных."""
     try:
-        result = (
-            supabase_manager.client.table("llm_prompts")
-            .select("*")
-            .eq("id", prompt_id)
-            .execute()
+        result = await async_db.execute(
+            supabase_manager.client.table("llm_prompts").select("*").eq("id", prompt_id)
         )
 
         if hasattr(result, "error") and result.error:
@@ -951,11 +1087,8 @@ async def test_prompt_db(prompt_id: int, variables: Dict[str, Any]):
         from openai import AsyncOpenAI
 
         # Получаем промпт из базы данных
-        result = (
-            supabase_manager.client.table("llm_prompts")
-            .select("*")
-            .eq("id", prompt_id)
-            .execute()
+        result = await async_db.execute(
+            supabase_manager.client.table("llm_prompts").select("*").eq("id", prompt_id)
         )
 
         if (hasattr(result, "error") and result.error) or not result.data:
@@ -1114,11 +1247,10 @@ async def update_prompt_db(prompt_id: int, prompt_data: Dict[str, Any]):
             if field in prompt_data:
                 update_data[field] = prompt_data[field]
 
-        result = (
+        result = await async_db.execute(
             supabase_manager.client.table("llm_prompts")
             .update(update_data)
             .eq("id", prompt_id)
-            .execute()
         )
 
         if hasattr(result, "error") and result.error:
@@ -1140,11 +1272,8 @@ async def update_prompt_db(prompt_id: int, prompt_data: Dict[str, Any]):
 async def delete_prompt_db(prompt_id: int):
     """Удалить промпт из базы данных."""
     try:
-        result = (
-            supabase_manager.client.table("llm_prompts")
-            .delete()
-            .eq("id", prompt_id)
-            .execute()
+        result = await async_db.execute(
+            supabase_manager.client.table("llm_prompts").delete().eq("id", prompt_id)
         )
 
         if hasattr(result, "error") and result.error:
@@ -1314,10 +1443,8 @@ async def create_prompt(prompt_data: Dict[str, Any]):
             "updated_at": datetime.now().isoformat(),
         }
 
-        result = (
-            supabase_manager.client.table("llm_prompts")
-            .insert([prompt_record])
-            .execute()
+        result = await async_db.execute(
+            supabase_manager.client.table("llm_prompts").insert([prompt_record])
         )
 
         if result.error:
@@ -1390,11 +1517,10 @@ async def update_prompt_db(prompt_id: int, prompt_data: Dict[str, Any]):
             and "model_settings" not in prompt_data
         ):
             # Получаем текущие model_settings
-            current_result = (
+            current_result = await async_db.execute(
                 supabase_manager.client.table("llm_prompts")
                 .select("model_settings")
                 .eq("id", prompt_id)
-                .execute()
             )
             if current_result.data:
                 current_settings = current_result.data[0]["model_settings"] or {}
@@ -1409,11 +1535,10 @@ async def update_prompt_db(prompt_id: int, prompt_data: Dict[str, Any]):
 
                 update_data["model_settings"] = current_settings
 
-        result = (
+        result = await async_db.execute(
             supabase_manager.client.table("llm_prompts")
             .update(update_data)
             .eq("id", prompt_id)
-            .execute()
         )
 
         if hasattr(result, "error") and result.error:
@@ -1435,11 +1560,8 @@ async def update_prompt_db(prompt_id: int, prompt_data: Dict[str, Any]):
 async def delete_prompt_db(prompt_id: int):
     """Удалить промпт из базы данных."""
     try:
-        result = (
-            supabase_manager.client.table("llm_prompts")
-            .delete()
-            .eq("id", prompt_id)
-            .execute()
+        result = await async_db.execute(
+            supabase_manager.client.table("llm_prompts").delete().eq("id", prompt_id)
         )
 
         if hasattr(result, "error") and result.error:
@@ -1468,7 +1590,7 @@ async def delete_prompt_db(prompt_id: int):
 async def get_system_settings(category: Optional[str] = None):
     """Получить системные настройки."""
     try:
-        settings = supabase_manager.get_all_system_settings(category)
+        settings = await async_db.get_all_system_settings(category)
         return {"settings": settings}
     except Exception as e:
         raise HTTPException(
@@ -1480,7 +1602,7 @@ async def get_system_settings(category: Optional[str] = None):
 async def get_system_setting(key: str):
     """Получить конкретную системную настройку."""
     try:
-        setting = supabase_manager.get_system_setting(key)
+        setting = await async_db.get_system_setting(key)
         if setting is None:
             raise HTTPException(status_code=404, detail=f"Настройка {key} не найдена")
         return {"key": key, "value": setting}
@@ -1498,7 +1620,7 @@ async def update_system_setting(
 ):
     """Обновить системную настройку."""
     try:
-        success = supabase_manager.update_system_setting(key, value, description)
+        success = await async_db.update_system_setting(key, value, description)
         if not success:
             raise HTTPException(
                 status_code=500, detail=f"Не удалось обновить настройку {key}"
@@ -1519,42 +1641,24 @@ async def update_system_setting(
 async def get_channel_baselines():
     """Получить базовые метрики всех каналов."""
     try:
-        # Получаем все каналы
-        channels = supabase_manager.client.table("channels").select("*").execute()
+        # Каналы, метрики и количество постов - пакетными запросами с кэшем
+        channels = await async_db.get_channels_with_baselines()
         baselines = []
 
-        for channel in channels.data:
-            baseline = supabase_manager.get_channel_baseline(channel["username"])
-            if baseline:
+        for item in channels:
+            channel = item["channel"]
+            if item["baseline"]:
                 # Канал с рассчитанными метриками
-                baselines.append({"channel": channel, "baseline": baseline})
+                baselines.append({"channel": channel, "baseline": item["baseline"]})
             else:
-                # Канал без метрик - подсчитываем реальное количество постов
-                try:
-                    from src.app.supabase_client import supabase_client
-
-                    posts_count = (
-                        supabase_manager.client.table("posts")
-                        .select("id", count="exact")
-                        .eq("channel_username", channel["username"])
-                        .execute()
-                    )
-                    actual_posts_count = (
-                        posts_count.count if hasattr(posts_count, "count") else 0
-                    )
-                except Exception as e:
-                    logger.warning(
-                        f"Не удалось подсчитать посты для канала {channel['username']}: {e}"
-                    )
-                    actual_posts_count = 0
-
+                # Канал без метрик - показываем реальное количество постов
                 baselines.append(
                     {
                         "channel": channel,
                         "baseline": {
                             "channel_username": channel["username"],
                             "baseline_status": "not_calculated",
-                            "posts_analyzed": actual_posts_count,  # Реальное количество постов
+                            "posts_analyzed": item["posts_count"],  # Реальное количество постов
                             "median_engagement_rate": 0,
                             "std_engagement_rate": 0,
                             "avg_engagement_rate": 0,
@@ -1580,7 +1684,7 @@ async def get_channel_baselines():
 async def get_channel_baseline(channel_username: str):
     """Получить базовые метрики конкретного канала."""
     try:
-        baseline = supabase_manager.get_channel_baseline(channel_username)
+        baseline = await async_db.get_channel_baseline(channel_username)
         if not baseline:
             raise HTTPException(
                 status_code=404,
@@ -1603,7 +1707,9 @@ async def calculate_channel_baseline(channel_username: str):
         from src.app.channel_baseline_analyzer import ChannelBaselineAnalyzer
 
         analyzer = ChannelBaselineAnalyzer(supabase_manager)
-        baseline = analyzer.calculate_channel_baseline(channel_username)
+        baseline = await async_db.run(
+            analyzer.calculate_channel_baseline, channel_username
+        )
 
         if not baseline:
             raise HTTPException(
@@ -1612,7 +1718,7 @@ async def calculate_channel_baseline(channel_username: str):
             )
 
         # Сохраняем рассчитанные метрики
-        success = analyzer.save_channel_baseline(baseline)
+        success = await async_db.run(analyzer.save_channel_baseline, baseline)
         if not success:
             raise HTTPException(
                 status_code=500, detail="Не удалось сохранить базовые метрики"
@@ -1637,12 +1743,12 @@ async def update_all_channel_baselines():
         from src.app.smart_top_posts_filter import SmartTopPostsFilter
 
         filter = SmartTopPostsFilter(supabase_manager)
-        channels = supabase_manager.get_channels_needing_baseline_update()
+        channels = await async_db.get_channels_needing_baseline_update()
 
         if not channels:
             return {"message": "Нет каналов, требующих обновления базовых метрик"}
 
-        stats = filter.update_channel_baselines(channels)
+        stats = await async_db.run(filter.update_channel_baselines, channels)
         return {
             "message": f"Обновлено базовых метрик для {stats['updated']} каналов",
             "stats": stats,
@@ -1663,13 +1769,8 @@ async def recalculate_all_baselines():
 
         analyzer = ChannelBaselineAnalyzer(supabase_manager)
 
-        # Получаем все уникальные каналы из постов
-        channels_result = (
-            supabase_manager.client.table("posts").select("channel_username").execute()
-        )
-        unique_channels = list(
-            set(post["channel_username"] for post in channels_result.data)
-        )
+        # Получаем все уникальные каналы из постов (агрегат в БД, один запрос)
+        unique_channels = list(await async_db.get_posts_count_by_channel())
 
         logger.info(
             f"🔄 Начинаем принудительный пересчет для {len(unique_channels)} каналов"
@@ -1684,9 +1785,11 @@ async def recalculate_all_baselines():
                 logger.info(f"📊 Пересчитываем базовые метрики для {channel_username}")
 
                 # Принудительно пересчитываем
-                baseline = analyzer.calculate_channel_baseline(channel_username)
+                baseline = await async_db.run(
+                    analyzer.calculate_channel_baseline, channel_username
+                )
                 if baseline:
-                    analyzer.save_channel_baseline(baseline)
+                    await async_db.run(analyzer.save_channel_baseline, baseline)
                     recalculated_count += 1
                     results.append(
                         {
@@ -1749,40 +1852,21 @@ async def get_posts_stats(
 ):
     """Получить общую статистику по постам без загрузки самих постов"""
     try:
-        query = supabase_manager.client.table("posts").select(
-            "views, reactions, forwards", count="exact"
+        stats = await async_db.get_posts_stats(
+            channel_username=channel_username or None,
+            date_from=date_from or None,
+            date_to=date_to or None,
+            min_views=min_views or None,
+            # Конвертируем проценты в десятичную дробь
+            min_engagement=min_engagement * 0.01 if min_engagement else None,
+            search_term=search_term or None,
         )
+        if stats is None:
+            raise HTTPException(status_code=500, detail="Error getting posts stats")
 
-        if channel_username:
-            query = query.eq("channel_username", channel_username)
-
-        # Применяем дополнительные фильтры
-        if date_from:
-            query = query.gte("date", date_from)
-        if date_to:
-            query = query.lte("date", date_to)
-        if min_views:
-            query = query.gte("views", min_views)
-        if min_engagement:
-            query = query.gte("engagement_rate", min_engagement * 0.01)
-        if search_term:
-            query = query.or_(
-                f"text.ilike.%{search_term}%,channel_title.ilike.%{search_term}%"
-            )
-
-        result = query.execute()
-
-        total_views = sum(post["views"] for post in result.data or [])
-        total_reactions = sum(post["reactions"] for post in result.data or [])
-        total_forwards = sum(post["forwards"] for post in result.data or [])
-        total_posts = result.count or 0
-
-        return {
-            "total_posts": total_posts,
-            "total_views": total_views,
-            "total_reactions": total_reactions,
-            "total_forwards": total_forwards,
-        }
+        return stats
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error getting posts stats: {e}")
         raise HTTPException(
@@ -1804,36 +1888,61 @@ async def get_posts(
     min_viral_score: float = 1.0,
     sort_by: str = "date",
     sort_order: str = "desc",
+    cursor: Optional[str] = None,
+    count_mode: str = "estimated",
 ):
-    """Получить посты с метриками."""
-    try:
-        query = supabase_manager.client.table("posts").select("*")
-
-        if channel_username:
-            query = query.eq("channel_username", channel_username)
+    """
+    Получить посты с метриками.
 
-        # Применяем дополнительные фильтры
-        if date_from:
-            query = query.gte("date", date_from)
-        if date_to:
-            query = query.lte("date", date_to)
-        if min_views:
-            query = query.gte("views", min_views)
-        if min_engagement:
-            query = query.gte(
-                "engagement_rate", min_engagement * 0.01
-            )  # Конвертируем проценты в десятичную дробь
-        if search_term:
-            # Поиск по тексту поста (full_text, text_preview) и названию канала
-            query = query.or_(
-                f"full_text.ilike.%{search_term}%,text_preview.ilike.%{search_term}%,channel_title.ilike.%{search_term}%,channel_username.ilike.%{search_term}%"
+    Страницы запрашиваются по курсору: next_cursor из ответа передается в
+    cursor следующего запроса (offset поддерживается для совместимости и
+    игнорируется при переданном курсоре). Общее количество считается в БД:
+    count_mode = exact | planned | estimated.
+    """
+    try:
+        if count_mode not in ("exact", "planned", "estimated"):
+            count_mode = "estimated"
+
+        def apply_filters(query):
+            """Фильтры списка: общие для страницы и подсчета количества."""
+            if channel_username:
+                query = query.eq("channel_username", channel_username)
+
+            # Применяем дополнительные фильтры
+            if date_from:
+                query = query.gte("date", date_from)
+            if date_to:
+                query = query.lte("date", date_to)
+            if min_views:
+                query = query.gte("views", min_views)
+            if min_engagement:
+                query = query.gte(
+                    "engagement_rate", min_engagement * 0.01
+                )  # Конвертируем проценты в десятичную дробь
+            if search_term:
+                # Поиск по тексту поста и названию канала (индекс search_vector)
+                query = query.or_(supabase_manager.search_term_filter(search_term))
+
+            # Фильтр виральных постов
+            if only_viral:
+                query = query.gte("viral_score", min_viral_score)
+            return query
+
+        query = apply_filters(
+            supabase_manager.client.table("posts").select(
+                supabase_manager.post_columns("list-card")
             )
+        )
+        # Количество - отдельным head-запросом без условия курсора: иначе на
+        # каждой следующей странице считались бы только строки после курсора
+        count_query = apply_filters(
+            supabase_manager.client.table("posts").select(
+                "id", count=count_mode, head=True
+            )
+        )
 
-        # Фильтр виральных постов
-        if only_viral:
-            query = query.gte("viral_score", min_viral_score)
-
-        # Применяем сортировку
+        # Применяем сортировку (только по колонкам posts: оценка анализа
+        # хранится в post_analysis, поэтому "score" сортируется по дате)
         valid_sort_fields = {
             "date",
             "viral_score",
@@ -1841,7 +1950,6 @@ async def get_posts(
             "engagement_rate",
             "forwards",
             "reactions",
-            "score",
         }
 
         if sort_by not in valid_sort_fields:
@@ -1850,22 +1958,24 @@ async def get_posts(
         if sort_order not in ["asc", "desc"]:
             sort_order = "desc"
 
-        # Применяем сортировку
-        if sort_order == "desc":
-            query = query.order(sort_by, desc=True)
-        else:
-            query = query.order(sort_by, desc=False)
-
-        # Получаем общее количество записей для определения has_more
-        count_query = query
-        count_result = count_query.execute()
-        total_count = len(count_result.data) if count_result.data else 0
-
-        posts_result = query.range(offset, offset + limit - 1).execute()
+        # Сортировка по (sort_by, id): id делает порядок однозначным для курсора
+        try:
+            query = apply_keyset(query, sort_by, sort_order == "desc", cursor)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+        # Запрашиваем на одну строку больше: по ней определяется has_more
+        start = 0 if cursor else offset
+        posts_result, count_result = await asyncio.gather(
+            async_db.execute(query.range(start, start + limit)),
+            async_db.execute(count_query),
+        )
         posts = posts_result.data or []
 
-        # Определяем, есть ли еще записи
-        has_more = (offset + len(posts)) < total_count
+        has_more = len(posts) > limit
+        posts = posts[:limit]
+        total_count = count_result.count or 0
+        next_cursor = encode_cursor(posts[-1], sort_by) if has_more else None
 
         # Получаем все post_id для batch запроса
         post_ids = [post["id"] for post in posts]
@@ -1874,11 +1984,10 @@ async def get_posts(
         analysis_dict = {}
         if post_ids:
             try:
-                analysis_result = (
+                analysis_result = await async_db.execute(
                     supabase_manager.client.table("post_analysis")
                     .select("post_id, suitability_score, is_suitable, filter_reason")
                     .in_("post_id", post_ids)
-                    .execute()
                 )
                 if analysis_result.data:
                     # Группируем по post_id и выбираем лучшую оценку
@@ -1925,7 +2034,14 @@ async def get_posts(
                 post["is_suitable"] = None
                 post["analysis_reason"] = None
 
-        return {"posts": posts, "count": total_count, "has_more": has_more}
+        return {
+            "posts": posts,
+            "count": total_count,
+            "has_more": has_more,
+            "next_cursor": next_cursor,
+        }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=500, detail=f"Ошибка получения постов: {str(e)}"
@@ -1943,9 +2059,7 @@ async def get_viral_posts(
         logger.info(
             f"Получение viral постов: channel={channel_username}, min_score={min_viral_score}, limit={limit}"
         )
-        posts = supabase_manager.get_viral_posts(
-            channel_username, min_viral_score, limit
-        )
+        posts = await async_db.get_viral_posts(channel_username, min_viral_score, limit)
         logger.info(f"Найдено {len(posts)} viral постов")
         result = {"posts": posts, "count": len(posts)}
         logger.info(f"Возвращаем результат: {result}")
@@ -1956,16 +2070,45 @@ async def get_viral_posts(
         )
 
 
+@app.get("/api/posts/search", tags=["posts"])
+async def search_posts(
+    q: str,
+    channel_username: Optional[str] = None,
+    limit: int = 20,
+    offset: int = 0,
+):
+    """Полнотекстовый поиск постов с ранжированием и фрагментами текста."""
+    query = q.strip()
+    if not query:
+        raise HTTPException(status_code=400, detail="Пустой поисковый запрос")
+
+    limit = max(1, min(limit, 100))
+    offset = max(0, offset)
+
+    # Запрашиваем на одну строку больше: по ней определяется has_more
+    posts = await async_db.search_posts(
+        query, channel_username or None, limit + 1, offset
+    )
+    if posts is None:
+        raise HTTPException(status_code=500, detail="Ошибка поиска постов")
+
+    return {
+        "query": query,
+        "posts": posts[:limit],
+        "count": min(len(posts), limit),
+        "has_more": len(posts) > limit,
+    }
+
+
 @app.get("/api/posts/{post_id}", tags=["posts"])
 async def get_single_post(post_id: str):
     """Получить один пост с оценкой."""
     try:
         # Получаем пост
-        post_result = (
+        post_result = await async_db.execute(
             supabase_manager.client.table("posts")
-            .select("*")
+            .select(supabase_manager.post_columns("detail"))
             .eq("id", post_id)
-            .execute()
         )
 
         if not post_result.data or len(post_result.data) == 0:
@@ -1985,11 +2128,10 @@ async def get_single_post(post_id: str):
 
         # Получаем оценку из post_analysis
         try:
-            analysis_result = (
+            analysis_result = await async_db.execute(
                 supabase_manager.client.table("post_analysis")
                 .select("suitability_score, is_suitable, filter_reason")
                 .eq("post_id", post_id)
-                .execute()
             )
             if analysis_result.data and len(analysis_result.data) > 0:
                 analysis = analysis_result.data[0]
@@ -2027,11 +2169,10 @@ async def debug_calculate_baseline(channel_username: str):
         analyzer = ChannelBaselineAnalyzer(supabase_manager)
 
         # Получаем посты канала
-        posts_result = (
+        posts_result = await async_db.execute(
             supabase_manager.client.table("posts")
-            .select("*")
+            .select(supabase_manager.post_columns("detail"))
             .eq("channel_username", channel_username)
-            .execute()
         )
         posts = posts_result.data or []
 
@@ -2125,7 +2266,7 @@ async def debug_get_settings():
         settings = {}
         keys = ["viral_weights", "baseline_calculation", "viral_thresholds"]
         for key in keys:
-            value = supabase_manager.get_system_setting(key)
+            value = await async_db.get_system_setting(key)
             settings[key] = value
 
         return {"success": True, "settings": settings}
@@ -2143,11 +2284,10 @@ async def debug_calculate_single_post(post_id: str):
         from src.app.viral_post_detector import ViralPostDetector
 
         # Получаем данные поста
-        post_result = (
+        post_result = await async_db.execute(
             supabase_manager.client.table("posts")
-            .select("*")
+            .select(supabase_manager.post_columns("detail"))
             .eq("id", post_id)
-            .execute()
         )
         if not post_result.data:
             raise HTTPException(status_code=404, detail=f"Пост {post_id} не найден")
@@ -2163,14 +2303,18 @@ async def debug_calculate_single_post(post_id: str):
 
         # Получаем базовые метрики канала
         baseline_analyzer = ChannelBaselineAnalyzer(supabase_manager)
-        baseline = baseline_analyzer.get_channel_baseline(channel_username)
+        baseline = await async_db.run(
+            baseline_analyzer.get_channel_baseline, channel_username
+        )
 
         if not baseline:
             logger.warning(f"⚠️  Нет базовых метрик для канала {channel_username}")
             # Попробуем рассчитать
-            baseline = baseline_analyzer.calculate_channel_baseline(channel_username)
+            baseline = await async_db.run(
+                baseline_analyzer.calculate_channel_baseline, channel_username
+            )
             if baseline:
-                baseline_analyzer.save_channel_baseline(baseline)
+                await async_db.run(baseline_analyzer.save_channel_baseline, baseline)
                 logger.info(
                     f"✅ Базовые метрики рассчитаны для канала {channel_username}"
                 )
@@ -2213,7 +2357,9 @@ async def debug_calculate_single_post(post_id: str):
 
         # Рассчитываем виральность
         detector = ViralPostDetector(baseline_analyzer)
-        viral_results = detector.detect_viral_posts([post], channel_username)
+        viral_results = await async_db.run(
+            detector.detect_viral_posts, [post], channel_username
+        )
 
         if viral_results:
             result = viral_results[0]
@@ -2222,7 +2368,9 @@ async def debug_calculate_single_post(post_id: str):
             )
 
             # Сохраняем результат
-            success = detector.update_post_viral_metrics(post_id, result)
+            success = await async_db.run(
+                detector.update_post_viral_metrics, post_id, result
+            )
             logger.info(f"💾 Сохранение метрик: {'✅' if success else '❌'}")
 
             return {
@@ -2274,14 +2422,14 @@ async def calculate_viral_batch(channel_username: str = None, limit: int = 100):
         # Получаем посты
         query = (
             supabase_manager.client.table("posts")
-            .select("*")
+            .select(supabase_manager.post_columns("metrics-only"))
             .order("date", desc=True)
             .limit(limit)
         )
         if channel_username:
             query = query.eq("channel_username", channel_username)
 
-        posts_result = query.execute()
+        posts_result = await async_db.execute(query)
         posts = posts_result.data or []
 
         if not posts:
@@ -2306,13 +2454,19 @@ async def calculate_viral_batch(channel_username: str = None, limit: int = 100):
 
             # Проверяем базовые метрики канала
             baseline_analyzer = ChannelBaselineAnalyzer(supabase_manager)
-            baseline = baseline_analyzer.get_channel_baseline(channel)
+            baseline = await async_db.run(
+                baseline_analyzer.get_channel_baseline, channel
+            )
 
             if not baseline:
                 logger.info(f"📊 Рассчитываем базовые метрики для канала {channel}")
-                baseline = baseline_analyzer.calculate_channel_baseline(channel)
+                baseline = await async_db.run(
+                    baseline_analyzer.calculate_channel_baseline, channel
+                )
                 if baseline:
-                    baseline_analyzer.save_channel_baseline(baseline)
+                    await async_db.run(
+                        baseline_analyzer.save_channel_baseline, baseline
+                    )
                     logger.info(f"✅ Базовые метрики сохранены для канала {channel}")
                 else:
                     logger.warning(
@@ -2322,20 +2476,23 @@ async def calculate_viral_batch(channel_username: str = None, limit: int = 100):
 
             # Рассчитываем виральность постов канала
             detector = ViralPostDetector(baseline_analyzer)
-            viral_results = detector.detect_viral_posts(channel_posts, channel)
-
-            # Сохраняем результаты
-            processed_count = 0
-            viral_count = 0
+            viral_results = await async_db.run(
+                detector.detect_viral_posts, channel_posts, channel
+            )
 
-            for post, result in zip(channel_posts, viral_results):
-                post_id = post.get("id")
-                if post_id:
-                    success = detector.update_post_viral_metrics(str(post_id), result)
-                    if success:
-                        processed_count += 1
-                        if result.is_viral:
-                            viral_count += 1
+            # Сохраняем результаты пачками
+            write_stats = await async_db.run(
+                detector.update_posts_viral_metrics, channel_posts, viral_results
+            )
+            failed_ids = {failure["id"] for failure in write_stats["failed"]}
+            processed_count = write_stats["updated"]
+            viral_count = sum(
+                1
+                for post, result in zip(channel_posts, viral_results)
+                if result.is_viral
+                and post.get("id")
+                and str(post["id"]) not in failed_ids
+            )
 
             logger.info(
                 f"📊 Канал {channel}: обработано {processed_count}/{len(channel_posts)} постов, найдено {viral_count} виральных"
@@ -2347,6 +2504,7 @@ async def calculate_viral_batch(channel_username: str = None, limit: int = 100):
                     "total_posts": len(channel_posts),
                     "processed_posts": processed_count,
                     "viral_posts": viral_count,
+                    "failed_posts": write_stats["failed"],
                     "baseline_status": "ready" if baseline else "failed",
                 }
             )
@@ -2382,48 +2540,45 @@ async def calculate_viral_all_posts(channel_username: str = None):
             f"🚀 Начинаем массовый расчет виральности для ВСЕХ постов. Канал: {channel_username}"
         )
 
-        # Получаем все посты (без лимита)
-        query = (
-            supabase_manager.client.table("posts")
-            .select("*", count="exact")
-            .order("date", desc=True)
+        # Количество постов по каналам: без загрузки самих постов
+        channels_counts = await async_db.get_posts_count_by_channel(
+            [channel_username] if channel_username else None
         )
-        if channel_username:
-            query = query.eq("channel_username", channel_username)
-
-        posts_result = query.execute()
-        posts = posts_result.data or []
-        total_posts = posts_result.count
+        total_posts = sum(channels_counts.values())
 
-        if not posts:
+        if not total_posts:
             return {"success": False, "message": "Нет постов для обработки"}
 
-        logger.info(f"📋 Найдено {len(posts)} постов из {total_posts} для обработки")
+        logger.info(
+            f"📋 Найдено {total_posts} постов в {len(channels_counts)} каналах для обработки"
+        )
 
-        # Группируем по каналам
-        channels_posts = {}
-        for post in posts:
-            channel = post["channel_username"]
-            if channel not in channels_posts:
-                channels_posts[channel] = []
-            channels_posts[channel].append(post)
+        # Только колонки, нужные для расчета виральности
+        columns = supabase_manager.post_columns("metrics-only")
+        page_size = max(1, settings.viral_recalc_page_size)
 
         total_processed = 0
         channels_stats = []
 
-        # Обрабатываем каждый канал
-        for channel, channel_posts in channels_posts.items():
-            logger.info(f"🔄 Обрабатываем канал {channel}: {len(channel_posts)} постов")
+        # Обрабатываем каждый канал постранично: в памяти не больше одной страницы
+        for channel, channel_total in channels_counts.items():
+            logger.info(f"🔄 Обрабатываем канал {channel}: {channel_total} постов")
 
             # Проверяем базовые метрики канала
             baseline_analyzer = ChannelBaselineAnalyzer(supabase_manager)
-            baseline = baseline_analyzer.get_channel_baseline(channel)
+            baseline = await async_db.run(
+                baseline_analyzer.get_channel_baseline, channel
+            )
 
             if not baseline:
                 logger.info(f"📊 Рассчитываем базовые метрики для канала {channel}")
-                baseline = baseline_analyzer.calculate_channel_baseline(channel)
+                baseline = await async_db.run(
+                    baseline_analyzer.calculate_channel_baseline, channel
+                )
                 if baseline:
-                    baseline_analyzer.save_channel_baseline(baseline)
+                    await async_db.run(
+                        baseline_analyzer.save_channel_baseline, baseline
+                    )
                     logger.info(f"✅ Базовые метрики сохранены для канала {channel}")
                 else:
                     logger.warning(
@@ -2431,33 +2586,54 @@ async def calculate_viral_all_posts(channel_username: str = None):
                     )
                     continue
 
-            # Рассчитываем виральность постов канала
             detector = ViralPostDetector(baseline_analyzer)
-            viral_results = detector.detect_viral_posts(channel_posts, channel)
-
-            # Сохраняем результаты
             processed_count = 0
             viral_count = 0
+            seen_count = 0
+            failed_posts = []
+            cursor = None
+
+            while True:
+                page, cursor = await async_db.get_posts_page(
+                    channel, columns=columns, page_size=page_size, cursor=cursor
+                )
+                if not page:
+                    break
 
-            for post, result in zip(channel_posts, viral_results):
-                post_id = post.get("id")
-                if post_id:
-                    success = detector.update_post_viral_metrics(str(post_id), result)
-                    if success:
-                        processed_count += 1
-                        if result.is_viral:
-                            viral_count += 1
+                # Рассчитываем виральность страницы и сохраняем пачками
+                viral_results = await async_db.run(
+                    detector.detect_viral_posts, page, channel, baseline
+                )
+                write_stats = await async_db.run(
+                    detector.update_posts_viral_metrics, page, viral_results
+                )
+                failed_ids = {failure["id"] for failure in write_stats["failed"]}
+
+                seen_count += len(page)
+                processed_count += write_stats["updated"]
+                failed_posts.extend(write_stats["failed"])
+                viral_count += sum(
+                    1
+                    for post, result in zip(page, viral_results)
+                    if result.is_viral
+                    and post.get("id")
+                    and str(post["id"]) not in failed_ids
+                )
+
+                if not cursor:
+                    break
 
             logger.info(
-                f"📊 Канал {channel}: обработано {processed_count}/{len(channel_posts)} постов, найдено {viral_count} виральных"
+                f"📊 Канал {channel}: обработано {processed_count}/{seen_count} постов, найдено {viral_count} виральных"
             )
 
             channels_stats.append(
                 {
                     "channel": channel,
-                    "total_posts": len(channel_posts),
+                    "total_posts": seen_count,
                     "processed_posts": processed_count,
                     "viral_posts": viral_count,
+                    "failed_posts": failed_posts,
                     "baseline_status": "ready" if baseline else "failed",
                 }
             )
@@ -2465,15 +2641,15 @@ async def calculate_viral_all_posts(channel_username: str = None):
             total_processed += processed_count
 
         logger.info(
-            f"🎉 Массовый расчет всех постов завершен: обработано {total_processed} постов из {len(posts)}"
+            f"🎉 Массовый расчет всех постов завершен: обработано {total_processed} постов из {total_posts}"
         )
 
         return {
             "success": True,
-            "total_posts": len(posts),
+            "total_posts": total_posts,
             "processed_posts": total_processed,
             "channels": channels_stats,
-            "message": f"Обработано {total_processed} постов из {len(posts)}",
+            "message": f"Обработано {total_processed} постов из {total_posts}",
         }
 
     except Exception as e:
@@ -2489,11 +2665,10 @@ async def update_post_viral_metrics(post_id: str):
         from src.app.viral_post_detector import ViralPostDetector
 
         # Получаем данные поста
-        post_result = (
+        post_result = await async_db.execute(
             supabase_manager.client.table("posts")
-            .select("*")
+            .select(supabase_manager.post_columns("detail"))
             .eq("id", post_id)
-            .execute()
         )
         if not post_result.data:
             raise HTTPException(status_code=404, detail=f"Пост {post_id} не найден")
@@ -2503,7 +2678,9 @@ async def update_post_viral_metrics(post_id: str):
 
         # Получаем базовые метрики канала
         baseline_analyzer = ChannelBaselineAnalyzer(supabase_manager)
-        baseline = baseline_analyzer.get_channel_baseline(channel_username)
+        baseline = await async_db.run(
+            baseline_analyzer.get_channel_baseline, channel_username
+        )
 
         if not baseline:
             raise HTTPException(
@@ -2516,7 +2693,9 @@ async def update_post_viral_metrics(post_id: str):
         result = detector.analyze_post_virality(post, baseline)
 
         # Обновляем метрики
-        success = detector.update_post_viral_metrics(post_id, result)
+        success = await async_db.run(
+            detector.update_post_viral_metrics, post_id, result
+        )
         if not success:
             raise HTTPException(
                 status_code=500, detail="Не удалось обновить viral метрики"
@@ -2545,12 +2724,14 @@ async def calculate_viral_metrics_batch(channel_username: str = None, limit: int
         from src.app.viral_post_detector import ViralPostDetector
 
         # Получаем посты
-        query = supabase_manager.client.table("posts").select("*")
+        query = supabase_manager.client.table("posts").select(
+            supabase_manager.post_columns("metrics-only")
+        )
         if channel_username:
             query = query.eq("channel_username", channel_username)
         query = query.is_("viral_score", None).limit(limit)  # Только посты без метрик
 
-        posts_result = query.execute()
+        posts_result = await async_db.execute(query)
         posts = posts_result.data
 
         if not posts:
@@ -2558,22 +2739,27 @@ async def calculate_viral_metrics_batch(channel_username: str = None, limit: int
 
         # Группируем по каналам
         channels_processed = {}
-        total_processed = 0
+        scored_posts = []
+        results = []
 
         for post in posts:
             channel_username = post["channel_username"]
             if channel_username not in channels_processed:
                 # Получаем базовые метрики канала
                 baseline_analyzer = ChannelBaselineAnalyzer(supabase_manager)
-                baseline = baseline_analyzer.get_channel_baseline(channel_username)
+                baseline = await async_db.run(
+                    baseline_analyzer.get_channel_baseline, channel_username
+                )
 
                 if not baseline:
                     # Пытаемся рассчитать базовые метрики
-                    baseline = baseline_analyzer.calculate_channel_baseline(
-                        channel_username
+                    baseline = await async_db.run(
+                        baseline_analyzer.calculate_channel_baseline, channel_username
                     )
                     if baseline:
-                        baseline_analyzer.save_channel_baseline(baseline)
+                        await async_db.run(
+                            baseline_analyzer.save_channel_baseline, baseline
+                        )
 
                 channels_processed[channel_username] = baseline
 
@@ -2583,16 +2769,23 @@ async def calculate_viral_metrics_batch(channel_username: str = None, limit: int
 
             # Рассчитываем метрики виральности
             detector = ViralPostDetector(baseline_analyzer)
-            result = detector.analyze_post_virality(post, baseline)
+            scored_posts.append(post)
+            results.append(detector.analyze_post_virality(post, baseline))
 
-            # Обновляем метрики
-            success = detector.update_post_viral_metrics(post["id"], result)
-            if success:
-                total_processed += 1
+        # Записываем метрики всех постов пачками
+        write_stats = (
+            await async_db.run(
+                detector.update_posts_viral_metrics, scored_posts, results
+            )
+            if scored_posts
+            else {"updated": 0, "failed": []}
+        )
+        total_processed = write_stats["updated"]
 
         return {
             "message": f"Обработано {total_processed} постов",
             "processed": total_processed,
+            "failed": write_stats["failed"],
             "channels": list(channels_processed.keys()),
         }
     except Exception as e:
@@ -2610,7 +2803,9 @@ async def ensure_channel_baseline(
         analyzer = ChannelBaselineAnalyzer(supabase_manager)
 
         # Проверяем существующие метрики
-        existing_baseline = analyzer.get_channel_baseline(channel_username)
+        existing_baseline = await async_db.run(
+            analyzer.get_channel_baseline, channel_username
+        )
 
         if existing_baseline and not force_recalculate:
             # Проверяем актуальность
@@ -2622,11 +2817,15 @@ async def ensure_channel_baseline(
                 }
 
         # Рассчитываем новые метрики
-        baseline = analyzer.calculate_channel_baseline(channel_username)
+        baseline = await async_db.run(
+            analyzer.calculate_channel_baseline, channel_username
+        )
 
         if not baseline:
             # Если недостаточно данных, получаем больше постов
-            posts = analyzer._get_channel_posts_history(channel_username)
+            posts = await async_db.run(
+                analyzer._get_channel_posts_history, channel_username
+            )
             if len(posts) < 5:
                 raise HTTPException(
                     status_code=400,
@@ -2634,10 +2833,12 @@ async def ensure_channel_baseline(
                 )
 
             # Пытаемся с меньшим порогом
-            baseline = analyzer.calculate_channel_baseline(channel_username)
+            baseline = await async_db.run(
+                analyzer.calculate_channel_baseline, channel_username
+            )
 
         if baseline:
-            success = analyzer.save_channel_baseline(baseline)
+            success = await async_db.run(analyzer.save_channel_baseline, baseline)
             if success:
                 return {
                     "message": "Базовые метрики рассчитаны и сохранены",
@@ -2678,66 +2879,47 @@ async def get_llm_stats():
 async def get_system_health():
     """Получить статистику здоровья системы."""
     try:
-        # Получаем реальную статистику из базы данных
-        try:
-            # Общее количество постов
-            posts_result = (
-                supabase_manager.client.table("posts")
-                .select("*", count="exact")
-                .execute()
-            )
-            total_posts = posts_result.count
-
-            # Посты за сегодня
-            today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
-            posts_today_result = (
-                supabase_manager.client.table("posts")
-                .select("*", count="exact")
-                .gte("date", today.isoformat())
-                .execute()
-            )
-            posts_today = posts_today_result.count
+        # Счетчики без выгрузки строк, с коротким кэшем
+        return await async_db.run(stats_service.get_health_stats)
+    except Exception as e:
+        logger.error(f"Error getting system health: {e}")
+        raise HTTPException(status_code=500, detail="Failed to get system health")
 
-            # Активные каналы
-            channels_result = (
-                supabase_manager.client.table("channels")
-                .select("*", count="exact")
-                .execute()
-            )
-            active_channels = channels_result.count
 
-            # Недавний анализ (LLM запросы за последние 7 дней)
-            week_ago = datetime.utcnow() - timedelta(days=7)
-            recent_analysis = 0  # Пока заглушка, можно добавить позже
+@app.get("/api/stats/timeseries", tags=["stats"])
+async def get_stats_timeseries(
+    channel_username: Optional[str] = None,
+    days: int = 30,
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+):
+    """
+    Дневной ряд метрик постов из агрегатов channel_daily_stats.
 
-            # Среднее время обработки
-            avg_processing_time = 0.0  # Пока заглушка
+    Без channel_username дни суммируются по всем каналам в БД (RPC
+    get_daily_stats_totals): средний engagement взвешивается по количеству
+    постов, медиана и p90 не суммируются и возвращаются только для одного
+    канала.
+    """
+    today = datetime.utcnow().date()
+    date_to = date_to or today.isoformat()
+    date_from = date_from or (today - timedelta(days=max(1, days) - 1)).isoformat()
 
-            # Процент ошибок
-            error_rate = 0.0  # Пока заглушка
+    if channel_username:
+        series = await async_db.get_channel_daily_stats(
+            channel_username, date_from, date_to
+        )
+    else:
+        series = await async_db.get_daily_stats_totals(date_from, date_to)
+    if series is None:
+        raise HTTPException(status_code=500, detail="Ошибка получения статистики")
 
-            return {
-                "total_posts": total_posts,
-                "posts_today": posts_today,
-                "active_channels": active_channels,
-                "recent_analysis": recent_analysis,
-                "avg_processing_time": avg_processing_time,
-                "error_rate": error_rate,
-            }
-        except Exception as e:
-            logger.error(f"Error getting stats from database: {e}")
-            # Возвращаем заглушку в случае ошибки
-            return {
-                "total_posts": 0,
-                "posts_today": 0,
-                "active_channels": 0,
-                "recent_analysis": 0,
-                "avg_processing_time": 0.0,
-                "error_rate": 0.0,
-            }
-    except Exception as e:
-        logger.error(f"Error getting system health: {e}")
-        raise HTTPException(status_code=500, detail="Failed to get system health")
+    return {
+        "channel_username": channel_username,
+        "date_from": date_from,
+        "date_to": date_to,
+        "series": series,
+    }
 
 
 @app.get("/api/stats/tokens", tags=["stats"])
@@ -2771,6 +2953,7 @@ async def parse_single_channel(
     - **days_back**: Количество дней назад для парсинга (по умолчанию 7)
     - **max_posts**: Максимальное количество постов (по умолчанию 100)
     - **save_to_db**: Сохранять ли результаты в базу данных
+    - **incremental**: Загружать только новые посты после watermark канала
     """
     try:
         logger.info(f"Запуск парсинга канала {request.channel_username}")
@@ -2785,7 +2968,7 @@ async def parse_single_channel(
         }
 
         # Сохраняем сессию
-        session_result = supabase_manager.save_parsing_session(session_data)
+        session_result = await async_db.save_parsing_session(session_data)
         session_id = session_result["id"]
 
         # Запускаем парсинг в фоне
@@ -2796,6 +2979,7 @@ async def parse_single_channel(
             request.max_posts,
             request.save_to_db,
             session_id,
+            request.incremental,
         )
 
         return ParsingResponse(
@@ -2826,6 +3010,7 @@ async def parse_multiple_channels(
     - **days_back**: Количество дней назад для парсинга (по умолчанию 7)
     - **max_posts**: Максимальное количество постов на канал (по умолчанию 100)
     - **save_to_db**: Сохранять ли результаты в базу данных
+    - **incremental**: Загружать только новые посты после watermark канала
     """
     try:
         logger.info(f"Запуск массового парсинга {len(request.channels)} каналов")
@@ -2839,7 +3024,7 @@ async def parse_multiple_channels(
             "initiated_by": None,
         }
 
-        session_result = supabase_manager.save_parsing_session(session_data)
+        session_result = await async_db.save_parsing_session(session_data)
         session_id = session_result["id"]
 
         # Запускаем парсинг всех каналов в фоне
@@ -2850,6 +3035,7 @@ async def parse_multiple_channels(
             request.max_posts,
             request.save_to_db,
             session_id,
+            request.incremental,
         )
 
         return {
@@ -2866,6 +3052,109 @@ async def parse_multiple_channels(
         )
 
 
+@app.post("/api/parsing/backfill", tags=["parsing"])
+async def backfill_channels(request: BackfillRequest, background_tasks: BackgroundTasks):
+    """
+    Запустить догрузку истории каналов.
+
+    Догрузка идет страницами с чекпоинтом после каждой страницы и с пониженным
+    приоритетом относительно обычного парсинга. Прерванная догрузка продолжается
+    с сохраненного чекпоинта.
+
+    - **channels**: Список username каналов
+    - **history_days**: Глубина истории в днях (по умолчанию baseline_calculation.history_days)
+    - **force**: Начать заново, даже если история уже догружена
+    """
+    if not telegram_available or not telegram_analyzer:
+        raise HTTPException(status_code=503, detail="Telegram клиент недоступен")
+
+    background_tasks.add_task(
+        get_channel_backfill().run,
+        request.channels,
+        request.history_days,
+        request.force,
+    )
+
+    return {
+        "status": "running",
+        "channels_count": len(request.channels),
+        "message": f"Догрузка истории {len(request.channels)} каналов запущена",
+    }
+
+
+@app.get("/api/parsing/backfill/{channel_username}", tags=["parsing"])
+async def get_backfill_status(channel_username: str):
+    """Получить состояние догрузки истории канала."""
+    checkpoint = await async_db.get_backfill_checkpoint(channel_username)
+    if checkpoint is None:
+        raise HTTPException(
+            status_code=404, detail=f"Канал {channel_username} не найден"
+        )
+
+    return {
+        "channel_username": channel_username,
+        "running": get_channel_backfill().is_running(channel_username),
+        **checkpoint,
+    }
+
+
+@app.post("/api/parsing/refresh-metrics", tags=["parsing"])
+async def refresh_posts_metrics(
+    request: MetricsRefreshRequest, background_tasks: BackgroundTasks
+):
+    """
+    Обновить метрики вовлеченности уже сохраненных постов.
+
+    Счетчики запрашиваются пачками по message_id без повторного парсинга каналов.
+
+    - **days_back**: Возраст постов в днях, метрики которых обновляются (по умолчанию 7)
+    - **channels**: Список username каналов (по умолчанию все каналы с недавними постами)
+    """
+    if not telegram_available or not telegram_analyzer:
+        raise HTTPException(status_code=503, detail="Telegram клиент недоступен")
+
+    background_tasks.add_task(
+        refresh_posts_metrics_background, request.days_back, request.channels
+    )
+
+    return {
+        "status": "running",
+        "days_back": request.days_back,
+        "channels": request.channels,
+        "message": "Обновление метрик постов запущено",
+    }
+
+
+@app.get("/api/parsing/scheduler", tags=["parsing"])
+async def get_parse_scheduler_status():
+    """
+    Получить состояние планировщика парсинга.
+
+    Возвращает каналы в работе и начало очереди, упорядоченной по степени
+    просрочки: (сейчас - last_parsed) / parse_frequency_hours.
+    """
+    return get_parse_scheduler().get_status()
+
+
+@app.post("/api/parsing/scheduler/start", tags=["parsing"])
+async def start_parse_scheduler():
+    """Запустить планировщик парсинга по parse_frequency_hours каналов."""
+    if not telegram_available or not telegram_analyzer:
+        raise HTTPException(status_code=503, detail="Telegram клиент недоступен")
+
+    scheduler = get_parse_scheduler()
+    scheduler.start()
+    return scheduler.get_status()
+
+
+@app.post("/api/parsing/scheduler/stop", tags=["parsing"])
+async def stop_parse_scheduler():
+    """Остановить планировщик парсинга (начатые парсинги дорабатывают)."""
+    scheduler = get_parse_scheduler()
+    await scheduler.stop()
+    return scheduler.get_status()
+
+
 @app.get("/api/parsing/session/{session_id}", tags=["parsing"])
 async def get_parsing_session_status(session_id: int):
     """
@@ -2874,7 +3163,7 @@ async def get_parsing_session_status(session_id: int):
     - **session_id**: ID сессии парсинга
     """
     try:
-        session_data = supabase_manager.get_parsing_session(session_id)
+        session_data = await async_db.get_parsing_session(session_id)
         if not session_data:
             raise HTTPException(
                 status_code=404, detail=f"Сессия парсинга {session_id} не найдена"
@@ -2888,6 +3177,8 @@ async def get_parsing_session_status(session_id: int):
             "channels_parsed": session_data.get("channels_parsed", 0),
             "posts_found": session_data.get("posts_found", 0),
             "error_message": session_data.get("error_message"),
+            "progress": bulk_parsing_progress.get(session_id)
+            or finished_bulk_progress.get(session_id),
         }
 
     except HTTPException:
@@ -2905,12 +3196,11 @@ async def get_parsing_sessions():
     Получить список всех сессий парсинга.
     """
     try:
-        result = (
+        result = await async_db.execute(
             supabase_manager.client.table("parsing_sessions")
             .select("*")
             .order("started_at", desc=True)
             .limit(20)
-            .execute()
         )
         return {"sessions": result.data}
     except Exception as e:
@@ -2927,7 +3217,7 @@ async def cancel_parsing_session(session_id: int):
     """
     try:
         # Обновляем статус сессии на failed
-        result = (
+        result = await async_db.execute(
             supabase_manager.client.table("parsing_sessions")
             .update(
                 {
@@ -2937,7 +3227,6 @@ async def cancel_parsing_session(session_id: int):
                 }
             )
             .eq("id", session_id)
-            .execute()
         )
 
         if not result.data:
@@ -2968,7 +3257,19 @@ async def update_channel_settings(channel_id: int, request: ChannelManagementReq
     """
     try:
         update_data = request.model_dump()
-        result = supabase_manager.update_channel(channel_id, update_data)
+        # Прежний username нужен, чтобы после переименования сбросить его кэш
+        previous = await async_db.get_channel_by_id(channel_id)
+        result = await async_db.update_channel(channel_id, update_data)
+
+        # Username мог измениться - сбрасываем закэшированные сущности канала
+        # под старым и новым именем во всех сессиях
+        parsing_client = get_parsing_client()
+        if parsing_client:
+            usernames = {request.username}
+            if previous and previous.get("username"):
+                usernames.add(previous["username"])
+            for username in usernames:
+                parsing_client.invalidate_channel_cache(username)
 
         return {"message": "Настройки канала обновлены", "channel": result}
 
@@ -2981,7 +3282,7 @@ async def update_channel_settings(channel_id: int, request: ChannelManagementReq
 async def delete_channel(channel_id: int):
     """Удалить канал."""
     try:
-        supabase_manager.delete_channel(channel_id)
+        await async_db.delete_channel(channel_id)
         return {"message": "Канал удален"}
 
     except Exception as e:
@@ -3020,11 +3321,10 @@ async def create_channel(request: ChannelManagementRequest):
 
         # Проверяем, существует ли уже канал с таким username
         clean_username = username.lstrip("@")
-        existing_channel = (
+        existing_channel = await async_db.execute(
             supabase_manager.client.table("channels")
             .select("*")
             .eq("username", clean_username)
-            .execute()
         )
 
         if existing_channel.data and len(existing_channel.data) > 0:
@@ -3041,8 +3341,8 @@ async def create_channel(request: ChannelManagementRequest):
             "parse_frequency_hours": request.parse_frequency_hours,
         }
 
-        result = (
-            supabase_manager.client.table("channels").insert(channel_data).execute()
+        result = await async_db.execute(
+            supabase_manager.client.table("channels").insert(channel_data)
         )
 
         if not result.data or len(result.data) == 0:
@@ -3206,11 +3506,10 @@ async def create_channels_from_user_folder(request: dict):
                 clean_username = username.lstrip("@")
 
                 # Проверяем, существует ли уже канал
-                existing_channel = (
+                existing_channel = await async_db.execute(
                     supabase_manager.client.table("channels")
                     .select("*")
                     .eq("username", clean_username)
-                    .execute()
                 )
 
                 if existing_channel.data and len(existing_channel.data) > 0:
@@ -3228,10 +3527,8 @@ async def create_channels_from_user_folder(request: dict):
                     "parse_frequency_hours": 24,
                 }
 
-                result = (
-                    supabase_manager.client.table("channels")
-                    .insert(channel_data)
-                    .execute()
+                result = await async_db.execute(
+                    supabase_manager.client.table("channels").insert(channel_data)
                 )
 
                 if result.data:
@@ -3334,11 +3631,10 @@ async def create_channels_from_user_channels(request: dict):
                 clean_username = username.lstrip("@")
 
                 # Проверяем, существует ли уже канал
-                existing_channel = (
+                existing_channel = await async_db.execute(
                     supabase_manager.client.table("channels")
                     .select("*")
                     .eq("username", clean_username)
-                    .execute()
                 )
 
                 if existing_channel.data and len(existing_channel.data) > 0:
@@ -3356,10 +3652,8 @@ async def create_channels_from_user_channels(request: dict):
                     "parse_frequency_hours": 24,
                 }
 
-                result = (
-                    supabase_manager.client.table("channels")
-                    .insert(channel_data)
-                    .execute()
+                result = await async_db.execute(
+                    supabase_manager.client.table("channels").insert(channel_data)
                 )
 
                 if result.data:
@@ -3479,11 +3773,10 @@ async def create_channels_from_folder(request: dict):
                 clean_username = username.lstrip("@")
 
                 # Проверяем, существует ли уже канал
-                existing_channel = (
+                existing_channel = await async_db.execute(
                     supabase_manager.client.table("channels")
                     .select("*")
                     .eq("username", clean_username)
-                    .execute()
                 )
 
                 if existing_channel.data and len(existing_channel.data) > 0:
@@ -3501,10 +3794,8 @@ async def create_channels_from_folder(request: dict):
                     "parse_frequency_hours": 24,
                 }
 
-                result = (
-                    supabase_manager.client.table("channels")
-                    .insert(channel_data)
-                    .execute()
+                result = await async_db.execute(
+                    supabase_manager.client.table("channels").insert(channel_data)
                 )
 
                 if result.data:
@@ -3562,21 +3853,31 @@ async def parse_channel_background(
     max_posts: int,
     save_to_db: bool,
     session_id: int,
+    incremental: bool = True,
 ):
     """Фоновая функция для парсинга одного канала."""
     try:
         logger.info(f"Начинаем парсинг канала {channel_username}")
 
+        # Watermark имеет смысл только если новые посты сохраняются в БД
+        min_id = (
+            await async_db.get_channel_watermark(channel_username)
+            if incremental and save_to_db
+            else None
+        )
+
         # Подключаемся к Telegram
         if telegram_available and telegram_analyzer:
             try:
                 await telegram_analyzer.connect()
 
                 # Получаем посты и информацию о канале
-                posts, channel_info = await telegram_analyzer.get_channel_posts(
+                posts, channel_info = await get_parsing_client().get_channel_posts(
                     channel_username=channel_username,
                     days_back=days_back,
                     max_posts=max_posts,
+                    min_id=min_id,
+                    refresh_hours=settings.telegram_metrics_refresh_hours,
                 )
             except Exception as e:
                 logger.warning(
@@ -3593,11 +3894,22 @@ async def parse_channel_background(
 
         # Сохраняем посты в базу данных
         if save_to_db and posts:
-            supabase_manager.save_posts_batch(posts, channel_username, channel_info)
+            saved = await async_db.save_posts_batch(
+                posts, channel_username, channel_info
+            )
+            # Watermark сдвигаем только если сохранены все посты
+            watermark = supabase_manager.saved_watermark(posts, saved)
+            if watermark:
+                await async_db.update_channel_watermark(channel_username, watermark)
+            else:
+                logger.warning(
+                    f"Сохранено {saved}/{len(posts)} постов канала {channel_username}, "
+                    f"watermark не сдвигается"
+                )
 
             # Автоматический расчет метрик виральности
             try:
-                viral_calc_settings = supabase_manager.get_system_setting(
+                viral_calc_settings = await async_db.get_system_setting(
                     "viral_calculation"
                 ) or {"auto_calculate_viral": True, "batch_size": 100}
 
@@ -3612,17 +3924,22 @@ async def parse_channel_background(
 
                     # Проверяем/создаем базовые метрики канала
                     baseline_analyzer = ChannelBaselineAnalyzer(supabase_manager)
-                    baseline = baseline_analyzer.get_channel_baseline(channel_username)
+                    baseline = await async_db.run(
+                        baseline_analyzer.get_channel_baseline, channel_username
+                    )
 
                     if not baseline:
                         logger.info(
                             f"Базовые метрики для канала {channel_username} не найдены, рассчитываем..."
                         )
-                        baseline = baseline_analyzer.calculate_channel_baseline(
-                            channel_username
+                        baseline = await async_db.run(
+                            baseline_analyzer.calculate_channel_baseline,
+                            channel_username,
                         )
                         if baseline:
-                            baseline_analyzer.save_channel_baseline(baseline)
+                            await async_db.run(
+                                baseline_analyzer.save_channel_baseline, baseline
+                            )
                             logger.info(
                                 f"Базовые метрики для канала {channel_username} рассчитаны"
                             )
@@ -3634,23 +3951,14 @@ async def parse_channel_background(
                     if baseline:
                         # Рассчитываем метрики виральности
                         detector = ViralPostDetector(baseline_analyzer)
-                        viral_results = detector.detect_viral_posts(
-                            posts, channel_username
+                        viral_results = await async_db.run(
+                            detector.detect_viral_posts, posts, channel_username
                         )
 
-                        processed_count = 0
-                        for post, result in zip(posts, viral_results):
-                            # Проверяем наличие ID поста
-                            post_id = post.get("id")
-                            if post_id:
-                                if detector.update_post_viral_metrics(
-                                    str(post_id), result
-                                ):
-                                    processed_count += 1
-                            else:
-                                logger.warning(
-                                    f"Пост без ID пропущен: {post.get('message_id', 'unknown')} в канале {channel_username}"
-                                )
+                        write_stats = await async_db.run(
+                            detector.update_posts_viral_metrics, posts, viral_results
+                        )
+                        processed_count = write_stats["updated"]
 
                         logger.info(
                             f"Рассчитаны метрики виральности для {processed_count}/{len(posts)} постов канала {channel_username}"
@@ -3668,7 +3976,7 @@ async def parse_channel_background(
                 )
 
         # Обновляем сессию парсинга
-        supabase_manager.update_parsing_session(
+        await async_db.update_parsing_session(
             session_id,
             {
                 "status": "completed",
@@ -3683,7 +3991,7 @@ async def parse_channel_background(
         logger.error(f"Ошибка парсинга канала {channel_username}: {e}")
 
         # Обновляем статус сессии как failed
-        supabase_manager.update_parsing_session(
+        await async_db.update_parsing_session(
             session_id,
             {
                 "status": "failed",
@@ -3693,189 +4001,247 @@ async def parse_channel_background(
         )
 
 
-async def parse_channels_bulk_background(
-    channels: List[str],
+async def parse_bulk_channel(
+    channel_username: str,
     days_back: int,
     max_posts: int,
     save_to_db: bool,
-    session_id: int,
-):
-    """Фоновая функция для массового парсинга каналов."""
+    telegram_connected: bool,
+    incremental: bool = True,
+) -> Tuple[int, str]:
+    """
+    Парсит один канал в рамках массового парсинга.
+
+    Returns:
+        Кортеж (количество найденных постов, статус "ok" или "error").
+    """
     try:
-        logger.info(f"Начинаем массовый парсинг {len(channels)} каналов")
+        logger.info(f"Парсинг канала {channel_username}")
 
-        total_posts = 0
+        posts = []
+        channel_info = {}
+        # Чтение канала прошло без ошибок (даже если новых постов нет)
+        fetched = False
+
+        # Watermark имеет смысл только если новые посты сохраняются в БД
+        min_id = (
+            await async_db.get_channel_watermark(channel_username)
+            if incremental and save_to_db
+            else None
+        )
 
-        # Подключаемся к Telegram один раз в начале
-        telegram_connected = False
-        if telegram_available and telegram_analyzer:
+        if telegram_connected:
             try:
-                await telegram_analyzer.connect()
-                telegram_connected = True
-                logger.info("Успешно подключено к Telegram для массового парсинга")
+                posts, channel_info = await get_parsing_client().get_channel_posts(
+                    channel_username=channel_username,
+                    days_back=days_back,
+                    max_posts=max_posts,
+                    min_id=min_id,
+                    refresh_hours=settings.telegram_metrics_refresh_hours,
+                )
+                fetched = "error" not in channel_info
             except Exception as e:
-                logger.warning(f"Не удалось подключиться к Telegram: {e}")
-
-        for channel_username in channels:
-            try:
-                logger.info(f"Парсинг канала {channel_username}")
-
+                logger.warning(
+                    f"Ошибка при парсинге {channel_username}: {e}. Используем заглушку."
+                )
                 posts = []
                 channel_info = {}
+        else:
+            # Telegram недоступен, используем заглушку
+            posts = []
+            channel_info = {}
 
-                if telegram_connected:
-                    try:
-                        posts, channel_info = await telegram_analyzer.get_channel_posts(
-                            channel_username=channel_username,
-                            days_back=days_back,
-                            max_posts=max_posts,
-                        )
-                    except Exception as e:
-                        logger.warning(
-                            f"Ошибка при парсинге {channel_username}: {e}. Используем заглушку."
-                        )
-                        posts = []
-                        channel_info = {}
-                else:
-                    # Telegram недоступен, используем заглушку
-                    posts = []
-                    channel_info = {}
+        if save_to_db and posts:
+            saved = await async_db.save_posts_batch(
+                posts, channel_username, channel_info
+            )
+            # Watermark сдвигаем только если сохранены все посты
+            watermark = supabase_manager.saved_watermark(posts, saved)
+            if watermark:
+                await async_db.update_channel_watermark(channel_username, watermark)
+            else:
+                logger.warning(
+                    f"Сохранено {saved}/{len(posts)} постов канала {channel_username}, "
+                    f"watermark не сдвигается"
+                )
 
-                if save_to_db and posts:
-                    supabase_manager.save_posts_batch(
-                        posts, channel_username, channel_info
-                    )
+        # Время последнего парсинга обновляем после каждого успешного чтения,
+        # в том числе без новых постов, иначе канал снова попадет в очередь
+        if save_to_db and fetched:
+            await async_db.update_channel_last_parsed(channel_username)
+            logger.info(
+                f"Обновлено время последнего парсинга для канала {channel_username}"
+            )
 
-                    # Обновляем время последнего парсинга канала
-                    supabase_manager.update_channel_last_parsed(channel_username)
+        if save_to_db and posts:
+            # Автоматический расчет метрик виральности для канала
+            try:
+                viral_calc_settings = await async_db.get_system_setting(
+                    "viral_calculation"
+                ) or {"auto_calculate_viral": True}
+
+                if viral_calc_settings.get("auto_calculate_viral", True):
                     logger.info(
-                        f"Обновлено время последнего парсинга для канала {channel_username}"
+                        f"Автоматический расчет метрик для канала {channel_username}"
                     )
 
-                    # Автоматический расчет метрик виральности для канала
-                    try:
-                        viral_calc_settings = supabase_manager.get_system_setting(
-                            "viral_calculation"
-                        ) or {"auto_calculate_viral": True}
+                    # Проверяем наличие достаточного количества постов.
+                    # При инкрементальном парсинге история канала уже в БД,
+                    # поэтому малое число новых постов не повод перечитывать период
+                    if len(posts) < 3 and not min_id:
+                        logger.info(
+                            f"Недостаточно постов для расчета метрик: {len(posts)} < 3"
+                        )
+                        # Историю догружает отдельная фоновая задача с чекпоинтами,
+                        # базовые метрики рассчитываются по ее завершении
+                        if telegram_connected:
+                            start_channel_backfill(channel_username)
+                        return len(posts), "ok"
+
+                    from src.app.channel_baseline_analyzer import (
+                        ChannelBaselineAnalyzer,
+                    )
+                    from src.app.viral_post_detector import ViralPostDetector
 
-                        if viral_calc_settings.get("auto_calculate_viral", True):
-                            logger.info(
-                                f"Автоматический расчет метрик для канала {channel_username}"
-                            )
+                    baseline_analyzer = ChannelBaselineAnalyzer(
+                        supabase_manager
+                    )
+                    baseline = await async_db.run(
+                        baseline_analyzer.get_channel_baseline, channel_username
+                    )
 
-                            # Проверяем наличие достаточного количества постов
-                            if len(posts) < 3:
-                                logger.info(
-                                    f"Недостаточно постов для расчета метрик: {len(posts)} < 3"
-                                )
-
-                                # Для каналов с малым количеством постов пытаемся расширить период парсинга
-                                if days_back < 14:  # Если парсили менее 14 дней
-                                    logger.info(
-                                        f"Расширяем период парсинга для канала {channel_username} до 30 дней"
-                                    )
-                                    # Повторно парсим с большим периодом
-                                    (
-                                        extended_posts,
-                                        _,
-                                    ) = await telegram_analyzer.get_channel_posts(
-                                        channel_username=channel_username,
-                                        days_back=30,  # Увеличиваем до 30 дней
-                                        max_posts=max_posts
-                                        * 2,  # Увеличиваем лимит постов
-                                    )
-
-                                    if len(extended_posts) >= 3:
-                                        logger.info(
-                                            f"После расширения периода получено {len(extended_posts)} постов"
-                                        )
-                                        posts = extended_posts  # Используем расширенные данные
-                                    else:
-                                        logger.info(
-                                            f"Даже после расширения недостаточно постов: {len(extended_posts)}, пропускаем расчет метрик"
-                                        )
-                                        return
-                                else:
-                                    logger.info(
-                                        f"Период парсинга уже большой ({days_back} дней), пропускаем расчет метрик"
-                                    )
-                                    return
-
-                            from src.app.channel_baseline_analyzer import (
-                                ChannelBaselineAnalyzer,
+                    if not baseline:
+                        # Передаем спарсенные посты для расчета базовых метрик
+                        baseline = await async_db.run(
+                            baseline_analyzer.calculate_channel_baseline,
+                            channel_username,
+                            posts,
+                        )
+                        if baseline:
+                            await async_db.run(
+                                baseline_analyzer.save_channel_baseline, baseline
                             )
-                            from src.app.viral_post_detector import ViralPostDetector
-
-                            baseline_analyzer = ChannelBaselineAnalyzer(
-                                supabase_manager
+                            logger.info(
+                                f"Рассчитаны базовые метрики для канала {channel_username}"
                             )
-                            baseline = baseline_analyzer.get_channel_baseline(
-                                channel_username
+                        else:
+                            logger.warning(
+                                f"Не удалось рассчитать базовые метрики для канала {channel_username}"
                             )
 
-                            if not baseline:
-                                # Передаем спарсенные посты для расчета базовых метрик
-                                baseline = baseline_analyzer.calculate_channel_baseline(
-                                    channel_username, posts
-                                )
-                                if baseline:
-                                    baseline_analyzer.save_channel_baseline(baseline)
-                                    logger.info(
-                                        f"Рассчитаны базовые метрики для канала {channel_username}"
-                                    )
-                                else:
-                                    logger.warning(
-                                        f"Не удалось рассчитать базовые метрики для канала {channel_username}"
-                                    )
-
-                            if baseline:
-                                detector = ViralPostDetector(baseline_analyzer)
-                                viral_results = detector.detect_viral_posts(
-                                    posts, channel_username
-                                )
-                                logger.info(
-                                    f"Рассчитаны вирусные метрики для {len(posts)} постов канала {channel_username}"
-                                )
-                            else:
-                                logger.info(
-                                    f"Пропускаем расчет вирусных метрик для канала {channel_username} (нет базовых метрик)"
-                                )
-                                return
-
-                                processed_count = 0
-                                for post, result in zip(posts, viral_results):
-                                    # Проверяем наличие ID поста
-                                    post_id = post.get("id")
-                                    if post_id:
-                                        if detector.update_post_viral_metrics(
-                                            str(post_id), result
-                                        ):
-                                            processed_count += 1
-                                    else:
-                                        logger.warning(
-                                            f"Пост без ID пропущен: {post.get('message_id', 'unknown')} в канале {channel_username}"
-                                        )
-
-                                viral_count = sum(
-                                    1 for r in viral_results if r.is_viral
-                                )
-                                logger.info(
-                                    f"Канал {channel_username}: {viral_count} viral постов из {len(posts)}"
-                                )
-
-                    except Exception as e:
-                        logger.error(
-                            f"Ошибка расчета метрик для канала {channel_username}: {e}"
+                    if baseline:
+                        detector = ViralPostDetector(baseline_analyzer)
+                        viral_results = await async_db.run(
+                            detector.detect_viral_posts, posts, channel_username
+                        )
+                        write_stats = await async_db.run(
+                            detector.update_posts_viral_metrics, posts, viral_results
+                        )
+                        logger.info(
+                            f"Рассчитаны вирусные метрики для {write_stats['updated']}/{len(posts)} постов канала {channel_username}"
+                        )
+
+                        viral_count = sum(
+                            1 for r in viral_results if r.is_viral
+                        )
+                        logger.info(
+                            f"Канал {channel_username}: {viral_count} viral постов из {len(posts)}"
                         )
+                    else:
+                        logger.info(
+                            f"Пропускаем расчет вирусных метрик для канала {channel_username} (нет базовых метрик)"
+                        )
+                        return len(posts), "ok"
+
+            except Exception as e:
+                logger.error(
+                    f"Ошибка расчета метрик для канала {channel_username}: {e}"
+                )
 
-                total_posts += len(posts)
-                logger.info(f"Канал {channel_username}: найдено {len(posts)} постов")
+        logger.info(f"Канал {channel_username}: найдено {len(posts)} постов")
+        return len(posts), "ok"
 
+    except Exception as e:
+        logger.error(f"Ошибка парсинга канала {channel_username}: {e}")
+        return 0, "error"
+
+
+async def refresh_posts_metrics_background(
+    days_back: int, channels: Optional[List[str]] = None
+):
+    """Фоновая функция для обновления метрик сохраненных постов."""
+    try:
+        from src.app.engagement_refresh import EngagementRefresher
+
+        await telegram_analyzer.connect()
+        refresher = EngagementRefresher(telegram_analyzer, supabase_manager)
+        await refresher.refresh(days_back=days_back, channels=channels)
+    except Exception as e:
+        logger.error(f"Ошибка обновления метрик постов: {e}")
+
+
+async def parse_channels_bulk_background(
+    channels: List[str],
+    days_back: int,
+    max_posts: int,
+    save_to_db: bool,
+    session_id: int,
+    incremental: bool = True,
+):
+    """Фоновая функция для массового парсинга каналов."""
+    try:
+        logger.info(f"Начинаем массовый парсинг {len(channels)} каналов")
+
+        # Подключаемся к Telegram один раз в начале
+        telegram_connected = False
+        if telegram_available and telegram_analyzer:
+            try:
+                await telegram_analyzer.connect()
+                telegram_connected = True
+                logger.info("Успешно подключено к Telegram для массового парсинга")
             except Exception as e:
-                logger.error(f"Ошибка парсинга канала {channel_username}: {e}")
+                logger.warning(f"Не удалось подключиться к Telegram: {e}")
+
+        concurrency = max(1, settings.telegram_parse_concurrency)
+        semaphore = asyncio.Semaphore(concurrency)
+        progress = {
+            "total": len(channels),
+            "done": 0,
+            "posts_found": 0,
+            "channels": {channel: "pending" for channel in channels},
+        }
+        bulk_parsing_progress[session_id] = progress
+
+        async def parse_with_semaphore(channel_username: str) -> int:
+            async with semaphore:
+                progress["channels"][channel_username] = "running"
+                posts_found, status = await parse_bulk_channel(
+                    channel_username,
+                    days_back,
+                    max_posts,
+                    save_to_db,
+                    telegram_connected,
+                    incremental,
+                )
+
+            progress["done"] += 1
+            progress["posts_found"] += posts_found
+            progress["channels"][channel_username] = status
+            logger.info(
+                f"[{progress['done']}/{progress['total']}] Канал {channel_username}: "
+                f"{status}, {posts_found} постов"
+            )
+            return posts_found
+
+        logger.info(f"Параллельный парсинг каналов: до {concurrency} одновременно")
+        results = await asyncio.gather(
+            *(parse_with_semaphore(channel) for channel in channels)
+        )
+        total_posts = sum(results)
 
-        # Отключаемся от Telegram после завершения
-        if telegram_connected and telegram_analyzer:
+        # Отключаемся от Telegram после завершения (клиент нужен планировщику, если он запущен)
+        scheduler_running = parse_scheduler is not None and parse_scheduler.is_running
+        if telegram_connected and telegram_analyzer and not scheduler_running:
             try:
                 await telegram_analyzer.disconnect()
                 logger.info("Отключено от Telegram после массового парсинга")
@@ -3883,7 +4249,7 @@ async def parse_channels_bulk_background(
                 logger.warning(f"Ошибка при отключении от Telegram: {e}")
 
         # Обновляем сессию
-        supabase_manager.update_parsing_session(
+        await async_db.update_parsing_session(
             session_id,
             {
                 "status": "completed",
@@ -3899,7 +4265,7 @@ async def parse_channels_bulk_background(
     except Exception as e:
         logger.error(f"Ошибка массового парсинга: {e}")
 
-        supabase_manager.update_parsing_session(
+        await async_db.update_parsing_session(
             session_id,
             {
                 "status": "failed",
@@ -3907,6 +4273,10 @@ async def parse_channels_bulk_background(
                 "completed_at": datetime.now().isoformat(),
             },
         )
+    finally:
+        progress = bulk_parsing_progress.pop(session_id, None)
+        if progress:
+            finished_bulk_progress.set(session_id, progress)
 
 
 # Эндпоинты для рубрик и форматов
@@ -3914,8 +4284,8 @@ async def parse_channels_bulk_background(
 async def get_rubrics():
     """Получить все рубрики."""
     try:
-        result = (
-            supabase_manager.client.table("rubrics").select("*").order("name").execute()
+        result = await async_db.execute(
+            supabase_manager.client.table("rubrics").select("*").order("name")
         )
 
         if hasattr(result, "error") and result.error:
@@ -3936,11 +4306,8 @@ async def get_rubrics():
 async def get_formats():
     """Получить все форматы."""
     try:
-        result = (
-            supabase_manager.client.table("reel_formats")
-            .select("*")
-            .order("name")
-            .execute()
+        result = await async_db.execute(
+            supabase_manager.client.table("reel_formats").select("*").order("name")
         )
 
         if hasattr(result, "error") and result.error:
@@ -4112,7 +4479,7 @@ async def get_sandbox_posts(limit: int = 50, offset: int = 0):
     try:
         logger.info(f"🧪 SANDBOX: Запрос списка постов (limit={limit}, offset={offset})")
         # Получаем посты из базы данных
-        posts_result = (
+        posts_result = await async_db.execute(
             supabase_manager.client.table("posts")
             .select(
                 "id",
@@ -4129,7 +4496,6 @@ async def get_sandbox_posts(limit: int = 50, offset: int = 0):
             )
             .order("date", desc=True)
             .range(offset, offset + limit - 1)
-            .execute()
         )
 
         posts = []
@@ -4184,7 +4550,7 @@ async def get_sandbox_post(post_id: str):
         channel_username = parts[1]
 
         # Получаем пост из базы данных
-        post_result = (
+        post_result = await async_db.execute(
             supabase_manager.client.table("posts")
             .select(
                 "id",
@@ -4201,7 +4567,6 @@ async def get_sandbox_post(post_id: str):
             )
             .eq("message_id", message_id)
             .eq("channel_username", channel_username)
-            .execute()
         )
 
         if not post_result.data:
@@ -4466,7 +4831,11 @@ async def get_notification_settings(current_user: Optional[str] = Depends(get_cu
         user_id = current_user or "550e8400-e29b-41d4-a716-446655440000"
 
         # Получить настройки из БД
-        settings = supabase_manager.client.table('notification_settings').select('*').eq('user_id', user_id).execute()
+        settings = await async_db.execute(
+            supabase_manager.client.table("notification_settings")
+            .select("*")
+            .eq("user_id", user_id)
+        )
 
         if settings.data:
             return {
@@ -4533,7 +4902,9 @@ async def save_notification_settings(settings: Dict[str, Any], authorization: Op
 
         logger.info(f"Saving data to DB: {data}")
 
-        result = supabase_manager.client.table('notification_settings').upsert(data).execute()
+        result = await async_db.execute(
+            supabase_manager.client.table("notification_settings").upsert(data)
+        )
 
         return {
             "success": True,
@@ -4597,10 +4968,20 @@ async def get_notifications_history(
         user_id = current_user or "550e8400-e29b-41d4-a716-446655440000"
 
         # Получить историю из БД
-        history = supabase_manager.client.table('notification_history').select('*').eq('user_id', user_id).order('sent_at', desc=True).range(offset, offset + limit - 1).execute()
+        history = await async_db.execute(
+            supabase_manager.client.table("notification_history")
+            .select("*")
+            .eq("user_id", user_id)
+            .order("sent_at", desc=True)
+            .range(offset, offset + limit - 1)
+        )
 
         # Получить общее количество
-        count = supabase_manager.client.table('notification_history').select('*', count='exact').eq('user_id', user_id).execute()
+        count = await async_db.execute(
+            supabase_manager.client.table("notification_history")
+            .select("*", count="exact")
+            .eq("user_id", user_id)
+        )
 
         return {
             "success": True,
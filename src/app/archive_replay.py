@@ -0,0 +1,167 @@
+"""
+Воспроизведение архива сообщений через интерфейс TelegramAnalyzer.
+
+ArchiveReplayAnalyzer отдает сообщения из MessageArchive через те же методы,
+что и TelegramAnalyzer (get_messages, get_channel_posts, iter_message_batches),
+поэтому базовые метрики, виральность и формулы скоринга можно пересчитывать
+на месяцах истории без обращения к Telegram, а также измерять пропускную
+способность конвейера офлайн.
+"""
+
+from datetime import datetime
+from types import SimpleNamespace
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from .cache import TTLCache
+from .flood_control import DEFAULT_RATE_LIMITS, RequestGovernor
+from .message_archive import MessageArchive
+from .settings import settings
+from .telegram_client import TelegramAnalyzer
+from .utils import normalize_channel_input, setup_logger
+
+# Настройка логирования
+logger = setup_logger(__name__)
+
+
+def _to_namespace(value: Any) -> Any:
+    """Рекурсивно превращает словари to_dict() в объекты с атрибутами."""
+    if isinstance(value, dict):
+        return SimpleNamespace(**{k: _to_namespace(v) for k, v in value.items()})
+    if isinstance(value, list):
+        return [_to_namespace(item) for item in value]
+    return value
+
+
+def archived_message(raw: Dict[str, Any]) -> SimpleNamespace:
+    """
+    Восстанавливает из записи архива объект, совместимый с Message Telethon
+    в объеме, который использует TelegramAnalyzer._format_message.
+    """
+    message = _to_namespace(raw)
+    message.date = datetime.fromisoformat(raw["date"])
+    # В to_dict() текст хранится в поле "message", у Message есть свойство text
+    message.text = raw.get("message") or ""
+    message.views = raw.get("views")
+    message.forwards = raw.get("forwards")
+    message.reactions = message.reactions if raw.get("reactions") else None
+    message.replies = message.replies if raw.get("replies") else None
+    message.media = message.media if raw.get("media") else None
+    return message
+
+
+class ArchiveClient:
+    """Минимальная замена TelegramClient, читающая данные из архива."""
+
+    def __init__(self, archive: MessageArchive):
+        """
+        Инициализирует клиент архива.
+
+        Args:
+            archive: Архив сообщений.
+        """
+        self.archive = archive
+
+    async def get_entity(self, channel_input: str) -> SimpleNamespace:
+        """Возвращает сущность канала из сохраненной информации о канале."""
+        channel_info = self.archive.load_channel_info(channel_input)
+        if channel_info is None:
+            raise ValueError(f"Канал {channel_input} отсутствует в архиве")
+
+        return SimpleNamespace(
+            id=channel_info.get("id"),
+            title=channel_info.get("title"),
+            username=channel_info.get("username")
+            or normalize_channel_input(channel_input).lstrip("@"),
+            date=channel_info.get("date"),
+            full_info=channel_info,
+        )
+
+    async def __call__(self, request: Any) -> SimpleNamespace:
+        """Отвечает на GetFullChannelRequest данными из архива."""
+        channel_info = getattr(request.channel, "full_info", {}) or {}
+        return SimpleNamespace(
+            full_chat=SimpleNamespace(
+                participants_count=channel_info.get("participants_count", 0),
+                about=channel_info.get("about"),
+            )
+        )
+
+    async def iter_messages(
+        self,
+        entity: SimpleNamespace,
+        limit: Optional[int] = None,
+        offset_id: int = 0,
+        min_id: int = 0,
+    ) -> AsyncIterator[SimpleNamespace]:
+        """Проигрывает сообщения канала от новых к старым, как iter_messages Telethon."""
+        returned = 0
+        for raw in self.archive.iter_messages(entity.username):
+            if offset_id and raw["id"] >= offset_id:
+                continue
+            if min_id and raw["id"] <= min_id:
+                break
+            if limit is not None and returned >= limit:
+                break
+            returned += 1
+            yield archived_message(raw)
+
+    async def get_messages(
+        self, entity: SimpleNamespace, ids: List[int]
+    ) -> List[Optional[SimpleNamespace]]:
+        """Возвращает сообщения по id (None для отсутствующих в архиве)."""
+        wanted = set(ids)
+        found = {}
+        for raw in self.archive.iter_messages(entity.username):
+            if raw["id"] in wanted:
+                found[raw["id"]] = archived_message(raw)
+                if len(found) == len(wanted):
+                    break
+        return [found.get(message_id) for message_id in ids]
+
+    async def disconnect(self) -> None:
+        """Отключаться не от чего."""
+
+
+class ArchiveReplayAnalyzer(TelegramAnalyzer):
+    """
+    TelegramAnalyzer, читающий сообщения из локального архива вместо Telegram.
+
+    Вся логика периода, watermark, пачек и форматирования наследуется без
+    изменений, подменяется только клиент.
+    """
+
+    def __init__(self, archive: Optional[MessageArchive] = None):
+        """
+        Инициализирует анализатор воспроизведения.
+
+        Args:
+            archive: Архив сообщений (по умолчанию из settings.message_archive_dir).
+        """
+        # Намеренно не вызываем TelegramAnalyzer.__init__: ключи API и сессия не нужны
+        self.archive = archive or MessageArchive()
+        self.client = ArchiveClient(self.archive)
+        self.is_connected = True
+        self.api_id = None
+        self.api_hash = None
+        # Архив не ограничивает частоту запросов
+        self.request_governor = RequestGovernor(
+            rate_limits={
+                request_class: (float("inf"), float("inf"))
+                for request_class in DEFAULT_RATE_LIMITS
+            }
+        )
+        # Архив не пишем сам в себя
+        self.message_archive = None
+        self._entity_cache = TTLCache(settings.telegram_entity_cache_ttl)
+        self._channel_info_cache = TTLCache(settings.telegram_info_cache_ttl)
+
+    async def needs_authorization(self) -> bool:
+        """Архиву авторизация не нужна."""
+        return False
+
+    async def connect(self) -> None:
+        """Подключение не требуется."""
+        self.is_connected = True
+
+    async def disconnect(self) -> None:
+        """Отключение не требуется."""
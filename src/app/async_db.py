@@ -0,0 +1,92 @@
+"""
+Асинхронный доступ к Supabase.
+
+Клиент postgrest синхронный: каждый запрос, выполненный прямо в async-коде,
+блокирует event loop вместе со всеми остальными запросами к API. Обертка
+выполняет вызовы SupabaseClient и запросы postgrest в отдельном
+ограниченном пуле потоков, поэтому долгий массовый парсинг или пересчет
+виральности не задерживает остальные эндпоинты.
+"""
+
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+from .settings import settings
+from .supabase_client import SupabaseClient, supabase_client
+from .utils import setup_logger
+
+# Настройка логирования
+logger = setup_logger(__name__)
+
+# Один пул на процесс: его размер ограничивает общее число запросов к БД
+_executor: Optional[ThreadPoolExecutor] = None
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    """Возвращает (создавая при первом вызове) пул потоков для запросов к БД."""
+    global _executor
+
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=max(1, settings.db_thread_pool_size),
+            thread_name_prefix="supabase",
+        )
+    return _executor
+
+
+class AsyncSupabaseClient:
+    """
+    Асинхронная обертка над SupabaseClient.
+
+    Методы SupabaseClient доступны как корутины с тем же именем и аргументами:
+    await async_db.get_channels(). Цепочки postgrest выполняются через
+    await async_db.execute(query) вместо query.execute().
+    """
+
+    def __init__(self, sync_client: SupabaseClient):
+        """
+        Инициализирует обертку.
+
+        Args:
+            sync_client: Синхронный клиент Supabase.
+        """
+        self.sync_client = sync_client
+
+    @property
+    def client(self) -> Any:
+        """Клиент supabase-py для построения запросов."""
+        return self.sync_client.client
+
+    async def run(self, func: Callable[..., Any], *args, **kwargs) -> Any:
+        """Выполняет синхронную функцию в пуле потоков БД."""
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(
+                _get_executor(), functools.partial(func, *args, **kwargs)
+            )
+        except Exception as e:
+            # Сетевые ошибки переводят соединение в нездоровое состояние
+            self.sync_client.mark_query_failed(e)
+            raise
+
+    async def execute(self, query: Any) -> Any:
+        """Выполняет построенный запрос postgrest (аналог query.execute())."""
+        return await self.run(query.execute)
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self.sync_client, name)
+        if not callable(attr):
+            return attr
+
+        async def call(*args, **kwargs):
+            return await self.run(attr, *args, **kwargs)
+
+        call.__name__ = name
+        call.__doc__ = attr.__doc__
+        return call
+
+
+# Глобальный экземпляр для общего клиента
+async_db = AsyncSupabaseClient(supabase_client)
@@ -0,0 +1,205 @@
+"""
+Догрузка истории (backfill) для новых каналов.
+
+Базовым метрикам канала нужна история за baseline_calculation.history_days
+дней. Backfill читает ее крупными страницами в фоне с пониженным
+приоритетом (запросы уступают токены регулятора живому парсингу), сохраняет
+чекпоинт после каждой страницы и после перезапуска продолжает с него.
+"""
+
+import asyncio
+import json
+from typing import Any, Dict, List, Optional
+
+from .async_db import AsyncSupabaseClient
+from .settings import settings
+from .utils import normalize_channel_input, setup_logger
+
+# Настройка логирования
+logger = setup_logger(__name__)
+
+BACKFILL_PENDING = "pending"
+BACKFILL_RUNNING = "running"
+BACKFILL_COMPLETED = "completed"
+BACKFILL_FAILED = "failed"
+
+
+class ChannelBackfill:
+    """Фоновая догрузка истории каналов с чекпоинтами."""
+
+    def __init__(self, telegram_analyzer, supabase_client):
+        """
+        Инициализирует догрузку истории.
+
+        Args:
+            telegram_analyzer: Экземпляр TelegramAnalyzer.
+            supabase_client: Клиент Supabase.
+        """
+        self.telegram_analyzer = telegram_analyzer
+        self.supabase = supabase_client
+        # Запросы к БД из event loop выполняются в пуле потоков
+        self.db = AsyncSupabaseClient(supabase_client)
+        # Каналы, догрузка которых выполняется в этом процессе
+        self._running: set = set()
+
+    async def _history_days(self) -> int:
+        """Глубина истории из настройки baseline_calculation.history_days."""
+        baseline_calculation = await self.db.get_system_setting("baseline_calculation")
+        if isinstance(baseline_calculation, str):
+            try:
+                baseline_calculation = json.loads(baseline_calculation)
+            except ValueError:
+                baseline_calculation = None
+        if isinstance(baseline_calculation, dict):
+            return int(baseline_calculation.get("history_days", 30))
+        return 30
+
+    def is_running(self, channel_username: str) -> bool:
+        """Выполняется ли догрузка канала в этом процессе."""
+        return self._channel_key(channel_username) in self._running
+
+    def _channel_key(self, channel_username: str) -> str:
+        """Канонический username канала (с @)."""
+        return f"@{normalize_channel_input(channel_username).lstrip('@')}"
+
+    async def backfill_channel(
+        self,
+        channel_username: str,
+        history_days: Optional[int] = None,
+        page_size: Optional[int] = None,
+        force: bool = False,
+    ) -> Dict[str, Any]:
+        """
+        Догружает историю канала, продолжая с сохраненного чекпоинта.
+
+        Args:
+            channel_username: Username канала.
+            history_days: Глубина истории в днях (по умолчанию из настроек БД).
+            page_size: Размер страницы (по умолчанию settings.telegram_backfill_page_size).
+            force: Начать заново, даже если догрузка уже завершена.
+
+        Returns:
+            Результат догрузки: статус, количество сохраненных постов, чекпоинт.
+        """
+        channel = self._channel_key(channel_username)
+        if channel in self._running:
+            return {"channel": channel, "status": BACKFILL_RUNNING, "saved": 0}
+        # Занимаем канал до первого await, иначе параллельный вызов пройдет проверку
+        self._running.add(channel)
+
+        checkpoint = await self.db.get_backfill_checkpoint(channel) or {}
+        if checkpoint.get("backfill_status") == BACKFILL_COMPLETED and not force:
+            self._running.discard(channel)
+            logger.info(f"История канала {channel} уже догружена")
+            return {"channel": channel, "status": BACKFILL_COMPLETED, "saved": 0}
+
+        offset_id = 0 if force else checkpoint.get("backfill_offset_id") or 0
+        history_days = history_days or await self._history_days()
+        page_size = page_size or settings.telegram_backfill_page_size
+
+        await self.db.save_backfill_checkpoint(channel, BACKFILL_RUNNING, offset_id)
+        logger.info(
+            f"Backfill канала {channel}: {history_days} дней истории"
+            + (f", продолжаем с сообщения {offset_id}" if offset_id else "")
+        )
+
+        saved = 0
+        channel_info: Dict[str, Any] = {}
+        try:
+            async for batch, channel_info in self.telegram_analyzer.iter_message_batches(
+                channel,
+                days=history_days,
+                limit=settings.telegram_backfill_max_messages,
+                batch_size=page_size,
+                offset_id=offset_id,
+                low_priority=True,
+            ):
+                if batch:
+                    batch_saved = await self.db.save_posts_batch(
+                        batch, channel, channel_info
+                    )
+                    saved += batch_saved
+                    # Несохраненную страницу нельзя пропускать чекпоинтом
+                    if self.supabase.saved_watermark(batch, batch_saved) is None:
+                        raise RuntimeError(
+                            f"сохранено {batch_saved}/{len(batch)} постов страницы"
+                        )
+
+                # Чекпоинт после каждой страницы: после сбоя продолжим отсюда
+                if channel_info.get("offset_id"):
+                    offset_id = channel_info["offset_id"]
+                    await self.db.save_backfill_checkpoint(
+                        channel, BACKFILL_RUNNING, offset_id
+                    )
+
+            if "error" in channel_info:
+                raise RuntimeError(channel_info["error"])
+
+            await self.db.save_backfill_checkpoint(
+                channel, BACKFILL_COMPLETED, offset_id
+            )
+            # Watermark сдвигается только вперед, поэтому повтор после сбоя безопасен
+            await self.db.update_channel_watermark(
+                channel, channel_info.get("last_message_id")
+            )
+            logger.info(f"Backfill канала {channel} завершен: сохранено {saved} постов")
+
+            await self.db.run(self._update_baseline, channel)
+            return {
+                "channel": channel,
+                "status": BACKFILL_COMPLETED,
+                "saved": saved,
+                "offset_id": offset_id,
+            }
+
+        except Exception as e:
+            logger.error(f"Ошибка backfill канала {channel}: {e}")
+            await self.db.save_backfill_checkpoint(channel, BACKFILL_FAILED, offset_id)
+            return {
+                "channel": channel,
+                "status": BACKFILL_FAILED,
+                "saved": saved,
+                "offset_id": offset_id,
+                "error": str(e),
+            }
+        finally:
+            self._running.discard(channel)
+
+    def _update_baseline(self, channel: str) -> None:
+        """Пересчитывает базовые метрики канала по догруженной истории."""
+        try:
+            from .channel_baseline_analyzer import ChannelBaselineAnalyzer
+
+            baseline_analyzer = ChannelBaselineAnalyzer(self.supabase)
+            baseline = baseline_analyzer.calculate_channel_baseline(channel)
+            if baseline:
+                baseline_analyzer.save_channel_baseline(baseline)
+                logger.info(f"Базовые метрики канала {channel} рассчитаны после backfill")
+        except Exception as e:
+            logger.warning(f"Не удалось рассчитать базовые метрики канала {channel}: {e}")
+
+    async def run(
+        self,
+        channels: List[str],
+        history_days: Optional[int] = None,
+        force: bool = False,
+    ) -> List[Dict[str, Any]]:
+        """
+        Догружает историю нескольких каналов по одному (фоновая задача).
+
+        Args:
+            channels: Список каналов.
+            history_days: Глубина истории в днях.
+            force: Начать заново, даже если догрузка уже завершена.
+
+        Returns:
+            Результаты по каналам.
+        """
+        results = []
+        for channel in channels:
+            results.append(
+                await self.backfill_channel(channel, history_days=history_days, force=force)
+            )
+            # Отдаем управление живому парсингу между каналами
+            await asyncio.sleep(0)
+        return results
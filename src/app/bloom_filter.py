@@ -0,0 +1,67 @@
+"""
+Фильтр Блума для быстрой проверки принадлежности к множеству.
+
+Фильтр может ошибиться только в одну сторону: "возможно, есть" для элемента,
+которого нет. Ответ "нет" всегда точный, поэтому фильтр используется как
+предварительная проверка перед запросом к БД.
+"""
+
+import hashlib
+import math
+from typing import Iterable
+
+
+class BloomFilter:
+    """Фильтр Блума на битовом массиве с двойным хэшированием."""
+
+    def __init__(self, capacity: int = 100000, error_rate: float = 0.01):
+        """
+        Инициализирует пустой фильтр.
+
+        Args:
+            capacity: Ожидаемое количество элементов.
+            error_rate: Допустимая доля ложноположительных ответов при capacity элементах.
+        """
+        capacity = max(1, capacity)
+        error_rate = min(max(error_rate, 1e-9), 0.5)
+
+        self.capacity = capacity
+        self.error_rate = error_rate
+        # Оптимальные размер массива и количество хэш-функций
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+        self._count = 0
+
+    def _positions(self, item: str) -> Iterable[int]:
+        """Позиции битов элемента: h1 + i * h2 (Kirsch-Mitzenmacher)."""
+        digest = hashlib.blake2b(str(item).encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "big")
+        h2 = int.from_bytes(digest[8:], "big") | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hash_count))
+
+    def add(self, item: str) -> None:
+        """Добавляет элемент в фильтр."""
+        for position in self._positions(item):
+            self._bits[position >> 3] |= 1 << (position & 7)
+        self._count += 1
+
+    def update(self, items: Iterable[str]) -> None:
+        """Добавляет несколько элементов."""
+        for item in items:
+            self.add(item)
+
+    def __contains__(self, item: str) -> bool:
+        return all(
+            self._bits[position >> 3] & (1 << (position & 7))
+            for position in self._positions(item)
+        )
+
+    def __len__(self) -> int:
+        """Количество добавленных элементов (с учетом повторов)."""
+        return self._count
+
+    def clear(self) -> None:
+        """Очищает фильтр."""
+        self._bits = bytearray(len(self._bits))
+        self._count = 0
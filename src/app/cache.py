@@ -0,0 +1,78 @@
+"""
+Простой in-memory кэш с временем жизни записей (TTL).
+"""
+
+import time
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+# Маркер отсутствующего значения (None может быть валидным значением)
+_MISSING = object()
+
+
+class TTLCache:
+    """Словарь, записи которого устаревают через заданное число секунд."""
+
+    def __init__(self, ttl_seconds: float, max_size: Optional[int] = None):
+        """
+        Инициализирует кэш.
+
+        Args:
+            ttl_seconds: Время жизни записи в секундах.
+            max_size: Максимальное количество записей (None - без ограничения).
+        """
+        self.ttl_seconds = ttl_seconds
+        self.max_size = max_size
+        # Ключ -> (момент устаревания по time.monotonic, значение)
+        self._data: Dict[Hashable, Tuple[float, Any]] = {}
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Возвращает значение по ключу или default, если записи нет или она устарела."""
+        entry = self._data.get(key)
+        if entry is None:
+            return default
+
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._data[key]
+            return default
+
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl_seconds: Optional[float] = None) -> None:
+        """Сохраняет значение (ttl_seconds переопределяет TTL кэша для записи)."""
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        if ttl <= 0:
+            return
+
+        if self.max_size and key not in self._data and len(self._data) >= self.max_size:
+            self._evict()
+
+        self._data[key] = (time.monotonic() + ttl, value)
+
+    def invalidate(self, key: Hashable) -> None:
+        """Удаляет запись по ключу, если она есть."""
+        self._data.pop(key, None)
+
+    def clear(self) -> None:
+        """Очищает кэш."""
+        self._data.clear()
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self.get(key, _MISSING) is not _MISSING
+
+    def __len__(self) -> int:
+        self._purge_expired()
+        return len(self._data)
+
+    def _purge_expired(self) -> None:
+        """Удаляет все устаревшие записи."""
+        now = time.monotonic()
+        for key in [k for k, (expires_at, _) in self._data.items() if expires_at <= now]:
+            del self._data[key]
+
+    def _evict(self) -> None:
+        """Освобождает место: сначала устаревшие записи, затем самая старая."""
+        self._purge_expired()
+        if self.max_size and len(self._data) >= self.max_size:
+            oldest_key = min(self._data, key=lambda k: self._data[k][0])
+            del self._data[oldest_key]
@@ -205,10 +205,6 @@ class ChannelBaselineAnalyzer:
             ChannelBaseline или None если недостаточно данных
         """
         try:
-            logger.info(
-                f"Расчет базовых метрик для канала {channel_username}, получено {len(posts)} постов"
-            )
-
             # Если посты не переданы, получаем из БД
             if posts is None:
                 posts = self._get_channel_posts_history(channel_username)
@@ -218,6 +214,10 @@ class ChannelBaselineAnalyzer:
                 logger.error(f"Не удалось получить посты для канала {channel_username}")
                 return None
 
+            logger.info(
+                f"Расчет базовых метрик для канала {channel_username}, получено {len(posts)} постов"
+            )
+
             if not posts:
                 logger.warning(f"Нет постов для анализа канала {channel_username}")
                 return None
@@ -274,7 +274,7 @@ class ChannelBaselineAnalyzer:
             # Получаем посты за указанный период
             posts = (
                 self.supabase.client.table("posts")
-                .select("*")
+                .select(self.supabase.post_columns("metrics-only"))
                 .eq("channel_username", channel_username)
                 .gte("date", date_threshold)
                 .execute()
@@ -432,6 +432,7 @@ class ChannelBaselineAnalyzer:
                 .upsert(data, on_conflict="channel_username")
                 .execute()
             )
+            self.supabase.invalidate_baselines_cache()
 
             logger.info(
                 f"Сохранены базовые метрики для канала {baseline.channel_username}"
@@ -82,6 +82,16 @@ class CLI:
             "--no-llm", action="store_true",
             help="Отключить использование LLM для генерации сценариев"
         )
+
+        parser.add_argument(
+            "--ingest-only", action="store_true",
+            help="Только потоково загрузить посты каналов в базу данных, без анализа"
+        )
+
+        parser.add_argument(
+            "--replay-archive", type=str, default=None, metavar="DIR",
+            help="Читать сообщения из локального архива вместо Telegram"
+        )
         
         # Заглушка для будущих интеграций
         parser.add_argument(
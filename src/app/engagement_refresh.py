@@ -0,0 +1,150 @@
+"""
+Обновление метрик вовлеченности уже сохраненных постов.
+
+Просмотры, пересылки и реакции растут еще несколько дней после публикации.
+Вместо повторного парсинга истории канала счетчики известных постов
+запрашиваются пачками по message_id, после чего обновляется таблица posts
+и в post_metrics добавляется новый снимок метрик.
+"""
+
+import asyncio
+from typing import Any, Dict, List, Optional, Tuple
+
+from .async_db import AsyncSupabaseClient
+from .metrics import MetricsCalculator
+from .settings import settings
+from .utils import setup_logger
+
+# Настройка логирования
+logger = setup_logger(__name__)
+
+
+class EngagementRefresher:
+    """Обновляет счетчики и снимки метрик для недавних постов."""
+
+    def __init__(
+        self,
+        telegram_analyzer,
+        supabase_client,
+        metrics_calculator: Optional[MetricsCalculator] = None,
+    ):
+        """
+        Инициализирует сервис обновления метрик.
+
+        Args:
+            telegram_analyzer: Экземпляр TelegramAnalyzer.
+            supabase_client: Клиент Supabase.
+            metrics_calculator: Калькулятор метрик (создается, если не передан).
+        """
+        self.telegram_analyzer = telegram_analyzer
+        self.supabase = supabase_client
+        # Запросы к БД из event loop выполняются в пуле потоков
+        self.db = AsyncSupabaseClient(supabase_client)
+        self.metrics_calculator = metrics_calculator or MetricsCalculator()
+
+    async def refresh(
+        self,
+        days_back: int = 7,
+        channels: Optional[List[str]] = None,
+        concurrency: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        """
+        Обновляет метрики постов за последние days_back дней.
+
+        Args:
+            days_back: Возраст постов (в днях), метрики которых обновляются.
+            channels: Список каналов (None - все каналы с недавними постами).
+            concurrency: Количество каналов, обрабатываемых одновременно.
+
+        Returns:
+            Статистика обновления.
+        """
+        posts_by_channel = await self.db.get_posts_for_metrics_refresh(
+            days=days_back, channel_usernames=channels
+        )
+
+        stats = {
+            "channels": len(posts_by_channel),
+            "posts_requested": sum(len(ids) for ids in posts_by_channel.values()),
+            "posts_updated": 0,
+            "snapshots_saved": 0,
+            "errors": [],
+        }
+
+        if not posts_by_channel:
+            logger.info("Нет постов для обновления метрик")
+            return stats
+
+        concurrency = max(1, concurrency or settings.telegram_parse_concurrency)
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def refresh_with_semaphore(channel_username: str, message_ids: List[int]):
+            async with semaphore:
+                return await self._refresh_channel(channel_username, message_ids)
+
+        results = await asyncio.gather(
+            *(
+                refresh_with_semaphore(channel_username, message_ids)
+                for channel_username, message_ids in posts_by_channel.items()
+            )
+        )
+
+        for channel_username, (updated, snapshots, error) in zip(
+            posts_by_channel, results
+        ):
+            stats["posts_updated"] += updated
+            stats["snapshots_saved"] += snapshots
+            if error:
+                stats["errors"].append({"channel": channel_username, "error": error})
+
+        logger.info(
+            f"Обновление метрик завершено: {stats['posts_updated']}/{stats['posts_requested']} постов "
+            f"в {stats['channels']} каналах, снимков: {stats['snapshots_saved']}"
+        )
+        return stats
+
+    async def _refresh_channel(
+        self, channel_username: str, message_ids: List[int]
+    ) -> Tuple[int, int, Optional[str]]:
+        """
+        Обновляет метрики постов одного канала.
+
+        Returns:
+            Кортеж (обновлено постов, сохранено снимков, ошибка или None).
+        """
+        try:
+            counters, channel_info = await self.telegram_analyzer.get_messages_counters(
+                channel_username, message_ids
+            )
+            if not counters:
+                return 0, 0, channel_info.get("error")
+
+            participants_count = channel_info.get("participants_count", 0) or 0
+            for counter in counters:
+                counter["participants_count"] = participants_count
+
+            updated = await self.db.update_posts_counters(channel_username, counters)
+
+            if not channel_username.startswith("@"):
+                channel_username = f"@{channel_username}"
+
+            snapshots = []
+            for counter in counters:
+                metrics = self.metrics_calculator.compute_message_metrics(counter)
+                snapshots.append(
+                    {
+                        "post_id": f"{counter['message_id']}_{channel_username}",
+                        "view_rate": metrics.view_rate,
+                        "reaction_rate": metrics.reaction_rate,
+                        "reply_rate": metrics.reply_rate,
+                        "forward_rate": metrics.forward_rate,
+                        "overall_score": metrics.score,
+                    }
+                )
+            saved = await self.db.save_post_metrics(snapshots)
+
+            return updated, saved, channel_info.get("error")
+
+        except Exception as e:
+            logger.error(f"Ошибка обновления метрик канала {channel_username}: {e}")
+            return 0, 0, str(e)
@@ -4,7 +4,7 @@
 
 import asyncio
 import logging
-from typing import List, Dict, Any, Optional, Tuple
+from typing import Any, Callable, Dict, List, Optional, Tuple
 from datetime import datetime, timedelta
 from tqdm import tqdm
 import pytz
@@ -13,6 +13,7 @@ from .settings import settings
 from .utils import setup_logger, normalize_channel_input
 from .telegram_client import TelegramAnalyzer
 from .supabase_client import supabase_client
+from .async_db import async_db
 
 # Настройка логирования
 logger = setup_logger(__name__)
@@ -20,18 +21,26 @@ logger = setup_logger(__name__)
 class MessageFetcher:
     """Класс для получения сообщений из каналов."""
 
-    def __init__(self):
-        """Инициализирует компонент для получения сообщений."""
-        self.telegram = None
+    def __init__(self, telegram: Optional[TelegramAnalyzer] = None):
+        """
+        Инициализирует компонент для получения сообщений.
+
+        Args:
+            telegram: Источник сообщений (например, ArchiveReplayAnalyzer).
+                По умолчанию создается TelegramAnalyzer.
+        """
+        self.telegram = telegram
         self.db_enabled = supabase_client.is_connected()
         if self.db_enabled:
             logger.info("Database integration enabled")
+            supabase_client.warm_processed_filter()
         else:
             logger.warning("Database integration disabled - running without Supabase")
     
     async def __aenter__(self) -> "MessageFetcher":
         """Контекстный менеджер: вход."""
-        self.telegram = TelegramAnalyzer()
+        if not self.telegram:
+            self.telegram = TelegramAnalyzer()
         await self.telegram.connect()
         return self
     
@@ -44,7 +53,9 @@ class MessageFetcher:
         self,
         channels: List[str],
         days: int = 7,
-        limit: int = 100
+        limit: int = 100,
+        concurrency: Optional[int] = None,
+        progress_callback: Optional[Callable[[Dict[str, Any]], None]] = None
     ) -> List[Dict[str, Any]]:
         """
         Получает данные из всех указанных каналов.
@@ -53,6 +64,10 @@ class MessageFetcher:
             channels: Список каналов (имена или URL).
             days: Количество дней для анализа.
             limit: Максимальное количество сообщений для загрузки из канала.
+            concurrency: Сколько каналов обрабатывать одновременно
+                (по умолчанию settings.telegram_parse_concurrency).
+            progress_callback: Вызывается после обработки каждого канала
+                со словарем прогресса (channel, status, messages, done, total).
 
         Returns:
             Список сообщений со всех каналов.
@@ -70,49 +85,44 @@ class MessageFetcher:
             self.telegram = TelegramAnalyzer()
             await self.telegram.connect()
 
-        # Обрабатываем каждый канал
-        for channel in tqdm(channels, desc="Обработка каналов"):
-            try:
-                # Нормализуем входные данные канала
-                normalized_channel = normalize_channel_input(channel)
-
-                logger.info(f"Получение данных из канала: {normalized_channel}")
-
-                # Обновляем время последнего парсинга в БД
-                if self.db_enabled:
-                    supabase_client.upsert_channel(normalized_channel)
-                    supabase_client.update_channel_last_parsed(normalized_channel)
-
-                # Получаем сообщения из канала
-                channel_messages, channel_info = await self.telegram.get_messages(
-                    normalized_channel,
-                    days=days,
-                    limit=limit
-                )
+        concurrency = max(1, concurrency or settings.telegram_parse_concurrency)
+        semaphore = asyncio.Semaphore(concurrency)
+        progress = {"done": 0, "total": len(channels)}
+        progress_bar = tqdm(total=len(channels), desc="Обработка каналов")
 
-                # Если возникла ошибка, переходим к следующему каналу
-                if "error" in channel_info and not channel_messages:
-                    logger.error(f"Ошибка при получении данных из канала {normalized_channel}: {channel_info['error']}")
-                    continue
+        async def fetch_with_semaphore(channel: str) -> List[Dict[str, Any]]:
+            async with semaphore:
+                channel_messages, status = await self._fetch_channel(channel, days, limit)
 
-                # Фильтруем дубликаты если есть БД
-                if self.db_enabled:
-                    filtered_messages = []
-                    for msg in channel_messages:
-                        if not supabase_client.is_post_processed(msg['message_id'], normalized_channel):
-                            filtered_messages.append(msg)
-                        else:
-                            logger.debug(f"Post {msg['message_id']} from {normalized_channel} already processed, skipping")
-                    channel_messages = filtered_messages
-                    logger.info(f"После фильтрации дубликатов: {len(channel_messages)} новых сообщений")
+            progress["done"] += 1
+            progress_bar.update(1)
+            logger.info(
+                f"[{progress['done']}/{progress['total']}] Канал {channel}: "
+                f"{status}, {len(channel_messages)} сообщений"
+            )
+            if progress_callback:
+                try:
+                    progress_callback({
+                        "channel": channel,
+                        "status": status,
+                        "messages": len(channel_messages),
+                        "done": progress["done"],
+                        "total": progress["total"],
+                    })
+                except Exception as e:
+                    logger.warning(f"Ошибка в обработчике прогресса: {e}")
+            return channel_messages
 
-                # Добавляем сообщения из канала в общий список
-                all_messages.extend(channel_messages)
+        logger.info(f"Обработка {len(channels)} каналов, параллельно до {concurrency}")
+        try:
+            results = await asyncio.gather(
+                *(fetch_with_semaphore(channel) for channel in channels)
+            )
+        finally:
+            progress_bar.close()
 
-                logger.info(f"Получено {len(channel_messages)} сообщений из канала {normalized_channel}")
-
-            except Exception as e:
-                logger.error(f"Ошибка при получении данных из канала {channel}: {e}")
+        for channel_messages in results:
+            all_messages.extend(channel_messages)
 
         # Конвертируем даты из UTC в локальный часовой пояс
         timezone = settings.tz
@@ -141,10 +151,216 @@ class MessageFetcher:
 
         # Сохраняем посты в базу данных
         if self.db_enabled and all_messages:
-            saved_count = supabase_client.save_posts_batch(all_messages)
+            saved_count = await async_db.save_posts_batch(all_messages)
             logger.info(f"Сохранено {saved_count} постов в базу данных")
 
         # Сортируем сообщения по дате (сначала новые)
         all_messages.sort(key=lambda x: x["date"], reverse=True)
 
         return all_messages
+
+    async def _fetch_channel(
+        self,
+        channel: str,
+        days: int,
+        limit: int
+    ) -> Tuple[List[Dict[str, Any]], str]:
+        """
+        Получает новые сообщения одного канала.
+
+        Args:
+            channel: Имя канала или URL.
+            days: Количество дней для анализа.
+            limit: Максимальное количество сообщений для загрузки.
+
+        Returns:
+            Кортеж из списка сообщений и статуса обработки ("ok" или "error").
+        """
+        try:
+            # Нормализуем входные данные канала
+            normalized_channel = normalize_channel_input(channel)
+
+            logger.info(f"Получение данных из канала: {normalized_channel}")
+
+            # Обновляем время последнего парсинга в БД
+            if self.db_enabled:
+                await async_db.upsert_channel(normalized_channel)
+                await async_db.update_channel_last_parsed(normalized_channel)
+
+            # Получаем сообщения из канала
+            channel_messages, channel_info = await self.telegram.get_messages(
+                normalized_channel,
+                days=days,
+                limit=limit
+            )
+
+            # Если возникла ошибка, переходим к следующему каналу
+            if "error" in channel_info and not channel_messages:
+                logger.error(f"Ошибка при получении данных из канала {normalized_channel}: {channel_info['error']}")
+                return [], "error"
+
+            # Фильтруем дубликаты если есть БД
+            if self.db_enabled:
+                processed_ids = await async_db.get_processed_message_ids(
+                    normalized_channel,
+                    [msg['message_id'] for msg in channel_messages]
+                )
+                channel_messages = [
+                    msg for msg in channel_messages
+                    if msg['message_id'] not in processed_ids
+                ]
+                logger.info(f"После фильтрации дубликатов: {len(channel_messages)} новых сообщений")
+
+            logger.info(f"Получено {len(channel_messages)} сообщений из канала {normalized_channel}")
+            return channel_messages, "ok"
+
+        except Exception as e:
+            logger.error(f"Ошибка при получении данных из канала {channel}: {e}")
+            return [], "error"
+
+    async def ingest_channels(
+        self,
+        channels: List[str],
+        days: int = 7,
+        limit: int = 100,
+        batch_size: Optional[int] = None,
+        concurrency: Optional[int] = None,
+        progress_callback: Optional[Callable[[Dict[str, Any]], None]] = None
+    ) -> Dict[str, int]:
+        """
+        Потоково загружает сообщения каналов в базу данных.
+
+        В отличие от fetch_channels_data, сообщения не накапливаются в памяти:
+        каждая пачка из iter_message_batches сразу сохраняется через
+        save_posts_batch.
+
+        Args:
+            channels: Список каналов (имена или URL).
+            days: Количество дней для анализа.
+            limit: Максимальное количество сообщений для загрузки из канала.
+            batch_size: Размер пачки (по умолчанию settings.telegram_ingest_batch_size).
+            concurrency: Сколько каналов обрабатывать одновременно
+                (по умолчанию settings.telegram_parse_concurrency).
+            progress_callback: Вызывается после сохранения каждой пачки
+                со словарем прогресса (channel, saved, done, total).
+
+        Returns:
+            Словарь {канал: количество сохраненных постов}.
+        """
+
+        if not self.db_enabled:
+            logger.error("Потоковая загрузка требует подключения к базе данных")
+            return {}
+
+        if not channels:
+            logger.error("Список каналов пуст")
+            return {}
+
+        # Инициализируем клиент Telegram, если еще не сделано
+        if not self.telegram:
+            self.telegram = TelegramAnalyzer()
+            await self.telegram.connect()
+
+        concurrency = max(1, concurrency or settings.telegram_parse_concurrency)
+        semaphore = asyncio.Semaphore(concurrency)
+        progress = {"done": 0, "total": len(channels)}
+
+        async def ingest_with_semaphore(channel: str) -> int:
+            async with semaphore:
+                saved = await self._ingest_channel(
+                    channel, days, limit, batch_size, progress, progress_callback
+                )
+            progress["done"] += 1
+            logger.info(
+                f"[{progress['done']}/{progress['total']}] Канал {channel}: сохранено {saved} постов"
+            )
+            return saved
+
+        logger.info(f"Потоковая загрузка {len(channels)} каналов, параллельно до {concurrency}")
+        results = await asyncio.gather(
+            *(ingest_with_semaphore(channel) for channel in channels)
+        )
+
+        saved_by_channel = dict(zip(channels, results))
+        logger.info(
+            f"Всего сохранено {sum(results)} постов из {len(channels)} каналов"
+        )
+        return saved_by_channel
+
+    async def _ingest_channel(
+        self,
+        channel: str,
+        days: int,
+        limit: int,
+        batch_size: Optional[int],
+        progress: Dict[str, int],
+        progress_callback: Optional[Callable[[Dict[str, Any]], None]] = None
+    ) -> int:
+        """
+        Потоково загружает один канал в базу данных.
+
+        Returns:
+            Количество сохраненных постов.
+        """
+        normalized_channel = normalize_channel_input(channel)
+        saved = 0
+        # Watermark можно сдвинуть, только если все пачки сохранены целиком
+        all_saved = True
+        watermark = None
+
+        try:
+            await async_db.upsert_channel(normalized_channel)
+            min_id = await async_db.get_channel_watermark(normalized_channel)
+
+            channel_info: Dict[str, Any] = {}
+            async for batch, channel_info in self.telegram.iter_message_batches(
+                normalized_channel,
+                days=days,
+                limit=limit,
+                batch_size=batch_size,
+                min_id=min_id,
+                refresh_hours=settings.telegram_metrics_refresh_hours,
+            ):
+                if not batch:
+                    continue
+
+                batch_saved = await async_db.save_posts_batch(
+                    batch, normalized_channel, channel_info
+                )
+                saved += batch_saved
+                batch_watermark = supabase_client.saved_watermark(batch, batch_saved)
+                if batch_watermark is None:
+                    all_saved = False
+                else:
+                    watermark = max(watermark or 0, batch_watermark)
+                if progress_callback:
+                    try:
+                        progress_callback({
+                            "channel": channel,
+                            "saved": saved,
+                            "done": progress["done"],
+                            "total": progress["total"],
+                        })
+                    except Exception as e:
+                        logger.warning(f"Ошибка в обработчике прогресса: {e}")
+
+            if "error" in channel_info:
+                logger.error(
+                    f"Ошибка при загрузке канала {normalized_channel}: {channel_info['error']}"
+                )
+                return saved
+
+            # Watermark сдвигаем только после успешной загрузки и сохранения
+            # всего канала и не дальше последнего сохраненного сообщения
+            if all_saved:
+                await async_db.update_channel_watermark(normalized_channel, watermark)
+            else:
+                logger.warning(
+                    f"Не все посты канала {normalized_channel} сохранены, watermark не сдвигается"
+                )
+            await async_db.update_channel_last_parsed(normalized_channel)
+            return saved
+
+        except Exception as e:
+            logger.error(f"Ошибка при потоковой загрузке канала {channel}: {e}")
+            return saved
@@ -0,0 +1,281 @@
+"""
+Общий регулятор запросов к Telegram с учетом FloodWait.
+
+Telegram ограничивает частоту запросов отдельно по типам методов, поэтому
+для каждого класса запросов ведется свой token bucket: параллельные задачи
+встают в очередь за токеном, а не упираются в лимит каждая по отдельности.
+
+FloodWait, полученный на один класс запросов, ставит на паузу этот класс
+на указанное Telegram время, а все остальные классы - на короткий общий
+backoff: аккаунт уже близок к лимиту, и продолжать в том же темпе рискованно.
+"""
+
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from telethon.errors import FloodWaitError
+
+from .settings import settings
+from .utils import setup_logger
+
+# Настройка логирования
+logger = setup_logger(__name__)
+
+# Классы запросов Telethon, которые ограничиваются независимо
+REQUEST_CLASS_ENTITY = "entity"  # get_entity / ResolveUsername
+REQUEST_CLASS_FULL_CHANNEL = "full_channel"  # GetFullChannelRequest
+REQUEST_CLASS_HISTORY = "history"  # iter_messages / GetHistory / GetMessages
+REQUEST_CLASS_FOLDERS = "folders"  # диалоги и папки
+
+# Лимиты по умолчанию: (запросов в секунду, размер всплеска)
+DEFAULT_RATE_LIMITS = {
+    REQUEST_CLASS_ENTITY: (0.2, 5),
+    REQUEST_CLASS_FULL_CHANNEL: (0.5, 5),
+    REQUEST_CLASS_HISTORY: (2.0, 10),
+    REQUEST_CLASS_FOLDERS: (0.2, 2),
+}
+
+
+class TokenBucket:
+    """Token bucket: rate токенов в секунду, не больше capacity в запасе."""
+
+    def __init__(self, rate: float, capacity: float):
+        """
+        Инициализирует полный bucket.
+
+        Args:
+            rate: Скорость пополнения (токенов в секунду).
+            capacity: Максимальное количество токенов (размер всплеска).
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        """Пополняет bucket за время, прошедшее с прошлого обновления."""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    async def acquire(self, reserve: float = 0) -> float:
+        """
+        Забирает один токен, ожидая его появления.
+
+        Args:
+            reserve: Сколько токенов оставлять нетронутыми для обычных задач.
+                Задачи с резервом (фоновые) получают токен, только когда
+                в bucket есть запас, и не занимают очередь обычных задач.
+
+        Returns:
+            Время ожидания в секундах.
+        """
+        waited = 0.0
+        # Резерв больше емкости bucket никогда не наберется
+        reserve = min(reserve, max(self.capacity - 1, 0))
+        if reserve > 0:
+            while True:
+                self._refill()
+                if self.tokens >= 1 + reserve:
+                    self.tokens -= 1
+                    return waited
+
+                delay = (1 + reserve - self.tokens) / self.rate
+                await asyncio.sleep(delay)
+                waited += delay
+
+        # Lock выстраивает ожидающих в очередь по порядку
+        async with self._lock:
+            while True:
+                self._refill()
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return waited
+
+                delay = (1 - self.tokens) / self.rate
+                await asyncio.sleep(delay)
+                waited += delay
+
+
+class RequestGovernor:
+    """Общий для всех задач регулятор запросов к Telegram."""
+
+    def __init__(
+        self,
+        rate_limits: Optional[Dict[str, tuple]] = None,
+        global_backoff_seconds: Optional[float] = None,
+        max_flood_wait: Optional[float] = None,
+        max_retries: Optional[int] = None,
+    ):
+        """
+        Инициализирует регулятор.
+
+        Args:
+            rate_limits: Лимиты по классам запросов {класс: (запросов/сек, всплеск)}.
+            global_backoff_seconds: Пауза для всех классов после любого FloodWait.
+            max_flood_wait: FloodWait длиннее этого значения не пережидается,
+                а пробрасывается вызывающему коду.
+            max_retries: Количество повторов запроса после FloodWait.
+        """
+        limits = dict(DEFAULT_RATE_LIMITS)
+        limits.update(settings.telegram_rate_limits)
+        limits.update(rate_limits or {})
+        self._buckets = {
+            request_class: TokenBucket(rate, capacity)
+            for request_class, (rate, capacity) in limits.items()
+        }
+
+        self.global_backoff_seconds = (
+            settings.telegram_global_backoff_seconds
+            if global_backoff_seconds is None
+            else global_backoff_seconds
+        )
+        self.max_flood_wait = (
+            settings.telegram_max_flood_wait if max_flood_wait is None else max_flood_wait
+        )
+        self.max_retries = (
+            settings.telegram_flood_retries if max_retries is None else max_retries
+        )
+
+        # Класс запросов -> момент (time.monotonic), до которого он на паузе
+        self._paused_until: Dict[str, float] = {}
+        self._global_paused_until = 0.0
+
+        # Статистика по классам запросов
+        self._metrics: Dict[str, Dict[str, float]] = {}
+
+    def _get_metrics(self, request_class: str) -> Dict[str, float]:
+        """Возвращает (создавая при необходимости) статистику класса запросов."""
+        return self._metrics.setdefault(
+            request_class,
+            {
+                "requests": 0,
+                "throttle_wait_seconds": 0.0,
+                "flood_waits": 0,
+                "flood_wait_seconds": 0.0,
+                "pause_wait_seconds": 0.0,
+            },
+        )
+
+    def pause(self, request_class: str, seconds: float) -> None:
+        """
+        Ставит класс запросов на паузу, а остальные классы - на общий backoff.
+
+        Args:
+            request_class: Класс запросов, получивший FloodWaitError.
+            seconds: Длительность паузы из FloodWaitError.seconds.
+        """
+        now = time.monotonic()
+        until = now + max(seconds, 0)
+        # Если пауза уже стоит дольше, не сокращаем ее
+        if until > self._paused_until.get(request_class, 0):
+            self._paused_until[request_class] = until
+            logger.warning(
+                f"Класс запросов '{request_class}' на паузе {seconds} секунд (FloodWait)"
+            )
+
+        global_until = now + min(max(seconds, 0), self.global_backoff_seconds)
+        if global_until > self._global_paused_until:
+            self._global_paused_until = global_until
+
+        metrics = self._get_metrics(request_class)
+        metrics["flood_waits"] += 1
+        metrics["flood_wait_seconds"] += max(seconds, 0)
+
+    def remaining(self, request_class: str) -> float:
+        """Возвращает, сколько секунд еще длится пауза класса запросов."""
+        paused_until = max(
+            self._paused_until.get(request_class, 0), self._global_paused_until
+        )
+        return max(paused_until - time.monotonic(), 0)
+
+    async def wait_ready(self, request_class: str) -> None:
+        """Ожидает окончания паузы класса запросов, если она установлена."""
+        # Пауза может продлиться, пока мы спим, поэтому проверяем в цикле
+        while True:
+            delay = self.remaining(request_class)
+            if delay <= 0:
+                return
+            await asyncio.sleep(delay)
+            self._get_metrics(request_class)["pause_wait_seconds"] += delay
+
+    async def acquire(self, request_class: str, reserve: float = 0) -> None:
+        """
+        Дожидается разрешения на один запрос класса.
+
+        Args:
+            request_class: Класс запросов.
+            reserve: Сколько токенов оставить другим задачам (для фоновых задач).
+        """
+        await self.wait_ready(request_class)
+
+        bucket = self._buckets.get(request_class)
+        metrics = self._get_metrics(request_class)
+        if bucket:
+            metrics["throttle_wait_seconds"] += await bucket.acquire(reserve)
+        metrics["requests"] += 1
+
+    def check_flood_wait(self, request_class: str, error: FloodWaitError, attempt: int) -> None:
+        """
+        Регистрирует FloodWait и решает, можно ли повторить запрос.
+
+        Raises:
+            FloodWaitError: Если пауза длиннее max_flood_wait или исчерпаны повторы.
+        """
+        self.pause(request_class, error.seconds)
+        if error.seconds > self.max_flood_wait or attempt >= self.max_retries:
+            logger.error(
+                f"FloodWait {error.seconds} секунд для '{request_class}' "
+                f"(попытка {attempt + 1}), запрос не повторяется"
+            )
+            raise error
+
+    async def call(
+        self,
+        request_class: str,
+        func: Callable[..., Awaitable[Any]],
+        *args,
+        **kwargs,
+    ) -> Any:
+        """
+        Выполняет запрос к Telegram с ограничением частоты и повтором после FloodWait.
+
+        Args:
+            request_class: Класс запросов.
+            func: Асинхронная функция Telethon (например, client.get_entity или client).
+            *args: Позиционные аргументы функции.
+            **kwargs: Именованные аргументы функции.
+
+        Returns:
+            Результат функции.
+
+        Raises:
+            FloodWaitError: Если пауза длиннее max_flood_wait или исчерпаны повторы.
+        """
+        attempt = 0
+        while True:
+            await self.acquire(request_class)
+            try:
+                return await func(*args, **kwargs)
+            except FloodWaitError as e:
+                self.check_flood_wait(request_class, e, attempt)
+                attempt += 1
+
+    def get_status(self) -> Dict[str, Any]:
+        """Возвращает активные паузы и статистику ожидания по классам запросов."""
+        return {
+            "paused": {
+                request_class: round(self.remaining(request_class), 1)
+                for request_class in set(self._paused_until) | set(self._buckets)
+                if self.remaining(request_class) > 0
+            },
+            "metrics": {
+                request_class: {
+                    key: round(value, 2) if isinstance(value, float) else value
+                    for key, value in metrics.items()
+                }
+                for request_class, metrics in self._metrics.items()
+            },
+        }
@@ -15,6 +15,7 @@ from .rubric_selector_processor import RubricSelectorProcessor
 from ..settings import settings
 from ..price_monitor import price_monitor
 from ..utils import setup_logger
+from ..async_db import async_db
 from ..supabase_client import supabase_client
 from ..prompts import prompt_manager
 
@@ -753,7 +754,9 @@ class LLMOrchestrator:
         try:
             if supabase_client.is_connected():
                 # Получаем рубрики из Supabase
-                result = supabase_client.client.table('rubrics').select('*').eq('is_active', True).execute()
+                result = await async_db.execute(
+                    supabase_client.client.table('rubrics').select('*').eq('is_active', True)
+                )
                 return result.data or []
             else:
                 # Заглушка для тестирования
@@ -771,7 +774,9 @@ class LLMOrchestrator:
         try:
             if supabase_client.is_connected():
                 # Получаем форматы из Supabase
-                result = supabase_client.client.table('reel_formats').select('*').eq('is_active', True).execute()
+                result = await async_db.execute(
+                    supabase_client.client.table('reel_formats').select('*').eq('is_active', True)
+                )
                 return result.data or []
             else:
                 # Заглушка для тестирования
@@ -1070,7 +1075,7 @@ class LLMOrchestrator:
                                 "stage": stage.stage_name
                             })
 
-                            supabase_client.save_token_usage(token_data)
+                            await async_db.save_token_usage(token_data)
 
                         # Сохраняем анализ
                         # Debug: Логируем сохранение анализа
@@ -1080,7 +1085,7 @@ class LLMOrchestrator:
                             "stage": stage.stage_name
                         })
 
-                        if supabase_client.save_post_analysis(analysis_data):
+                        if await async_db.save_post_analysis(analysis_data):
                             saved_analyses += 1
 
                 # Сохраняем сценарии
@@ -1115,7 +1120,7 @@ class LLMOrchestrator:
                         "post_id": result.post_id
                     })
 
-                    if supabase_client.save_scenarios(scenarios_data):
+                    if await async_db.save_scenarios(scenarios_data):
                         saved_scenarios += len(scenarios_data)
 
             logger.info(f"Сохранено в БД: {saved_analyses} анализов, {saved_scenarios} сценариев")
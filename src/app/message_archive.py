@@ -0,0 +1,147 @@
+"""
+Локальный архив сырых сообщений Telegram.
+
+Сообщения сохраняются до форматирования (message.to_dict()) в gzip JSONL,
+разбитые по каналам и датам: <archive_dir>/<канал>/<YYYY-MM-DD>.jsonl.gz.
+Воспроизведение архива - в модуле archive_replay.
+"""
+
+import base64
+import gzip
+import json
+from datetime import date, datetime
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Union
+
+from .settings import settings
+from .utils import normalize_channel_input, setup_logger
+
+# Настройка логирования
+logger = setup_logger(__name__)
+
+CHANNEL_INFO_FILE = "channel.json"
+
+
+def _json_default(value: Any) -> Any:
+    """Сериализация типов, которые возвращает TLObject.to_dict()."""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, bytes):
+        return base64.b64encode(value).decode("ascii")
+    return str(value)
+
+
+class MessageArchive:
+    """Архив сырых сообщений, разбитый по каналам и датам."""
+
+    def __init__(self, base_dir: Optional[Union[str, Path]] = None):
+        """
+        Инициализирует архив.
+
+        Args:
+            base_dir: Каталог архива (по умолчанию settings.message_archive_dir).
+        """
+        self.base_dir = Path(base_dir or settings.message_archive_dir)
+
+    def _channel_dir(self, channel_username: str) -> Path:
+        """Каталог канала (username без @ в нижнем регистре)."""
+        key = normalize_channel_input(channel_username).lstrip("@").lower()
+        return self.base_dir / key
+
+    def save_channel_info(self, channel_username: str, channel_info: Dict[str, Any]) -> None:
+        """Сохраняет информацию о канале (перезаписывает предыдущую)."""
+        channel_dir = self._channel_dir(channel_username)
+        channel_dir.mkdir(parents=True, exist_ok=True)
+        with open(channel_dir / CHANNEL_INFO_FILE, "w", encoding="utf-8") as f:
+            json.dump(channel_info, f, ensure_ascii=False, default=_json_default)
+
+    def load_channel_info(self, channel_username: str) -> Optional[Dict[str, Any]]:
+        """Загружает информацию о канале или None, если канала нет в архиве."""
+        path = self._channel_dir(channel_username) / CHANNEL_INFO_FILE
+        if not path.exists():
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def append(self, channel_username: str, messages: List[Any]) -> int:
+        """
+        Дописывает сырые сообщения в архив.
+
+        Args:
+            channel_username: Username канала.
+            messages: Сообщения Telethon (или словари в формате to_dict()).
+
+        Returns:
+            Количество записанных сообщений.
+        """
+        if not messages:
+            return 0
+
+        # Группируем по дате публикации, чтобы открыть каждый файл один раз
+        by_day: Dict[str, List[str]] = {}
+        for message in messages:
+            raw = message.to_dict() if hasattr(message, "to_dict") else message
+            message_date = raw.get("date")
+            if isinstance(message_date, str):
+                message_date = datetime.fromisoformat(message_date)
+            day = message_date.date().isoformat()
+            by_day.setdefault(day, []).append(
+                json.dumps(raw, ensure_ascii=False, default=_json_default)
+            )
+
+        channel_dir = self._channel_dir(channel_username)
+        channel_dir.mkdir(parents=True, exist_ok=True)
+        for day, lines in by_day.items():
+            # Режим "at" дописывает новый gzip-член, файл остается валидным
+            with gzip.open(channel_dir / f"{day}.jsonl.gz", "at", encoding="utf-8") as f:
+                f.write("\n".join(lines) + "\n")
+
+        return len(messages)
+
+    def list_channels(self) -> List[str]:
+        """Возвращает список каналов в архиве."""
+        if not self.base_dir.exists():
+            return []
+        return sorted(path.name for path in self.base_dir.iterdir() if path.is_dir())
+
+    def iter_messages(
+        self,
+        channel_username: str,
+        since: Optional[date] = None,
+        until: Optional[date] = None,
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Читает сообщения канала от новых к старым.
+
+        Если сообщение записано несколько раз (повторный парсинг), берется
+        последняя запись - с самыми свежими счетчиками.
+
+        Args:
+            channel_username: Username канала.
+            since: Самая ранняя дата (включительно).
+            until: Самая поздняя дата (включительно).
+
+        Yields:
+            Словари сообщений в формате to_dict().
+        """
+        channel_dir = self._channel_dir(channel_username)
+        if not channel_dir.exists():
+            return
+
+        day_files = sorted(channel_dir.glob("*.jsonl.gz"), reverse=True)
+        for day_file in day_files:
+            day = date.fromisoformat(day_file.name.split(".")[0])
+            if until and day > until:
+                continue
+            if since and day < since:
+                break
+
+            messages: Dict[int, Dict[str, Any]] = {}
+            with gzip.open(day_file, "rt", encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        raw = json.loads(line)
+                        messages[raw["id"]] = raw
+
+            for message_id in sorted(messages, reverse=True):
+                yield messages[message_id]
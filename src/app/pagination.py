@@ -0,0 +1,76 @@
+"""
+Keyset-пагинация для запросов PostgREST.
+
+Вместо offset страница начинается после последней строки предыдущей страницы:
+(значение поля сортировки, id). Стоимость запроса не зависит от номера
+страницы, а вставка новых постов не сдвигает уже показанные строки.
+
+Курсор - base64 от JSON {"v": значение поля сортировки, "id": id строки}.
+NULL в поле сортировки учитывается по правилам PostgreSQL: при сортировке
+по возрастанию NULL идут последними, по убыванию - первыми.
+"""
+
+import base64
+import json
+from typing import Any, Dict, Optional, Tuple
+
+
+def encode_cursor(row: Dict[str, Any], sort_by: str) -> str:
+    """Курсор, указывающий на строку row."""
+    payload = json.dumps({"v": row.get(sort_by), "id": row["id"]}, default=str)
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> Tuple[Any, str]:
+    """
+    Разбирает курсор.
+
+    Returns:
+        Кортеж (значение поля сортировки, id строки).
+
+    Raises:
+        ValueError: Если курсор поврежден.
+    """
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return payload["v"], payload["id"]
+    except Exception as e:
+        raise ValueError(f"Некорректный курсор: {e}")
+
+
+def quote_filter_value(value: Any) -> str:
+    """Значение для фильтра PostgREST (кавычки защищают запятые и скобки)."""
+    text = str(value).replace("\\", "\\\\").replace('"', '\\"')
+    return f'"{text}"'
+
+
+def keyset_filter(sort_by: str, desc: bool, value: Any, last_id: str) -> str:
+    """
+    Условие or_() для строк, идущих после (value, last_id) при сортировке
+    по (sort_by, id) в одном направлении.
+    """
+    op = "lt" if desc else "gt"
+    id_after = f"id.{op}.{quote_filter_value(last_id)}"
+
+    if value is None:
+        if desc:
+            # NULL идут первыми: оставшиеся NULL после last_id и все не-NULL
+            return f"and({sort_by}.is.null,{id_after}),{sort_by}.not.is.null"
+        # NULL идут последними: только оставшиеся NULL
+        return f"and({sort_by}.is.null,{id_after})"
+
+    value_after = f"{sort_by}.{op}.{quote_filter_value(value)}"
+    same_value = f"and({sort_by}.eq.{quote_filter_value(value)},{id_after})"
+    if desc:
+        return f"{value_after},{same_value}"
+    return f"{value_after},{same_value},{sort_by}.is.null"
+
+
+def apply_keyset(
+    query: Any, sort_by: str, desc: bool, cursor: Optional[str]
+) -> Any:
+    """Добавляет к запросу сортировку по (sort_by, id) и условие курсора."""
+    if cursor:
+        value, last_id = decode_cursor(cursor)
+        query = query.or_(keyset_filter(sort_by, desc, value, last_id))
+    return query.order(sort_by, desc=desc).order("id", desc=desc)
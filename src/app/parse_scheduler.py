@@ -0,0 +1,225 @@
+"""
+Планировщик парсинга каналов по parse_frequency_hours.
+
+Каналы ставятся в очередь с приоритетом по степени просрочки:
+(сейчас - last_parsed) / parse_frequency_hours. Канал с отношением 2.0
+ждет вдвое дольше положенного и парсится раньше канала с 1.1, а каналы
+с отношением меньше 1.0 не трогаются. Очередь разбирает ограниченный пул
+воркеров, канал, который уже парсится, повторно в очередь не попадает.
+"""
+
+import asyncio
+import heapq
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from .async_db import AsyncSupabaseClient
+from .settings import settings
+from .utils import setup_logger
+
+# Настройка логирования
+logger = setup_logger(__name__)
+
+DEFAULT_PARSE_FREQUENCY_HOURS = 24
+
+
+def _parse_timestamp(value: Any) -> Optional[datetime]:
+    """Преобразует timestamp из БД в datetime с UTC."""
+    if not value:
+        return None
+    if isinstance(value, datetime):
+        parsed = value
+    else:
+        try:
+            parsed = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+        except ValueError:
+            return None
+    # update_channel_last_parsed пишет naive UTC
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+
+class ParseScheduler:
+    """Очередь каналов по степени просрочки и пул воркеров парсинга."""
+
+    def __init__(
+        self,
+        supabase_client,
+        parse_func: Callable[[str], Awaitable[Any]],
+        workers: Optional[int] = None,
+        poll_interval: Optional[float] = None,
+    ):
+        """
+        Инициализирует планировщик.
+
+        Args:
+            supabase_client: Клиент Supabase (источник каналов и last_parsed).
+            parse_func: Корутина парсинга одного канала по username. Должна
+                обновлять last_parsed канала после успешного парсинга.
+            workers: Количество каналов, парсящихся одновременно.
+            poll_interval: Интервал пересчета очереди в секундах.
+        """
+        self.supabase = supabase_client
+        # Запросы к БД из event loop выполняются в пуле потоков
+        self.db = AsyncSupabaseClient(supabase_client)
+        self.parse_func = parse_func
+        self.workers = max(1, workers or settings.parse_scheduler_workers)
+        self.poll_interval = poll_interval or settings.parse_scheduler_poll_seconds
+
+        # Куча (-степень просрочки, username)
+        self._queue: List[Tuple[float, str]] = []
+        self._in_flight: Set[str] = set()
+        self._tasks: Set[asyncio.Task] = set()
+        # Время последнего запуска по каналу: защищает от повторного парсинга,
+        # если last_parsed в БД не обновился (ошибка парсинга или сохранения)
+        self._last_started: Dict[str, datetime] = {}
+
+        self._loop_task: Optional[asyncio.Task] = None
+        self._wakeup = asyncio.Event()
+        self.last_tick_at: Optional[datetime] = None
+        self.stats = {"parsed": 0, "errors": 0}
+
+    @property
+    def is_running(self) -> bool:
+        """Запущен ли цикл планировщика."""
+        return self._loop_task is not None and not self._loop_task.done()
+
+    def overdue_ratio(self, channel: Dict[str, Any], now: datetime) -> float:
+        """
+        Степень просрочки канала: прошедшее время / частота парсинга.
+
+        Канал, который еще ни разу не парсился, просрочен бесконечно.
+        """
+        frequency_hours = (
+            channel.get("parse_frequency_hours") or DEFAULT_PARSE_FREQUENCY_HOURS
+        )
+
+        last_parsed = _parse_timestamp(channel.get("last_parsed"))
+        last_started = self._last_started.get(channel["username"])
+        if last_started and (not last_parsed or last_started > last_parsed):
+            last_parsed = last_started
+
+        if not last_parsed:
+            return float("inf")
+
+        elapsed_hours = (now - last_parsed).total_seconds() / 3600
+        return elapsed_hours / frequency_hours
+
+    async def refresh_queue(self, now: Optional[datetime] = None) -> int:
+        """
+        Пересобирает очередь из активных каналов.
+
+        Returns:
+            Количество каналов в очереди.
+        """
+        now = now or datetime.now(timezone.utc)
+        queue = []
+        for channel in await self.db.get_channels(active_only=True):
+            username = channel.get("username")
+            if not username or username in self._in_flight:
+                continue
+
+            ratio = self.overdue_ratio(channel, now)
+            if ratio >= 1.0:
+                queue.append((-ratio, username))
+
+        heapq.heapify(queue)
+        self._queue = queue
+        self.last_tick_at = now
+        return len(queue)
+
+    def _dispatch(self) -> None:
+        """Раздает самые просроченные каналы свободным воркерам."""
+        while self._queue and len(self._in_flight) < self.workers:
+            _, username = heapq.heappop(self._queue)
+            if username in self._in_flight:
+                continue
+
+            self._in_flight.add(username)
+            self._last_started[username] = datetime.now(timezone.utc)
+            task = asyncio.create_task(self._run_channel(username))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run_channel(self, username: str) -> None:
+        """Парсит один канал и освобождает воркер."""
+        try:
+            result = await self.parse_func(username)
+            # parse_bulk_channel возвращает (количество постов, статус)
+            if isinstance(result, tuple) and len(result) > 1 and result[1] == "error":
+                self.stats["errors"] += 1
+            else:
+                self.stats["parsed"] += 1
+        except Exception as e:
+            self.stats["errors"] += 1
+            logger.error(f"Ошибка планового парсинга канала {username}: {e}")
+        finally:
+            self._in_flight.discard(username)
+            # Освободился воркер - отдаем ему следующий канал из очереди
+            self._wakeup.set()
+
+    async def _run_loop(self) -> None:
+        """Основной цикл: пересчет очереди и раздача каналов воркерам."""
+        logger.info(
+            f"Планировщик парсинга запущен: {self.workers} воркеров, "
+            f"пересчет очереди каждые {self.poll_interval} секунд"
+        )
+        loop = asyncio.get_running_loop()
+        next_refresh = 0.0
+        while True:
+            try:
+                if loop.time() >= next_refresh:
+                    queued = await self.refresh_queue()
+                    next_refresh = loop.time() + self.poll_interval
+                    if queued:
+                        logger.info(f"Просроченных каналов в очереди: {queued}")
+                self._dispatch()
+            except Exception as e:
+                logger.error(f"Ошибка цикла планировщика парсинга: {e}")
+
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(
+                    self._wakeup.wait(), timeout=max(next_refresh - loop.time(), 0.1)
+                )
+            except asyncio.TimeoutError:
+                pass
+
+    def start(self) -> None:
+        """Запускает цикл планировщика (в работающем event loop)."""
+        if self.is_running:
+            return
+        self._loop_task = asyncio.create_task(self._run_loop())
+
+    async def stop(self) -> None:
+        """Останавливает цикл; уже начатые парсинги дорабатывают."""
+        if not self.is_running:
+            return
+        self._loop_task.cancel()
+        try:
+            await self._loop_task
+        except asyncio.CancelledError:
+            pass
+        self._loop_task = None
+        self._queue = []
+        logger.info("Планировщик парсинга остановлен")
+
+    def get_status(self, limit: int = 20) -> Dict[str, Any]:
+        """Возвращает состояние планировщика и начало очереди."""
+        return {
+            "running": self.is_running,
+            "workers": self.workers,
+            "poll_interval": self.poll_interval,
+            "in_flight": sorted(self._in_flight),
+            "queued": len(self._queue),
+            "queue": [
+                {
+                    "channel": username,
+                    "overdue_ratio": None if ratio == float("-inf") else round(-ratio, 2),
+                }
+                for ratio, username in heapq.nsmallest(limit, self._queue)
+            ],
+            "last_tick_at": self.last_tick_at.isoformat() if self.last_tick_at else None,
+            **self.stats,
+        }
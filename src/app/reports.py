@@ -8,6 +8,7 @@ import logging
 from datetime import datetime, timedelta
 from typing import List, Dict, Any, Optional
 
+from .async_db import AsyncSupabaseClient
 from .supabase_client import SupabaseManager
 from .telegram_bot import TelegramBotService
 from .llm.orchestrator import LLMOrchestrator
@@ -26,6 +27,7 @@ class ReportGenerator:
             supabase_manager: Менеджер Supabase для работы с БД
         """
         self.supabase = supabase_manager
+        self.db = AsyncSupabaseClient(supabase_manager)
         self.orchestrator = LLMOrchestrator()
 
     async def generate_viral_report(
@@ -159,7 +161,7 @@ class ReportGenerator:
             # Сортируем по viral_score
             query = query.order('viral_score', desc=True).limit(20)
 
-            response = query.execute()
+            response = await self.db.execute(query)
 
             if response.data:
                 logger.info(f"Retrieved {len(response.data)} viral posts from database")
@@ -0,0 +1,313 @@
+"""
+Пул авторизованных Telegram-сессий для парсинга.
+
+Каналы распределяются между аккаунтами по стабильному хэшу username, поэтому
+один и тот же канал обычно читается одним аккаунтом (его сущность и кэши уже
+прогреты). Если аккаунт получил FloodWait или отвалился, канал уходит
+следующему здоровому аккаунту. Нездоровая сессия через
+settings.telegram_session_retry_seconds переподключается и проверяется, и
+при успехе возвращается в пул. Лимиты Telegram действуют на аккаунт, поэтому
+у каждой сессии свой регулятор запросов.
+"""
+
+import hashlib
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from .flood_control import REQUEST_CLASS_HISTORY
+from .settings import settings
+from .telegram_client import TelegramAnalyzer
+from .utils import normalize_channel_input, setup_logger
+
+# Настройка логирования
+logger = setup_logger(__name__)
+
+
+class SessionState:
+    """Состояние одной сессии пула."""
+
+    def __init__(self, name: str, analyzer: TelegramAnalyzer):
+        """
+        Инициализирует состояние сессии.
+
+        Args:
+            name: Имя файла сессии.
+            analyzer: Клиент Telegram этой сессии.
+        """
+        self.name = name
+        self.analyzer = analyzer
+        self.healthy = False
+        self.failures = 0
+        self.requests = 0
+        self.last_error: Optional[str] = None
+        self.last_used_at: Optional[float] = None
+        # Когда сессия последний раз стала нездоровой или не прошла проверку
+        self.unhealthy_since: Optional[float] = None
+
+    def is_available(self) -> bool:
+        """Сессия подключена и не стоит на паузе FloodWait по истории."""
+        return (
+            self.healthy
+            and self.analyzer.request_governor.remaining(REQUEST_CLASS_HISTORY) <= 0
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Преобразование в словарь для API."""
+        return {
+            "name": self.name,
+            "healthy": self.healthy,
+            "available": self.is_available(),
+            "failures": self.failures,
+            "requests": self.requests,
+            "last_error": self.last_error,
+            "flood_wait_seconds": round(
+                self.analyzer.request_governor.remaining(REQUEST_CLASS_HISTORY), 1
+            ),
+        }
+
+
+class TelegramSessionPool:
+    """Пул сессий с шардированием каналов и переключением при FloodWait."""
+
+    def __init__(
+        self,
+        session_names: Optional[List[str]] = None,
+        primary_analyzer: Optional[TelegramAnalyzer] = None,
+        max_failures: int = 3,
+        retry_seconds: Optional[float] = None,
+    ):
+        """
+        Инициализирует пул сессий.
+
+        Args:
+            session_names: Имена файлов сессий (по умолчанию settings.telegram_sessions).
+            primary_analyzer: Уже созданный клиент основной сессии. Переиспользуется,
+                чтобы не открывать один файл сессии двумя клиентами.
+            max_failures: После стольких ошибок подряд сессия считается нездоровой.
+            retry_seconds: Пауза перед повторной проверкой нездоровой сессии
+                (по умолчанию settings.telegram_session_retry_seconds).
+        """
+        self.max_failures = max_failures
+        self.retry_seconds = (
+            settings.telegram_session_retry_seconds
+            if retry_seconds is None
+            else retry_seconds
+        )
+        self.sessions: List[SessionState] = []
+
+        names = session_names or settings.telegram_sessions
+        for name in names:
+            if primary_analyzer and self._same_session(primary_analyzer, name):
+                analyzer = primary_analyzer
+            else:
+                analyzer = TelegramAnalyzer(session_name=name)
+            self.sessions.append(SessionState(name, analyzer))
+
+        logger.info(f"Инициализирован пул из {len(self.sessions)} Telegram-сессий")
+
+    @staticmethod
+    def _same_session(analyzer: TelegramAnalyzer, name: str) -> bool:
+        """Проверяет, что клиент открыт на файле сессии с данным именем."""
+        filename = str(analyzer.client.session.filename or "")
+        return filename.replace(".session", "") == name.replace(".session", "")
+
+    async def _connect_session(self, session: SessionState) -> bool:
+        """
+        Подключает сессию и проверяет ее запросом get_me.
+
+        Returns:
+            True, если сессия здорова.
+        """
+        try:
+            if session.analyzer.is_connected:
+                # Соединение есть, но могло умереть - проверяем его запросом
+                try:
+                    await session.analyzer.client.get_me()
+                except Exception:
+                    await session.analyzer.disconnect()
+            if not session.analyzer.is_connected:
+                if await session.analyzer.needs_authorization():
+                    raise RuntimeError("сессия требует авторизации")
+                await session.analyzer.connect()
+            session.healthy = True
+            session.failures = 0
+            session.last_error = None
+            session.unhealthy_since = None
+            return True
+        except Exception as e:
+            session.healthy = False
+            session.last_error = str(e)
+            session.unhealthy_since = time.time()
+            logger.warning(f"Сессия {session.name} недоступна: {e}")
+            return False
+
+    async def connect(self) -> None:
+        """Подключает все авторизованные сессии пула."""
+        for session in self.sessions:
+            if session.healthy and session.analyzer.is_connected:
+                continue
+            await self._connect_session(session)
+
+        healthy = sum(1 for session in self.sessions if session.healthy)
+        logger.info(f"Подключено {healthy}/{len(self.sessions)} Telegram-сессий")
+
+    async def recover(self) -> int:
+        """
+        Переподключает нездоровые сессии, у которых истекла пауза.
+
+        Returns:
+            Количество сессий, вернувшихся в пул.
+        """
+        now = time.time()
+        recovered = 0
+        for session in self.sessions:
+            if session.healthy or (
+                session.unhealthy_since is not None
+                and now - session.unhealthy_since < self.retry_seconds
+            ):
+                continue
+            # Отмечаем попытку сразу: параллельные вызовы не проверяют сессию повторно
+            session.unhealthy_since = now
+            if await self._connect_session(session):
+                recovered += 1
+                logger.info(f"Сессия {session.name} снова доступна")
+        return recovered
+
+    async def disconnect(self) -> None:
+        """Отключает все сессии пула."""
+        for session in self.sessions:
+            await session.analyzer.disconnect()
+            session.healthy = False
+
+    def _candidates(self, channel_username: str) -> List[SessionState]:
+        """
+        Возвращает сессии в порядке предпочтения для канала.
+
+        Используется rendezvous hashing: при добавлении или потере сессии
+        переезжает только часть каналов.
+        """
+        key = normalize_channel_input(channel_username).lstrip("@").lower()
+
+        def weight(session: SessionState) -> str:
+            return hashlib.md5(f"{session.name}:{key}".encode("utf-8")).hexdigest()
+
+        return sorted(self.sessions, key=weight, reverse=True)
+
+    def pick(self, channel_username: str) -> Optional[SessionState]:
+        """Выбирает сессию для канала: предпочтительную или первую доступную."""
+        candidates = self._candidates(channel_username)
+        for session in candidates:
+            if session.is_available():
+                return session
+
+        # Все на паузе - берем здоровую сессию, которая освободится раньше всех
+        healthy = [session for session in candidates if session.healthy]
+        if healthy:
+            return min(
+                healthy,
+                key=lambda s: s.analyzer.request_governor.remaining(REQUEST_CLASS_HISTORY),
+            )
+        return None
+
+    def _record_result(self, session: SessionState, error: Optional[str]) -> None:
+        """Обновляет состояние сессии по результату запроса."""
+        session.requests += 1
+        session.last_used_at = time.time()
+        if not error:
+            session.failures = 0
+            return
+
+        session.failures += 1
+        session.last_error = error
+        if session.failures >= self.max_failures:
+            session.healthy = False
+            session.unhealthy_since = session.last_used_at
+            logger.error(
+                f"Сессия {session.name} помечена нездоровой после {session.failures} ошибок подряд"
+            )
+
+    async def get_channel_posts(
+        self,
+        channel_username: str,
+        days_back: int = 7,
+        max_posts: int = 100,
+        min_id: Optional[int] = None,
+        refresh_hours: Optional[int] = None,
+    ) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+        """
+        Получает посты из канала через одну из сессий пула.
+
+        Интерфейс совпадает с TelegramAnalyzer.get_channel_posts. При FloodWait
+        или ошибке сессии запрос повторяется на следующей доступной сессии.
+
+        Returns:
+            Tuple (список постов, информация о канале)
+        """
+        await self.recover()
+
+        tried = set()
+        posts, channel_info = [], {"error": "Нет доступных Telegram-сессий"}
+
+        for _ in range(len(self.sessions)):
+            session = self.pick(channel_username)
+            if not session or session.name in tried:
+                # Предпочтительные сессии уже пробовали - ищем непробованную доступную
+                session = next(
+                    (
+                        s
+                        for s in self._candidates(channel_username)
+                        if s.healthy and s.name not in tried
+                    ),
+                    None,
+                )
+            if not session:
+                break
+
+            tried.add(session.name)
+            try:
+                posts, channel_info = await session.analyzer.get_channel_posts(
+                    channel_username=channel_username,
+                    days_back=days_back,
+                    max_posts=max_posts,
+                    min_id=min_id,
+                    refresh_hours=refresh_hours,
+                )
+            except Exception as e:
+                # Сбой самой сессии (соединение, авторизация) анализатор пробрасывает
+                # исключением, а ошибки канала возвращает в channel_info.
+                # Считаем сбой ошибкой сессии и пробуем другую
+                posts, channel_info = [], {"error": str(e)}
+                self._record_result(session, str(e))
+                logger.warning(f"Сессия {session.name} не смогла прочитать {channel_username}: {e}")
+                continue
+
+            error = channel_info.get("error")
+            flood_limited = (
+                session.analyzer.request_governor.remaining(REQUEST_CLASS_HISTORY) > 0
+            )
+            if not error or not flood_limited:
+                # Ошибки уровня канала (не найден, приватный) другая сессия не исправит
+                self._record_result(session, None)
+                return posts, channel_info
+
+            session.requests += 1
+            logger.warning(
+                f"Сессия {session.name} на паузе FloodWait, канал {channel_username} "
+                f"переходит к другой сессии: {error}"
+            )
+
+        return posts, channel_info
+
+    def invalidate_channel_cache(self, channel_input: Optional[str] = None) -> None:
+        """Сбрасывает кэш сущности и информации о канале во всех сессиях."""
+        for session in self.sessions:
+            session.analyzer.invalidate_channel_cache(channel_input)
+
+    def get_status(self) -> Dict[str, Any]:
+        """Возвращает состояние всех сессий пула."""
+        return {
+            "total": len(self.sessions),
+            "healthy": sum(1 for session in self.sessions if session.healthy),
+            "available": sum(1 for session in self.sessions if session.is_available()),
+            "sessions": [session.to_dict() for session in self.sessions],
+        }
@@ -27,6 +27,130 @@ class Settings:
         self.telegram_api_hash = os.getenv("TELEGRAM_API_HASH", "")
         self.telegram_session = os.getenv("TELEGRAM_SESSION", "telegram_session")
 
+        # Пул сессий для парсинга: TELEGRAM_SESSIONS="session_a,session_b"
+        self.telegram_sessions = [
+            name.strip()
+            for name in os.getenv("TELEGRAM_SESSIONS", "").split(",")
+            if name.strip()
+        ] or [self.telegram_session]
+        # Через сколько секунд нездоровая сессия пула переподключается и проверяется
+        self.telegram_session_retry_seconds = float(
+            os.getenv("TELEGRAM_SESSION_RETRY_SECONDS", "300")
+        )
+
+        # Параллельный парсинг каналов
+        self.telegram_parse_concurrency = int(
+            os.getenv("TELEGRAM_PARSE_CONCURRENCY", "4")
+        )
+
+        # Инкрементальный парсинг: окно обновления метрик уже известных постов
+        self.telegram_metrics_refresh_hours = int(
+            os.getenv("TELEGRAM_METRICS_REFRESH_HOURS", "48")
+        )
+
+        # Размер пачки сообщений при потоковой загрузке в БД
+        self.telegram_ingest_batch_size = int(
+            os.getenv("TELEGRAM_INGEST_BATCH_SIZE", "50")
+        )
+
+        # Догрузка истории новых каналов (backfill)
+        self.telegram_backfill_page_size = int(
+            os.getenv("TELEGRAM_BACKFILL_PAGE_SIZE", "500")
+        )
+        self.telegram_backfill_max_messages = int(
+            os.getenv("TELEGRAM_BACKFILL_MAX_MESSAGES", "5000")
+        )
+        # Сколько токенов регулятора оставлять живому парсингу
+        self.telegram_backfill_reserve_tokens = float(
+            os.getenv("TELEGRAM_BACKFILL_RESERVE_TOKENS", "3")
+        )
+
+        # Кэш сущностей и информации о каналах (секунды)
+        self.telegram_entity_cache_ttl = int(
+            os.getenv("TELEGRAM_ENTITY_CACHE_TTL", "86400")
+        )
+        self.telegram_info_cache_ttl = int(
+            os.getenv("TELEGRAM_INFO_CACHE_TTL", "3600")
+        )
+
+        # Регулятор запросов к Telegram
+        # TELEGRAM_RATE_LIMITS: "класс=запросов_в_сек:всплеск,...", например "history=2:10"
+        self.telegram_rate_limits = self._parse_rate_limits(
+            os.getenv("TELEGRAM_RATE_LIMITS", "")
+        )
+        self.telegram_global_backoff_seconds = float(
+            os.getenv("TELEGRAM_GLOBAL_BACKOFF_SECONDS", "5")
+        )
+        self.telegram_max_flood_wait = float(os.getenv("TELEGRAM_MAX_FLOOD_WAIT", "300"))
+        self.telegram_flood_retries = int(os.getenv("TELEGRAM_FLOOD_RETRIES", "3"))
+
+        # Архив сырых сообщений Telegram (gzip JSONL по каналам и датам)
+        self.message_archive_enabled = (
+            os.getenv("MESSAGE_ARCHIVE_ENABLED", "false").lower() == "true"
+        )
+        self.message_archive_dir = os.getenv("MESSAGE_ARCHIVE_DIR", "data/message_archive")
+
+        # Время жизни снимка таблицы system_settings (секунды)
+        self.system_settings_cache_ttl = int(
+            os.getenv("SYSTEM_SETTINGS_CACHE_TTL", "60")
+        )
+
+        # Хранилище: supabase или sqlite (встроенная база для локального запуска и тестов)
+        self.storage_backend = os.getenv("STORAGE_BACKEND", "supabase").lower()
+        self.sqlite_path = os.getenv("SQLITE_PATH", "data/reaiboot.sqlite3")
+
+        # Проверка соединения с Supabase: сколько секунд результат считается свежим
+        # и как часто фоновый монитор делает проверочный запрос
+        self.db_health_ttl = int(os.getenv("DB_HEALTH_TTL", "30"))
+        self.db_health_interval = int(os.getenv("DB_HEALTH_INTERVAL", "15"))
+
+        # Время жизни кэша списка базовых метрик каналов (секунды)
+        self.baselines_cache_ttl = int(os.getenv("BASELINES_CACHE_TTL", "60"))
+
+        # Время жизни кэша счетчиков для /api/stats/health (секунды)
+        self.stats_cache_ttl = int(os.getenv("STATS_CACHE_TTL", "30"))
+
+        # Пул потоков для запросов к Supabase из async-кода
+        self.db_thread_pool_size = int(os.getenv("DB_THREAD_POOL_SIZE", "8"))
+
+        # Запись постов: пачки ограничены по строкам и по размеру запроса (байты)
+        self.posts_write_chunk_rows = int(os.getenv("POSTS_WRITE_CHUNK_ROWS", "500"))
+        self.posts_write_chunk_bytes = int(
+            os.getenv("POSTS_WRITE_CHUNK_BYTES", "1000000")
+        )
+        # Сколько пачек отправляется одновременно
+        self.posts_write_concurrency = int(os.getenv("POSTS_WRITE_CONCURRENCY", "2"))
+        self.posts_write_retries = int(os.getenv("POSTS_WRITE_RETRIES", "2"))
+
+        # Размер пачки при пакетной записи метрик виральности
+        self.viral_write_chunk_size = int(os.getenv("VIRAL_WRITE_CHUNK_SIZE", "500"))
+
+        # Размер страницы при полном пересчете виральности (строк за запрос)
+        self.viral_recalc_page_size = int(os.getenv("VIRAL_RECALC_PAGE_SIZE", "1000"))
+
+        # Фильтр Блума обработанных постов (предварительная проверка дубликатов)
+        self.processed_filter_capacity = int(
+            os.getenv("PROCESSED_FILTER_CAPACITY", "200000")
+        )
+        self.processed_filter_error_rate = float(
+            os.getenv("PROCESSED_FILTER_ERROR_RATE", "0.01")
+        )
+
+        # Планировщик парсинга по parse_frequency_hours каналов
+        self.parse_scheduler_enabled = (
+            os.getenv("PARSE_SCHEDULER_ENABLED", "false").lower() == "true"
+        )
+        self.parse_scheduler_workers = int(
+            os.getenv("PARSE_SCHEDULER_WORKERS", str(self.telegram_parse_concurrency))
+        )
+        self.parse_scheduler_poll_seconds = int(
+            os.getenv("PARSE_SCHEDULER_POLL_SECONDS", "60")
+        )
+        self.parse_scheduler_days_back = int(os.getenv("PARSE_SCHEDULER_DAYS_BACK", "7"))
+        self.parse_scheduler_max_posts = int(
+            os.getenv("PARSE_SCHEDULER_MAX_POSTS", "100")
+        )
+
         # Telegram Bot настройки
         self.telegram_bot_token = os.getenv("TELEGRAM_BOT_TOKEN") or os.getenv("TELEGRAM_BOT", "8364173996:AAH2BFSuA_cN7JHQ5Gds5O3MNS-KXxpK0wE")
         self.telegram_chat_id = os.getenv("TELEGRAM_CHAT_ID", "")
@@ -67,6 +191,24 @@ class Settings:
         # Создаем директорию для конфигурационных файлов
         os.makedirs(self.configs_dir, exist_ok=True)
 
+    @staticmethod
+    def _parse_rate_limits(value: str) -> Dict[str, tuple]:
+        """Разбирает строку лимитов вида "history=2:10,entity=0.2:5"."""
+        limits = {}
+        for item in value.split(","):
+            if "=" not in item:
+                continue
+            request_class, limit = item.split("=", 1)
+            rate, _, capacity = limit.partition(":")
+            try:
+                limits[request_class.strip()] = (
+                    float(rate),
+                    float(capacity) if capacity else max(float(rate), 1.0),
+                )
+            except ValueError:
+                logging.warning(f"Некорректный лимит запросов Telegram: {item}")
+        return limits
+
     @property
     def tz(self):
         """Возвращает объект timezone."""
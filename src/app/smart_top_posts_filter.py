@@ -202,6 +202,7 @@ class SmartTopPostsFilter:
 
         # Отбираем 'залетевшие' посты
         viral_posts = []
+        viral_updates = []
         for post, result in zip(posts, viral_results):
             if result.is_viral:
                 # Добавляем метрики в пост
@@ -214,19 +215,22 @@ class SmartTopPostsFilter:
                 })
                 viral_posts.append(post)
 
-                # Обновляем метрики поста в БД
-                viral_data = {
+                # Метрики поста записываются в БД одной пачкой ниже
+                viral_updates.append({
+                    'id': post['id'],
                     'viral_score': result.viral_score,
                     'engagement_rate': result.engagement_rate,
                     'zscore': result.zscore,
                     'median_multiplier': result.median_multiplier
-                }
-                self.supabase.update_post_viral_metrics(post['id'], viral_data)
+                })
             else:
                 # Подсчитываем причины отсева
                 if result.viral_score < self.settings['viral_thresholds']['min_viral_score']:
                     filter_stats["low_viral_score"] += 1
 
+        if viral_updates:
+            self.supabase.bulk_update_post_viral_metrics(viral_updates)
+
         # Ограничиваем количество постов с канала
         viral_posts.sort(key=lambda x: x.get('viral_score', 0), reverse=True)
         selected_posts = viral_posts[:max_posts_per_channel]
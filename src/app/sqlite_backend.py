@@ -0,0 +1,903 @@
+"""
+Встроенное хранилище SQLite с интерфейсом клиента supabase-py.
+
+SQLiteDatabase повторяет ту часть API supabase-py, которой пользуется проект:
+table(...).select/insert/upsert/update/delete, фильтры eq/neq/gt/gte/lt/lte/
+like/ilike/in_/is_/or_, order, limit, range, count и rpc(...). Поэтому
+SupabaseClient и все запросы в коде работают с ним без изменений.
+
+Таблицы и индексы создаются из supabase_schema.sql: типы PostgreSQL
+переводятся в типы SQLite, политики RLS, триггеры и функции пропускаются.
+RPC, которые вызывает код, реализованы здесь же на SQL SQLite.
+
+Бэкенд выбирается настройкой STORAGE_BACKEND=sqlite (путь к файлу -
+SQLITE_PATH, ":memory:" - база в памяти).
+"""
+
+import json
+import os
+import re
+import sqlite3
+import threading
+from datetime import date, datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .utils import setup_logger
+
+# Настройка логирования
+logger = setup_logger(__name__)
+
+SCHEMA_PATH = Path(__file__).resolve().parents[2] / "supabase_schema.sql"
+
+# Значение по умолчанию для TIMEZONE('utc'::text, NOW())
+_NOW_DEFAULT = "(strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now'))"
+
+_IDENTIFIER = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+# Колонки, из которых в PostgreSQL строится tsvector (поиск по словам)
+_SEARCH_VECTORS = {"search_vector": ("channel_title", "full_text", "text_preview")}
+
+_TEXT_SEARCH_OPERATOR = re.compile(r"^(fts|plfts|phfts|wfts)(\(\w+\))?$")
+
+_COMPARISONS = {
+    "eq": "=",
+    "neq": "!=",
+    "gt": ">",
+    "gte": ">=",
+    "lt": "<",
+    "lte": "<=",
+}
+
+
+# Таблицы, которые в PostgreSQL поддерживаются триггерами, в SQLite -
+# представления поверх posts
+_VIEWS = {
+    "posts_totals": (
+        "SELECT 1 AS id, COUNT(*) AS total_posts, "
+        "COALESCE(SUM(views), 0) AS total_views, "
+        "COALESCE(SUM(reactions), 0) AS total_reactions, "
+        "COALESCE(SUM(forwards), 0) AS total_forwards FROM posts"
+    ),
+    # Квантили - по ближайшему рангу (в PostgreSQL - percentile_cont)
+    "channel_daily_stats": (
+        "SELECT channel_username, day, COUNT(*) AS posts_count, "
+        "COALESCE(SUM(views), 0) AS total_views, "
+        "COALESCE(SUM(reactions), 0) AS total_reactions, "
+        "COALESCE(SUM(forwards), 0) AS total_forwards, "
+        "COALESCE(SUM(replies), 0) AS total_replies, "
+        "AVG(engagement_rate) AS avg_engagement_rate, "
+        "MAX(CASE WHEN engagement_rate IS NOT NULL AND rn = (rated + 1) / 2 "
+        "THEN engagement_rate END) AS median_engagement_rate, "
+        "MAX(CASE WHEN engagement_rate IS NOT NULL AND rn = (9 * rated + 9) / 10 "
+        "THEN engagement_rate END) AS p90_engagement_rate, "
+        "MAX(viral_score) AS max_viral_score, "
+        "SUM(CASE WHEN viral_score >= 1.0 THEN 1 ELSE 0 END) AS viral_count, "
+        "MAX(updated_at) AS updated_at "
+        "FROM (SELECT *, substr(date, 1, 10) AS day, "
+        "ROW_NUMBER() OVER (PARTITION BY channel_username, substr(date, 1, 10), "
+        "engagement_rate IS NULL ORDER BY engagement_rate) AS rn, "
+        "COUNT(engagement_rate) OVER (PARTITION BY channel_username, "
+        "substr(date, 1, 10)) AS rated FROM posts) "
+        "GROUP BY channel_username, day"
+    ),
+}
+
+
+class SQLiteError(Exception):
+    """Ошибка запроса к встроенному хранилищу."""
+
+    def __init__(self, message: str, code: Optional[str] = None):
+        super().__init__(message)
+        # Класс SQLSTATE, как в APIError.code (23000 - нарушение ограничений)
+        self.code = code
+
+
+class SQLiteResponse:
+    """Результат запроса (аналог APIResponse из postgrest)."""
+
+    def __init__(self, data: List[Dict[str, Any]], count: Optional[int] = None):
+        self.data = data
+        self.count = count
+
+
+def _quote_identifier(name: str) -> str:
+    """Проверяет имя колонки/таблицы и возвращает его в кавычках."""
+    if not _IDENTIFIER.match(name):
+        raise SQLiteError(f"Некорректное имя: {name}")
+    return f'"{name}"'
+
+
+def _split_top_level(text: str) -> List[str]:
+    """Делит строку по запятым вне скобок и кавычек."""
+    parts, current, depth, quoted, escaped = [], [], 0, False, False
+    for char in text:
+        if escaped:
+            current.append(char)
+            escaped = False
+            continue
+        if char == "\\" and quoted:
+            current.append(char)
+            escaped = True
+            continue
+        if char == '"':
+            quoted = not quoted
+        elif not quoted and char == "(":
+            depth += 1
+        elif not quoted and char == ")":
+            depth -= 1
+        elif not quoted and depth == 0 and char == ",":
+            parts.append("".join(current).strip())
+            current = []
+            continue
+        current.append(char)
+    if current:
+        parts.append("".join(current).strip())
+    return [part for part in parts if part]
+
+
+def _parse_literal(value: str) -> Any:
+    """Значение из строкового фильтра PostgREST."""
+    if len(value) >= 2 and value[0] == value[-1] == '"':
+        return value[1:-1].replace('\\"', '"').replace("\\\\", "\\")
+    lowered = value.lower()
+    if lowered == "null":
+        return None
+    if lowered == "true":
+        return True
+    if lowered == "false":
+        return False
+    return value
+
+
+def _like_pattern(pattern: Any) -> str:
+    """Шаблон PostgREST (* или %) в шаблон LIKE."""
+    return str(pattern).replace("*", "%")
+
+
+def _ilike(value: Any, pattern: Any) -> Optional[bool]:
+    """ILIKE без учета регистра и для кириллицы (LIKE в SQLite - только ASCII)."""
+    if value is None or pattern is None:
+        return None
+    regex = "".join(
+        ".*" if char == "%" else "." if char == "_" else re.escape(char)
+        for char in _like_pattern(pattern)
+    )
+    return re.fullmatch(regex, str(value), re.IGNORECASE | re.DOTALL) is not None
+
+
+def _search_words(query: Any) -> List[str]:
+    """Слова поискового запроса (синтаксис веб-поиска не разбирается)."""
+    return [word.lower() for word in re.findall(r"\w+", str(query or ""))]
+
+
+def _text_search_condition(column: str, query: Any) -> Tuple[str, List[Any]]:
+    """
+    Замена tsvector @@ tsquery: каждое слово запроса встречается
+    хотя бы в одной из колонок, из которых строится tsvector.
+    """
+    if column not in _SEARCH_VECTORS:
+        raise SQLiteError(f"Колонка {column} не поддерживает полнотекстовый поиск")
+    words = _search_words(query)
+    if not words:
+        return "0", []
+
+    clauses, params = [], []
+    for word in words:
+        clauses.append(
+            "("
+            + " OR ".join(f"ilike({source}, ?)" for source in _SEARCH_VECTORS[column])
+            + ")"
+        )
+        params.extend([f"%{word}%"] * len(_SEARCH_VECTORS[column]))
+    return f"({' AND '.join(clauses)})", params
+
+
+def _condition(column: str, operator: str, value: Any) -> Tuple[str, List[Any]]:
+    """SQL-условие для одного фильтра."""
+    negate = False
+    if operator.startswith("not."):
+        negate, operator = True, operator[4:]
+
+    name = _quote_identifier(column)
+    if operator in _COMPARISONS:
+        sql, params = f"{name} {_COMPARISONS[operator]} ?", [value]
+    elif operator == "like":
+        sql, params = f"{name} LIKE ?", [_like_pattern(value)]
+    elif operator == "ilike":
+        sql, params = f"ilike({name}, ?)", [value]
+    elif operator == "is":
+        if value is None or str(value).lower() == "null":
+            sql, params = f"{name} IS NULL", []
+        else:
+            sql, params = f"{name} IS ?", [value]
+    elif _TEXT_SEARCH_OPERATOR.match(operator):
+        sql, params = _text_search_condition(column, value)
+    elif operator == "in":
+        values = list(value)
+        if not values:
+            sql, params = "0", []
+        else:
+            sql, params = f"{name} IN ({', '.join('?' * len(values))})", values
+    else:
+        raise SQLiteError(f"Неподдерживаемый оператор фильтра: {operator}")
+
+    if negate:
+        sql = f"NOT ({sql})"
+    return sql, params
+
+
+def _parse_logic_tree(expression: str, joiner: str) -> Tuple[str, List[Any]]:
+    """Условие из синтаксиса or=(...) / and(...) PostgREST."""
+    clauses, params = [], []
+    for term in _split_top_level(expression):
+        match = re.match(r"^(not\.)?(and|or)\((.*)\)$", term, re.DOTALL)
+        if match:
+            sql, term_params = _parse_logic_tree(
+                match.group(3), "AND" if match.group(2) == "and" else "OR"
+            )
+            if match.group(1):
+                sql = f"NOT {sql}"
+        else:
+            column, rest = term.split(".", 1)
+            prefix = ""
+            if rest.startswith("not."):
+                prefix, rest = "not.", rest[4:]
+            operator, raw_value = rest.split(".", 1)
+            if operator == "in":
+                value = [_parse_literal(v) for v in _split_top_level(raw_value[1:-1])]
+            else:
+                value = _parse_literal(raw_value)
+            sql, term_params = _condition(column, prefix + operator, value)
+        clauses.append(sql)
+        params.extend(term_params)
+    return f"({f' {joiner} '.join(clauses)})", params
+
+
+class SQLiteQuery:
+    """Построитель запроса с интерфейсом postgrest-py."""
+
+    def __init__(self, database: "SQLiteDatabase", table: str):
+        self.database = database
+        self.table = table
+        self.operation = "select"
+        self.columns: List[str] = ["*"]
+        self.count_method: Optional[str] = None
+        self.head = False
+        self.payload: Any = None
+        self.on_conflict: Optional[str] = None
+        self.ignore_duplicates = False
+        self.filters: List[Tuple[str, List[Any]]] = []
+        self.orders: List[str] = []
+        self.limit_value: Optional[int] = None
+        self.offset_value = 0
+
+    # ----- Операции -----
+
+    def select(
+        self,
+        *columns: str,
+        count: Optional[str] = None,
+        head: Optional[bool] = None,
+        **kwargs,
+    ) -> "SQLiteQuery":
+        names = []
+        for column in columns or ("*",):
+            names.extend(_split_top_level(column))
+        self.columns = [name for name in names if name]
+        self.count_method = count
+        self.head = bool(head)
+        return self
+
+    def insert(self, json_data: Any, **kwargs) -> "SQLiteQuery":
+        self.operation = "insert"
+        self.payload = json_data
+        return self
+
+    def upsert(
+        self,
+        json_data: Any,
+        on_conflict: Optional[str] = None,
+        ignore_duplicates: bool = False,
+        **kwargs,
+    ) -> "SQLiteQuery":
+        self.operation = "upsert"
+        self.payload = json_data
+        self.on_conflict = on_conflict
+        self.ignore_duplicates = ignore_duplicates
+        return self
+
+    def update(self, json_data: Dict[str, Any], **kwargs) -> "SQLiteQuery":
+        self.operation = "update"
+        self.payload = json_data
+        return self
+
+    def delete(self, **kwargs) -> "SQLiteQuery":
+        self.operation = "delete"
+        return self
+
+    # ----- Фильтры -----
+
+    def _filter(self, column: str, operator: str, value: Any) -> "SQLiteQuery":
+        self.filters.append(_condition(column, operator, value))
+        return self
+
+    def eq(self, column: str, value: Any) -> "SQLiteQuery":
+        return self._filter(column, "eq", value)
+
+    def neq(self, column: str, value: Any) -> "SQLiteQuery":
+        return self._filter(column, "neq", value)
+
+    def gt(self, column: str, value: Any) -> "SQLiteQuery":
+        return self._filter(column, "gt", value)
+
+    def gte(self, column: str, value: Any) -> "SQLiteQuery":
+        return self._filter(column, "gte", value)
+
+    def lt(self, column: str, value: Any) -> "SQLiteQuery":
+        return self._filter(column, "lt", value)
+
+    def lte(self, column: str, value: Any) -> "SQLiteQuery":
+        return self._filter(column, "lte", value)
+
+    def like(self, column: str, pattern: str) -> "SQLiteQuery":
+        return self._filter(column, "like", pattern)
+
+    def ilike(self, column: str, pattern: str) -> "SQLiteQuery":
+        return self._filter(column, "ilike", pattern)
+
+    def in_(self, column: str, values: List[Any]) -> "SQLiteQuery":
+        return self._filter(column, "in", values)
+
+    def is_(self, column: str, value: Any) -> "SQLiteQuery":
+        return self._filter(column, "is", value)
+
+    def or_(self, filters: str, **kwargs) -> "SQLiteQuery":
+        self.filters.append(_parse_logic_tree(filters, "OR"))
+        return self
+
+    # ----- Сортировка и страницы -----
+
+    def order(
+        self, column: str, desc: bool = False, nullsfirst: bool = False, **kwargs
+    ) -> "SQLiteQuery":
+        # Порядок NULL как в PostgreSQL: последними при ASC, первыми при DESC
+        nulls = "FIRST" if nullsfirst or desc else "LAST"
+        direction = "DESC" if desc else "ASC"
+        self.orders.append(f"{_quote_identifier(column)} {direction} NULLS {nulls}")
+        return self
+
+    def limit(self, size: int, **kwargs) -> "SQLiteQuery":
+        self.limit_value = size
+        return self
+
+    def range(self, start: int, end: int, **kwargs) -> "SQLiteQuery":
+        self.offset_value = start
+        self.limit_value = max(0, end - start + 1)
+        return self
+
+    # ----- Выполнение -----
+
+    def _where(self) -> Tuple[str, List[Any]]:
+        if not self.filters:
+            return "", []
+        params: List[Any] = []
+        for _, filter_params in self.filters:
+            params.extend(filter_params)
+        return " WHERE " + " AND ".join(sql for sql, _ in self.filters), params
+
+    def execute(self) -> SQLiteResponse:
+        handler = getattr(self, f"_execute_{self.operation}")
+        return self.database.run(handler)
+
+    def _execute_select(self, connection: sqlite3.Connection) -> SQLiteResponse:
+        where, params = self._where()
+        table = _quote_identifier(self.table)
+
+        count = None
+        if self.count_method:
+            count = connection.execute(
+                f"SELECT COUNT(*) FROM {table}{where}", params
+            ).fetchone()[0]
+        if self.head:
+            # head=True: только количество, без строк
+            return SQLiteResponse([], count)
+
+        # Встроенные ресурсы (rubrics(*)) не поддерживаются и пропускаются
+        columns = [column for column in self.columns if "(" not in column]
+        if columns == ["count"]:
+            total = connection.execute(
+                f"SELECT COUNT(*) FROM {table}{where}", params
+            ).fetchone()[0]
+            return SQLiteResponse([{"count": total}], count)
+
+        select_list = (
+            ", ".join(
+                "*" if column == "*" else _quote_identifier(column)
+                for column in columns
+            )
+            or "*"
+        )
+        sql = f"SELECT {select_list} FROM {table}{where}"
+        if self.orders:
+            sql += " ORDER BY " + ", ".join(self.orders)
+        if self.limit_value is not None or self.offset_value:
+            sql += " LIMIT ? OFFSET ?"
+            params = params + [
+                -1 if self.limit_value is None else self.limit_value,
+                self.offset_value,
+            ]
+
+        rows = connection.execute(sql, params).fetchall()
+        return SQLiteResponse(
+            [self.database.from_row(self.table, row) for row in rows], count
+        )
+
+    def _rows(self) -> List[Dict[str, Any]]:
+        payload = self.payload
+        return payload if isinstance(payload, list) else [payload]
+
+    def _insert_row(self, connection: sqlite3.Connection, row: Dict[str, Any]) -> int:
+        values = self.database.to_row(self.table, row)
+        columns = ", ".join(_quote_identifier(column) for column in values)
+        placeholders = ", ".join("?" * len(values))
+        cursor = connection.execute(
+            f"INSERT INTO {_quote_identifier(self.table)} ({columns}) VALUES ({placeholders})",
+            list(values.values()),
+        )
+        return cursor.lastrowid
+
+    def _fetch_rowids(
+        self, connection: sqlite3.Connection, rowids: List[int]
+    ) -> List[Dict[str, Any]]:
+        if not rowids:
+            return []
+        rows = connection.execute(
+            f"SELECT * FROM {_quote_identifier(self.table)} "
+            f"WHERE rowid IN ({', '.join('?' * len(rowids))})",
+            rowids,
+        ).fetchall()
+        return [self.database.from_row(self.table, row) for row in rows]
+
+    def _execute_insert(self, connection: sqlite3.Connection) -> SQLiteResponse:
+        rowids = [self._insert_row(connection, row) for row in self._rows()]
+        return SQLiteResponse(self._fetch_rowids(connection, rowids))
+
+    def _execute_upsert(self, connection: sqlite3.Connection) -> SQLiteResponse:
+        table = _quote_identifier(self.table)
+        conflict = (
+            [column.strip() for column in self.on_conflict.split(",")]
+            if self.on_conflict
+            else self.database.primary_key(self.table)
+        )
+
+        rowids = []
+        for row in self._rows():
+            values = self.database.to_row(self.table, row)
+            key_sql = " AND ".join(f"{_quote_identifier(c)} IS ?" for c in conflict)
+            key_params = [values.get(column) for column in conflict]
+            existing = connection.execute(
+                f"SELECT rowid FROM {table} WHERE {key_sql}", key_params
+            ).fetchone()
+
+            if existing is None:
+                rowids.append(self._insert_row(connection, row))
+                continue
+            if not self.ignore_duplicates:
+                assignments = ", ".join(f"{_quote_identifier(c)} = ?" for c in values)
+                connection.execute(
+                    f"UPDATE {table} SET {assignments} WHERE rowid = ?",
+                    list(values.values()) + [existing[0]],
+                )
+            rowids.append(existing[0])
+        return SQLiteResponse(self._fetch_rowids(connection, rowids))
+
+    def _matching_rowids(self, connection: sqlite3.Connection) -> List[int]:
+        where, params = self._where()
+        return [
+            row[0]
+            for row in connection.execute(
+                f"SELECT rowid FROM {_quote_identifier(self.table)}{where}", params
+            ).fetchall()
+        ]
+
+    def _execute_update(self, connection: sqlite3.Connection) -> SQLiteResponse:
+        rowids = self._matching_rowids(connection)
+        values = self.database.to_row(self.table, self.payload)
+        if rowids and values:
+            assignments = ", ".join(f"{_quote_identifier(c)} = ?" for c in values)
+            connection.execute(
+                f"UPDATE {_quote_identifier(self.table)} SET {assignments} "
+                f"WHERE rowid IN ({', '.join('?' * len(rowids))})",
+                list(values.values()) + rowids,
+            )
+        return SQLiteResponse(self._fetch_rowids(connection, rowids))
+
+    def _execute_delete(self, connection: sqlite3.Connection) -> SQLiteResponse:
+        rowids = self._matching_rowids(connection)
+        deleted = self._fetch_rowids(connection, rowids)
+        if rowids:
+            connection.execute(
+                f"DELETE FROM {_quote_identifier(self.table)} "
+                f"WHERE rowid IN ({', '.join('?' * len(rowids))})",
+                rowids,
+            )
+        return SQLiteResponse(deleted)
+
+
+class SQLiteRPC:
+    """Отложенный вызов RPC (аналог client.rpc(...).execute())."""
+
+    def __init__(self, database: "SQLiteDatabase", name: str, params: Dict[str, Any]):
+        self.database = database
+        self.name = name
+        self.params = params or {}
+
+    def execute(self) -> SQLiteResponse:
+        handler = SQLiteDatabase.RPC_FUNCTIONS.get(self.name)
+        if handler is None:
+            raise SQLiteError(f"RPC {self.name} не поддерживается хранилищем SQLite")
+        return self.database.run(
+            lambda connection: SQLiteResponse(
+                handler(self.database, connection, self.params)
+            )
+        )
+
+
+def _rpc_count_posts_by_channel(
+    database: "SQLiteDatabase", connection: sqlite3.Connection, params: Dict[str, Any]
+) -> List[Dict[str, Any]]:
+    usernames = params.get("channel_usernames")
+    sql = "SELECT channel_username, COUNT(*) AS posts_count FROM posts"
+    args: List[Any] = []
+    if usernames is not None:
+        sql += (
+            f" WHERE channel_username IN ({', '.join('?' * len(usernames)) or 'NULL'})"
+        )
+        args = list(usernames)
+    sql += " GROUP BY channel_username"
+    return [dict(row) for row in connection.execute(sql, args).fetchall()]
+
+
+def _rpc_get_posts_stats(
+    database: "SQLiteDatabase", connection: sqlite3.Connection, params: Dict[str, Any]
+) -> List[Dict[str, Any]]:
+    conditions, args = [], []
+    for column, operator, key in (
+        ("channel_username", "=", "p_channel_username"),
+        ("date", ">=", "p_date_from"),
+        ("date", "<=", "p_date_to"),
+        ("views", ">=", "p_min_views"),
+        ("engagement_rate", ">=", "p_min_engagement"),
+    ):
+        if params.get(key) is not None:
+            conditions.append(f'"{column}" {operator} ?')
+            args.append(params[key])
+    if params.get("p_search_term") is not None:
+        sql, search_args = _text_search_condition(
+            "search_vector", params["p_search_term"]
+        )
+        conditions.append(sql)
+        args.extend(search_args)
+
+    where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+    row = connection.execute(
+        "SELECT COUNT(*) AS total_posts, COALESCE(SUM(views), 0) AS total_views, "
+        "COALESCE(SUM(reactions), 0) AS total_reactions, "
+        f"COALESCE(SUM(forwards), 0) AS total_forwards FROM posts{where}",
+        args,
+    ).fetchone()
+    return [dict(row)]
+
+
+def _rpc_bulk_update_post_viral_metrics(
+    database: "SQLiteDatabase", connection: sqlite3.Connection, params: Dict[str, Any]
+) -> List[Dict[str, Any]]:
+    updated = []
+    for update in params.get("updates") or []:
+        cursor = connection.execute(
+            "UPDATE posts SET viral_score = ?, engagement_rate = ?, zscore = ?, "
+            "median_multiplier = ?, last_viral_calculation = ?, updated_at = ? "
+            "WHERE id = ?",
+            [
+                update.get("viral_score"),
+                update.get("engagement_rate"),
+                update.get("zscore"),
+                update.get("median_multiplier"),
+                datetime.utcnow().isoformat(),
+                datetime.utcnow().isoformat(),
+                update.get("id"),
+            ],
+        )
+        if cursor.rowcount:
+            updated.append({"post_id": update.get("id")})
+    return updated
+
+
+def _rpc_get_analysis_health_stats(
+    database: "SQLiteDatabase", connection: sqlite3.Connection, params: Dict[str, Any]
+) -> List[Dict[str, Any]]:
+    since = params.get("p_since")
+    row = connection.execute(
+        "SELECT (SELECT COUNT(*) FROM token_usage WHERE created_at >= ?) AS llm_requests, "
+        "COUNT(*) AS analyses_count, "
+        "SUM(CASE WHEN status = 'failed' THEN 1 ELSE 0 END) AS failed_count, "
+        "AVG(processing_time_seconds) AS avg_processing_time "
+        "FROM post_analysis WHERE created_at >= ?",
+        [since, since],
+    ).fetchone()
+    return [dict(row)]
+
+
+def _snippet(text: str, words: List[str], width: int = 160) -> str:
+    """Фрагмент текста вокруг первого совпадения с выделением <mark>."""
+    lowered = text.lower()
+    positions = [lowered.find(word) for word in words if word in lowered]
+    start = max(0, min(positions) - width // 4) if positions else 0
+    fragment = text[start : start + width]
+    for word in words:
+        fragment = re.sub(
+            f"({re.escape(word)})", r"<mark>\1</mark>", fragment, flags=re.IGNORECASE
+        )
+    return ("..." if start else "") + fragment
+
+
+def _rpc_search_posts(
+    database: "SQLiteDatabase", connection: sqlite3.Connection, params: Dict[str, Any]
+) -> List[Dict[str, Any]]:
+    # Без tsvector: все слова запроса должны встречаться в тексте или названии канала
+    words = _search_words(params.get("search_query"))
+    if not words:
+        return []
+
+    sql, args = _text_search_condition("search_vector", params.get("search_query"))
+    conditions = [sql]
+    if params.get("p_channel_username") is not None:
+        conditions.append("channel_username = ?")
+        args.append(params["p_channel_username"])
+
+    rows = connection.execute(
+        "SELECT id, message_id, channel_username, channel_title, date, text_preview, "
+        "permalink, views, forwards, reactions, viral_score, full_text FROM posts "
+        f"WHERE {' AND '.join(conditions)}",
+        args,
+    ).fetchall()
+
+    results = []
+    for row in rows:
+        post = dict(row)
+        text = post.pop("full_text") or post.get("text_preview") or ""
+        haystack = f"{post.get('channel_title') or ''} {text}".lower()
+        post["rank"] = float(sum(haystack.count(word) for word in words))
+        post["snippet"] = _snippet(text, words)
+        results.append(post)
+
+    results.sort(key=lambda post: (post["rank"], post["date"] or ""), reverse=True)
+    offset = params.get("p_offset") or 0
+    return results[offset : offset + (params.get("p_limit") or 20)]
+
+
+def _rpc_get_daily_stats_totals(
+    database: "SQLiteDatabase", connection: sqlite3.Connection, params: Dict[str, Any]
+) -> List[Dict[str, Any]]:
+    rows = connection.execute(
+        "SELECT day, COUNT(*) AS channels, SUM(posts_count) AS posts_count, "
+        "SUM(total_views) AS total_views, SUM(total_reactions) AS total_reactions, "
+        "SUM(total_forwards) AS total_forwards, SUM(total_replies) AS total_replies, "
+        "SUM(viral_count) AS viral_count, MAX(max_viral_score) AS max_viral_score, "
+        "SUM(avg_engagement_rate * posts_count) / NULLIF(SUM(CASE WHEN "
+        "avg_engagement_rate IS NOT NULL THEN posts_count END), 0) "
+        "AS avg_engagement_rate "
+        "FROM channel_daily_stats WHERE day >= ? AND day <= ? GROUP BY day ORDER BY day",
+        (str(params.get("p_date_from")), str(params.get("p_date_to"))),
+    ).fetchall()
+    return [dict(row) for row in rows]
+
+
+def _rpc_get_channel_stats_totals(
+    database: "SQLiteDatabase", connection: sqlite3.Connection, params: Dict[str, Any]
+) -> List[Dict[str, Any]]:
+    row = connection.execute(
+        "SELECT COALESCE(SUM(posts_count), 0) AS total_posts, "
+        "COALESCE(SUM(total_views), 0) AS total_views, "
+        "COALESCE(SUM(total_reactions), 0) AS total_reactions, "
+        "COALESCE(SUM(total_forwards), 0) AS total_forwards "
+        "FROM channel_daily_stats WHERE channel_username = ?",
+        (params.get("p_channel_username"),),
+    ).fetchone()
+    return [dict(row)]
+
+
+class SQLiteDatabase:
+    """Встроенная база SQLite с интерфейсом клиента supabase-py."""
+
+    RPC_FUNCTIONS: Dict[str, Callable[..., List[Dict[str, Any]]]] = {
+        "count_posts_by_channel": _rpc_count_posts_by_channel,
+        "get_posts_stats": _rpc_get_posts_stats,
+        "bulk_update_post_viral_metrics": _rpc_bulk_update_post_viral_metrics,
+        "search_posts": _rpc_search_posts,
+        "get_analysis_health_stats": _rpc_get_analysis_health_stats,
+        "get_daily_stats_totals": _rpc_get_daily_stats_totals,
+        "get_channel_stats_totals": _rpc_get_channel_stats_totals,
+    }
+
+    def __init__(self, path: str = ":memory:", schema_path: Optional[Path] = None):
+        """
+        Открывает базу и создает таблицы из схемы.
+
+        Args:
+            path: Путь к файлу базы или ":memory:".
+            schema_path: Путь к supabase_schema.sql.
+        """
+        if path != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+
+        self.path = path
+        self._lock = threading.RLock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.row_factory = sqlite3.Row
+        self._connection.create_function("ilike", 2, _ilike, deterministic=True)
+        if path != ":memory:":
+            self._connection.execute("PRAGMA journal_mode=WAL")
+
+        # {таблица: {колонка: тип}}, тип - json, bool или sql
+        self.columns: Dict[str, Dict[str, str]] = {}
+        self._primary_keys: Dict[str, List[str]] = {}
+        self._create_schema(schema_path or SCHEMA_PATH)
+
+    def _create_schema(self, schema_path: Path) -> None:
+        """Создает таблицы, индексы и представления из схемы PostgreSQL."""
+        schema = schema_path.read_text(encoding="utf-8")
+        enum_types = set(re.findall(r"CREATE TYPE (\w+) AS ENUM", schema))
+
+        statements = []
+        for table, body in re.findall(
+            r"CREATE TABLE public\.(\w+) \((.*?)\n\);", schema, re.DOTALL
+        ):
+            if table not in _VIEWS:
+                statements.append(self._translate_table(table, body, enum_types))
+
+        for index, table, columns in re.findall(
+            r"CREATE INDEX (\w+) ON (?:public\.)?(\w+)\(([^)]*)\);", schema
+        ):
+            if table not in _VIEWS:
+                statements.append(
+                    f"CREATE INDEX IF NOT EXISTS {index} ON {table}({columns})"
+                )
+
+        statements.extend(
+            f"CREATE VIEW IF NOT EXISTS {name} AS {query}"
+            for name, query in _VIEWS.items()
+        )
+
+        with self._lock, self._connection:
+            for statement in statements:
+                self._connection.execute(statement)
+        logger.info(f"SQLite storage ready: {self.path} ({len(self.columns)} tables)")
+
+    def _translate_table(self, table: str, body: str, enum_types: set) -> str:
+        """CREATE TABLE PostgreSQL -> CREATE TABLE SQLite."""
+        columns: Dict[str, str] = {}
+        primary_key: List[str] = []
+        definitions = []
+
+        for line in body.strip().splitlines():
+            line = line.strip().rstrip(",")
+            if not line:
+                continue
+            if line.startswith("PRIMARY KEY"):
+                primary_key = [
+                    c.strip() for c in line[line.index("(") + 1 : -1].split(",")
+                ]
+                definitions.append(line)
+                continue
+
+            name, definition = line.split(" ", 1)
+            type_name = definition.split(" ", 1)[0]
+            if type_name == "JSONB" or type_name.endswith("[]"):
+                columns[name] = "json"
+            elif type_name == "BOOLEAN":
+                columns[name] = "bool"
+            else:
+                columns[name] = "sql"
+            if "PRIMARY KEY" in definition:
+                primary_key = [name]
+
+            definition = re.sub(
+                r"REFERENCES\s+[\w.]+\(\w+\)(\s+ON DELETE \w+)?\s*", "", definition
+            )
+            definition = definition.replace(
+                "SERIAL PRIMARY KEY", "INTEGER PRIMARY KEY AUTOINCREMENT"
+            )
+            definition = definition.replace("TIMESTAMP WITH TIME ZONE", "TEXT")
+            definition = definition.replace(
+                "DEFAULT TIMEZONE('utc'::text, NOW())", f"DEFAULT {_NOW_DEFAULT}"
+            )
+            definition = re.sub(r"^(JSONB|UUID|\w+\[\])", "TEXT", definition)
+            if type_name in enum_types:
+                definition = "TEXT" + definition[len(type_name) :]
+            definitions.append(f"{name} {definition}")
+
+        self.columns[table] = columns
+        self._primary_keys[table] = primary_key
+        return (
+            f"CREATE TABLE IF NOT EXISTS {table} (\n    "
+            + ",\n    ".join(definitions)
+            + "\n)"
+        )
+
+    def primary_key(self, table: str) -> List[str]:
+        """Колонки первичного ключа таблицы."""
+        return self._primary_keys.get(table) or ["id"]
+
+    def to_row(self, table: str, row: Dict[str, Any]) -> Dict[str, Any]:
+        """Значения Python -> значения колонок SQLite."""
+        types = self.columns.get(table, {})
+        values = {}
+        for column, value in row.items():
+            if types.get(column) == "json" and value is not None:
+                value = json.dumps(value, ensure_ascii=False, default=str)
+            elif isinstance(value, (datetime, date)):
+                value = value.isoformat()
+            elif isinstance(value, (dict, list)):
+                value = json.dumps(value, ensure_ascii=False, default=str)
+            values[column] = value
+        return values
+
+    def from_row(self, table: str, row: sqlite3.Row) -> Dict[str, Any]:
+        """Строка SQLite -> словарь с типами Python."""
+        types = self.columns.get(table, {})
+        result = {}
+        for column in row.keys():
+            value = row[column]
+            kind = types.get(column)
+            if value is not None and kind == "json":
+                try:
+                    value = json.loads(value)
+                except (TypeError, ValueError):
+                    pass
+            elif value is not None and kind == "bool":
+                value = bool(value)
+            result[column] = value
+        return result
+
+    def run(self, handler: Callable[[sqlite3.Connection], Any]) -> Any:
+        """Выполняет обработчик в транзакции под общей блокировкой."""
+        with self._lock:
+            try:
+                with self._connection:
+                    return handler(self._connection)
+            except sqlite3.IntegrityError as e:
+                raise SQLiteError(str(e), "23000") from e
+            except sqlite3.Error as e:
+                raise SQLiteError(str(e)) from e
+
+    def table(self, name: str) -> SQLiteQuery:
+        """Начинает запрос к таблице (аналог client.table)."""
+        return SQLiteQuery(self, name)
+
+    def from_(self, name: str) -> SQLiteQuery:
+        return self.table(name)
+
+    def rpc(self, name: str, params: Optional[Dict[str, Any]] = None) -> SQLiteRPC:
+        """Вызов функции (аналог client.rpc)."""
+        return SQLiteRPC(self, name, params or {})
+
+    def close(self) -> None:
+        """Закрывает соединение."""
+        with self._lock:
+            self._connection.close()
+
+
+# Одна база на путь: все экземпляры SupabaseClient процесса работают с общими данными
+_databases: Dict[str, SQLiteDatabase] = {}
+_databases_lock = threading.Lock()
+
+
+def get_sqlite_database(path: str) -> SQLiteDatabase:
+    """Возвращает (открывая при первом вызове) базу SQLite по пути."""
+    key = path if path == ":memory:" else os.path.abspath(path)
+    with _databases_lock:
+        if key not in _databases:
+            _databases[key] = SQLiteDatabase(path)
+        return _databases[key]
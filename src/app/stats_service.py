@@ -0,0 +1,134 @@
+"""
+Счетчики для виджета состояния системы.
+
+Количество строк берется из заголовка ответа PostgREST (head-запрос без
+строк) или из таблиц, поддерживаемых триггерами, а метрики анализа - одним
+агрегатным RPC. Результат кэшируется на settings.stats_cache_ttl секунд.
+"""
+
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+
+from .cache import TTLCache
+from .settings import settings
+from .supabase_client import SupabaseClient
+from .utils import setup_logger
+
+# Настройка логирования
+logger = setup_logger(__name__)
+
+# Период для метрик анализа (LLM-запросы, время обработки, ошибки)
+ANALYSIS_WINDOW_DAYS = 7
+
+_EMPTY_HEALTH_STATS: Dict[str, Any] = {
+    "total_posts": 0,
+    "posts_today": 0,
+    "active_channels": 0,
+    "recent_analysis": 0,
+    "avg_processing_time": 0.0,
+    "error_rate": 0.0,
+}
+
+
+class StatsService:
+    """Дешевые счетчики для /api/stats/health с коротким кэшем."""
+
+    def __init__(self, db: SupabaseClient, cache_ttl: Optional[float] = None):
+        """
+        Инициализирует сервис.
+
+        Args:
+            db: Клиент базы данных.
+            cache_ttl: Время жизни кэша в секундах (по умолчанию из настроек).
+        """
+        self.db = db
+        self._cache = TTLCache(
+            settings.stats_cache_ttl if cache_ttl is None else cache_ttl
+        )
+
+    def _head_count(self, table: str, count: str = "exact", **filters: Any) -> int:
+        """Количество строк по заголовку ответа, без передачи самих строк."""
+        query = self.db.client.table(table).select("id", count=count, head=True)
+        for column, value in filters.items():
+            query = query.eq(column, value)
+        return query.execute().count or 0
+
+    def _total_posts(self) -> int:
+        """Всего постов: строка posts_totals, иначе оценка планировщика."""
+        try:
+            result = (
+                self.db.client.table("posts_totals").select("total_posts").execute()
+            )
+            if result.data:
+                return int(result.data[0]["total_posts"] or 0)
+        except Exception as e:
+            logger.warning(f"posts_totals недоступна, используем оценку: {e}")
+        return self._head_count("posts", count="planned")
+
+    def _posts_today(self) -> int:
+        """Постов с начала суток UTC (диапазон по индексу даты)."""
+        today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+        query = (
+            self.db.client.table("posts")
+            .select("id", count="exact", head=True)
+            .gte("date", today.isoformat())
+        )
+        return query.execute().count or 0
+
+    def _analysis_stats(self) -> Dict[str, Any]:
+        """LLM-запросы, среднее время обработки и процент ошибок за период."""
+        since = datetime.utcnow() - timedelta(days=ANALYSIS_WINDOW_DAYS)
+        result = self.db.client.rpc(
+            "get_analysis_health_stats", {"p_since": since.isoformat()}
+        ).execute()
+        row = (result.data or [{}])[0]
+
+        analyses = int(row.get("analyses_count") or 0)
+        failed = int(row.get("failed_count") or 0)
+        return {
+            "recent_analysis": int(row.get("llm_requests") or 0),
+            "avg_processing_time": round(float(row.get("avg_processing_time") or 0), 2),
+            "error_rate": round(failed / analyses * 100, 2) if analyses else 0.0,
+        }
+
+    def get_health_stats(self) -> Dict[str, Any]:
+        """
+        Счетчики для виджета состояния системы.
+
+        Returns:
+            {"total_posts", "posts_today", "active_channels", "recent_analysis",
+            "avg_processing_time", "error_rate"}; при ошибке БД - нули
+            (ошибочный результат не кэшируется)
+        """
+        cached = self._cache.get("health")
+        if cached is not None:
+            return cached
+
+        if not self.db.client:
+            return dict(_EMPTY_HEALTH_STATS)
+
+        try:
+            stats = {
+                "total_posts": self._total_posts(),
+                "posts_today": self._posts_today(),
+                "active_channels": self._head_count("channels", is_active=True),
+            }
+        except Exception as e:
+            self.db.mark_query_failed(e)
+            logger.error(f"Error getting stats from database: {e}")
+            return dict(_EMPTY_HEALTH_STATS)
+
+        try:
+            stats.update(self._analysis_stats())
+        except Exception as e:
+            logger.warning(f"Не удалось получить метрики анализа: {e}")
+            stats.update(
+                {"recent_analysis": 0, "avg_processing_time": 0.0, "error_rate": 0.0}
+            )
+
+        self._cache.set("health", stats)
+        return stats
+
+    def invalidate(self) -> None:
+        """Сбрасывает кэш счетчиков."""
+        self._cache.clear()
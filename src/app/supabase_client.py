@@ -3,10 +3,14 @@ Supabase клиент для интеграции с базой данных.
 Обеспечивает хранение и извлечение данных постов, анализов и сценариев.
 """
 
+import copy
 import json
 import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Dict, List, Optional, Set, Tuple
 
 try:
     from postgrest.exceptions import APIError
@@ -19,6 +23,17 @@ except ImportError:
     Client = None
     APIError = Exception
 
+try:
+    import httpx
+
+    # Ошибки, после которых соединение с БД считается нездоровым
+    NETWORK_ERRORS: Tuple[type, ...] = (httpx.TransportError, ConnectionError, TimeoutError)
+except ImportError:
+    NETWORK_ERRORS = (ConnectionError, TimeoutError)
+
+from .bloom_filter import BloomFilter
+from .cache import TTLCache
+from .pagination import apply_keyset, encode_cursor, quote_filter_value
 from .settings import settings
 
 logger = logging.getLogger(__name__)
@@ -27,6 +42,63 @@ logger = logging.getLogger(__name__)
 class SupabaseClient:
     """Клиент для работы с Supabase."""
 
+    # Наборы колонок posts для select(). full_text и особенно raw_data (копия
+    # всего сообщения) занимают большую часть строки, поэтому массовые чтения
+    # берут минимальный профиль. "*" не используется нигде: он вернул бы и
+    # служебный search_vector (сериализованный tsvector размером с текст)
+    POST_COLUMN_PROFILES: Dict[str, str] = {
+        # Счетчики для базовых метрик и расчета виральности
+        "metrics-only": (
+            "id, message_id, channel_username, date, views, forwards, reactions, replies"
+        ),
+        # Строка списка постов: все, кроме raw_data
+        "list-card": (
+            "id, message_id, channel_username, channel_title, date, text_preview, "
+            "full_text, media_urls, permalink, views, forwards, replies, reactions, "
+            "participants_count, has_media, created_at, updated_at, viral_score, "
+            "engagement_rate, zscore, median_multiplier, last_viral_calculation"
+        ),
+        # Полная карточка поста: все, кроме search_vector
+        "detail": (
+            "id, message_id, channel_username, channel_title, date, text_preview, "
+            "full_text, media_urls, permalink, raw_data, views, forwards, replies, "
+            "reactions, participants_count, has_media, created_at, updated_at, "
+            "viral_score, engagement_rate, zscore, median_multiplier, "
+            "last_viral_calculation"
+        ),
+    }
+
+    @classmethod
+    def post_columns(cls, profile: str) -> str:
+        """
+        Колонки posts для профиля запроса.
+
+        Raises:
+            KeyError: Если профиль неизвестен.
+        """
+        return cls.POST_COLUMN_PROFILES[profile]
+
+    # post_id постов, у которых может быть завершенный анализ. Общий для всех
+    # экземпляров процесса: анализ, сохраненный через один клиент, должен быть
+    # виден проверке дубликатов через другой
+    _processed_filter = BloomFilter(
+        settings.processed_filter_capacity, settings.processed_filter_error_rate
+    )
+    _processed_filter_warmed = False
+
+    # Снимок system_settings {key: value}, общий для всех экземпляров процесса
+    _settings_snapshot: Optional[Dict[str, Any]] = None
+    _settings_loaded_at = 0.0
+    _settings_lock = threading.Lock()
+
+    # Каналы с базовыми метриками для списка в API (сбрасывается при сохранении метрик)
+    _baselines_cache = TTLCache(settings.baselines_cache_ttl)
+
+    # Состояние соединения с БД: результат последней проверки и фоновый монитор
+    _health: Dict[str, Any] = {"healthy": None, "checked_at": 0.0, "error": None}
+    _health_monitor: Optional[threading.Thread] = None
+    _health_monitor_stop = threading.Event()
+
     def __init__(self):
         self.client: Optional[Any] = None
         self._initialize_client()
@@ -34,6 +106,14 @@ class SupabaseClient:
     def _initialize_client(self):
         """Инициализация Supabase клиента."""
         try:
+            if settings.storage_backend == "sqlite":
+                # Встроенная база с тем же интерфейсом запросов
+                from .sqlite_backend import get_sqlite_database
+
+                self.client = get_sqlite_database(settings.sqlite_path)
+                logger.info(f"Using SQLite storage backend: {settings.sqlite_path}")
+                return
+
             if not SUPABASE_AVAILABLE:
                 logger.warning(
                     "Supabase library not available, running without database"
@@ -66,19 +146,103 @@ class SupabaseClient:
             logger.error(f"Failed to initialize Supabase client: {e}")
             self.client = None
 
-    def is_connected(self) -> bool:
-        """Проверка подключения к Supabase."""
+    def _set_health(self, healthy: bool, error: Optional[str] = None) -> None:
+        """Записывает результат проверки соединения."""
+        if healthy != SupabaseClient._health["healthy"]:
+            if healthy:
+                logger.info("Supabase connection is healthy")
+            else:
+                logger.error(f"Supabase connection is unhealthy: {error}")
+        SupabaseClient._health = {
+            "healthy": healthy,
+            "checked_at": time.monotonic(),
+            "checked_at_utc": datetime.utcnow().isoformat(),
+            "error": error,
+        }
+
+    def check_connection(self) -> bool:
+        """Проверочный запрос к Supabase (обновляет кэшированное состояние)."""
         if not self.client:
             return False
 
         try:
-            # Простая проверка подключения
-            result = self.client.table("channels").select("count").limit(1).execute()
+            self.client.table("channels").select("count").limit(1).execute()
+            self._set_health(True)
             return True
         except Exception as e:
-            logger.error(f"Supabase connection check failed: {e}")
+            self._set_health(False, str(e))
+            return False
+
+    def is_connected(self) -> bool:
+        """
+        Проверка подключения к Supabase.
+
+        Возвращает кэшированное состояние; проверочный запрос выполняется,
+        только если результат старше settings.db_health_ttl секунд
+        (при запущенном мониторе состояние обновляется в фоне).
+        """
+        if not self.client:
             return False
 
+        health = SupabaseClient._health
+        age = time.monotonic() - health["checked_at"]
+        if health["healthy"] is not None and age < settings.db_health_ttl:
+            return health["healthy"]
+        return self.check_connection()
+
+    def mark_query_failed(self, error: Exception) -> None:
+        """
+        Учитывает ошибку рабочего запроса в состоянии соединения.
+
+        Ошибки уровня запроса (APIError) означают, что БД ответила, поэтому
+        нездоровым соединение помечают только сетевые ошибки.
+        """
+        if isinstance(error, NETWORK_ERRORS):
+            self._set_health(False, str(error))
+
+    def _health_loop(self, interval: float) -> None:
+        """Цикл фонового монитора соединения."""
+        while not SupabaseClient._health_monitor_stop.wait(interval):
+            self.check_connection()
+
+    def start_health_monitor(self, interval: Optional[float] = None) -> None:
+        """Запускает фоновую проверку соединения (один монитор на процесс)."""
+        monitor = SupabaseClient._health_monitor
+        if not self.client or (monitor and monitor.is_alive()):
+            return
+
+        self.check_connection()
+        SupabaseClient._health_monitor_stop.clear()
+        SupabaseClient._health_monitor = threading.Thread(
+            target=self._health_loop,
+            args=(interval or settings.db_health_interval,),
+            name="supabase-health",
+            daemon=True,
+        )
+        SupabaseClient._health_monitor.start()
+
+    def stop_health_monitor(self) -> None:
+        """Останавливает фоновую проверку соединения."""
+        SupabaseClient._health_monitor_stop.set()
+        SupabaseClient._health_monitor = None
+
+    def get_health_status(self) -> Dict[str, Any]:
+        """Состояние соединения и давность последней проверки."""
+        health = SupabaseClient._health
+        checked = health["checked_at"] > 0
+        return {
+            "healthy": bool(self.client) and bool(health["healthy"]),
+            "checked_at": health.get("checked_at_utc"),
+            "age_seconds": round(time.monotonic() - health["checked_at"], 1)
+            if checked
+            else None,
+            "error": health["error"] if self.client else "no database connection",
+            "monitor_running": bool(
+                SupabaseClient._health_monitor
+                and SupabaseClient._health_monitor.is_alive()
+            ),
+        }
+
     # ===== КАНАЛЫ =====
 
     def get_channels(self, active_only: bool = True) -> List[Dict[str, Any]]:
@@ -95,6 +259,7 @@ class SupabaseClient:
             return result.data
         except Exception as e:
             logger.error(f"Error fetching channels: {e}")
+            self.mark_query_failed(e)
             return []
 
     def upsert_channel(
@@ -191,8 +356,202 @@ class SupabaseClient:
             logger.error(f"Error updating channel last_parsed for {username}: {e}")
             return False
 
+    @staticmethod
+    def _channel_username_variants(username: str) -> List[str]:
+        """Канонический (@username) и старый (без @) варианты username канала."""
+        bare = username.lstrip("@")
+        return [f"@{bare}", bare]
+
+    def get_channel_watermark(self, username: str) -> Optional[int]:
+        """Получить watermark канала - последний сохраненный message_id."""
+        if not self.client:
+            return None
+
+        try:
+            result = (
+                self.client.table("channels")
+                .select("last_message_id")
+                .in_("username", self._channel_username_variants(username))
+                .limit(1)
+                .execute()
+            )
+            if result.data:
+                return result.data[0].get("last_message_id")
+            return None
+        except Exception as e:
+            logger.error(f"Error getting channel watermark for {username}: {e}")
+            return None
+
+    def update_channel_watermark(self, username: str, message_id: int) -> bool:
+        """Сдвинуть watermark канала вперед (только если message_id больше)."""
+        if not self.client or not message_id:
+            return False
+
+        try:
+            result = (
+                self.client.table("channels")
+                .update({"last_message_id": message_id})
+                .in_("username", self._channel_username_variants(username))
+                .or_(f"last_message_id.is.null,last_message_id.lt.{message_id}")
+                .execute()
+            )
+            return len(result.data) > 0
+        except Exception as e:
+            logger.error(f"Error updating channel watermark for {username}: {e}")
+            return False
+
+    @staticmethod
+    def saved_watermark(posts: List[Dict[str, Any]], saved_count: int) -> Optional[int]:
+        """
+        Новый watermark по результату save_posts_batch.
+
+        Returns:
+            Максимальный message_id пачки, если сохранены все ее посты;
+            иначе None - watermark двигать нельзя, несохраненные сообщения
+            при следующем запуске отсек бы min_id.
+        """
+        if not posts or saved_count < len(posts):
+            return None
+        return max(post["message_id"] for post in posts)
+
+    def get_backfill_checkpoint(self, username: str) -> Optional[Dict[str, Any]]:
+        """Получить чекпоинт догрузки истории канала."""
+        if not self.client:
+            return None
+
+        try:
+            result = (
+                self.client.table("channels")
+                .select(
+                    "backfill_status, backfill_offset_id, backfill_updated_at, backfill_completed_at"
+                )
+                .in_("username", self._channel_username_variants(username))
+                .limit(1)
+                .execute()
+            )
+            return result.data[0] if result.data else None
+        except Exception as e:
+            logger.error(f"Error getting backfill checkpoint for {username}: {e}")
+            return None
+
+    def save_backfill_checkpoint(
+        self, username: str, status: str, offset_id: Optional[int] = None
+    ) -> bool:
+        """Сохранить чекпоинт догрузки истории канала."""
+        if not self.client:
+            return False
+
+        try:
+            now = datetime.utcnow().isoformat()
+            data = {"backfill_status": status, "backfill_updated_at": now}
+            if offset_id is not None:
+                data["backfill_offset_id"] = offset_id
+            if status == "completed":
+                data["backfill_completed_at"] = now
+
+            result = (
+                self.client.table("channels")
+                .update(data)
+                .in_("username", self._channel_username_variants(username))
+                .execute()
+            )
+            return len(result.data) > 0
+        except Exception as e:
+            logger.error(f"Error saving backfill checkpoint for {username}: {e}")
+            return False
+
     # ===== ПОСТЫ =====
 
+    def warm_processed_filter(self, page_size: int = 1000) -> int:
+        """
+        Загружает post_id обработанных постов в фильтр Блума.
+
+        Returns:
+            Количество загруженных post_id.
+        """
+        if not self.client:
+            return 0
+
+        try:
+            # На время прогрева проверки идут мимо фильтра
+            SupabaseClient._processed_filter_warmed = False
+            self._processed_filter.clear()
+            loaded = 0
+            offset = 0
+            while True:
+                result = (
+                    self.client.table("post_analysis")
+                    .select("post_id")
+                    .eq("status", "completed")
+                    .order("id")
+                    .range(offset, offset + page_size - 1)
+                    .execute()
+                )
+                rows = result.data or []
+                self._processed_filter.update(
+                    row["post_id"] for row in rows if row.get("post_id")
+                )
+                loaded += len(rows)
+                if len(rows) < page_size:
+                    break
+                offset += page_size
+
+            SupabaseClient._processed_filter_warmed = True
+            logger.info(f"Processed posts filter warmed with {loaded} post ids")
+            return loaded
+        except Exception as e:
+            logger.error(f"Error warming processed posts filter: {e}")
+            SupabaseClient._processed_filter_warmed = False
+            return 0
+
+    def get_processed_message_ids(
+        self,
+        channel_username: str,
+        message_ids: List[int],
+        analysis_type: str = None,
+        chunk_size: int = 200,
+    ) -> Set[int]:
+        """
+        Возвращает message_id канала, посты которых уже обработаны.
+
+        Посты, которых точно нет в фильтре Блума, отсеиваются без запроса,
+        остальные проверяются одним запросом in_ на пачку.
+        Фильтр знает только анализы, сохраненные до прогрева или через этот
+        процесс, поэтому без прогрева проверяется вся пачка.
+        """
+        if not self.client or not message_ids:
+            return set()
+
+        if not self._processed_filter_warmed:
+            self.warm_processed_filter()
+
+        post_ids = {f"{message_id}_{channel_username}": message_id for message_id in message_ids}
+        if self._processed_filter_warmed:
+            candidates = [post_id for post_id in post_ids if post_id in self._processed_filter]
+        else:
+            candidates = list(post_ids)
+
+        processed: Set[int] = set()
+        try:
+            # Пачками, чтобы не упереться в длину URL
+            for start in range(0, len(candidates), chunk_size):
+                query = (
+                    self.client.table("post_analysis")
+                    .select("post_id")
+                    .in_("post_id", candidates[start : start + chunk_size])
+                    .eq("status", "completed")
+                )
+                if analysis_type:
+                    query = query.eq("analysis_type", analysis_type)
+
+                result = query.execute()
+                processed.update(post_ids[row["post_id"]] for row in result.data or [])
+        except Exception as e:
+            logger.error(f"Error checking processed posts for {channel_username}: {e}")
+            self.mark_query_failed(e)
+
+        return processed
+
     def is_post_processed(
         self, message_id: int, channel_username: str, analysis_type: str = None
     ) -> bool:
@@ -202,6 +561,10 @@ class SupabaseClient:
 
         try:
             post_id = f"{message_id}_{channel_username}"
+            # Отрицательный ответ фильтра Блума точный - запрос не нужен
+            if self._processed_filter_warmed and post_id not in self._processed_filter:
+                return False
+
             query = (
                 self.client.table("post_analysis").select("id").eq("post_id", post_id)
             )
@@ -224,13 +587,138 @@ class SupabaseClient:
         channel_description = channel_info.get("about") if channel_info else None
         return self.upsert_channel(channel_username, channel_title, channel_description)
 
+    @staticmethod
+    def _prepare_post_row(post: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Преобразует пост в строку таблицы posts (None, если нет даты)."""
+        # Убеждаемся, что поле date присутствует
+        if "date" not in post and "raw_data" in post:
+            raw_data = post.get("raw_data", {})
+            if isinstance(raw_data, str):
+                try:
+                    raw_data = json.loads(raw_data)
+                except Exception:
+                    raw_data = {}
+
+            if "date" in raw_data:
+                post["date"] = raw_data["date"]
+
+        if "date" not in post:
+            return None
+
+        channel_username = (
+            post["channel_username"]
+            if post["channel_username"].startswith("@")
+            else f"@{post['channel_username']}"
+        )
+        return {
+            "id": f"{post['message_id']}_{channel_username}",
+            "message_id": post["message_id"],
+            "channel_username": channel_username,
+            "channel_title": post.get("channel_title"),
+            "date": post["date"],
+            "text_preview": post.get("text_preview", "")[:500],  # Ограничим длину
+            "full_text": post.get("text", ""),
+            "views": post.get("views", 0),
+            "forwards": post.get("forwards", 0),
+            "replies": post.get("replies", 0),
+            "reactions": post.get("reactions", 0),
+            "participants_count": post.get("participants_count", 0),
+            "has_media": post.get("has_media", False),
+            "permalink": post.get("permalink"),
+            # JSONB-объект: сериализуется один раз вместе со всем запросом
+            "raw_data": post,
+        }
+
+    @staticmethod
+    def _chunk_rows(
+        rows: List[Dict[str, Any]], max_rows: int, max_bytes: int
+    ) -> List[List[Dict[str, Any]]]:
+        """Разбивает строки на пачки не больше max_rows строк и max_bytes байт."""
+        chunks: List[List[Dict[str, Any]]] = []
+        chunk: List[Dict[str, Any]] = []
+        chunk_bytes = 0
+        for row in rows:
+            row_bytes = len(json.dumps(row, default=str))
+            if chunk and (len(chunk) >= max_rows or chunk_bytes + row_bytes > max_bytes):
+                chunks.append(chunk)
+                chunk, chunk_bytes = [], 0
+            chunk.append(row)
+            chunk_bytes += row_bytes
+        if chunk:
+            chunks.append(chunk)
+        return chunks
+
+    @staticmethod
+    def _is_row_level_error(error: Exception) -> bool:
+        """
+        Ошибка из-за данных отдельных строк (а не сети или сервера).
+
+        Это ошибка с кодом SQLSTATE классов 22 (некорректные данные) и 23
+        (нарушение ограничений) или с кодом PGRST1xx (ошибка запроса), как
+        у APIError из postgrest и SQLiteError.
+        """
+        code = str(getattr(error, "code", None) or "")
+        return code.startswith(("22", "23", "PGRST1"))
+
+    def _upsert_posts_chunk(self, rows: List[Dict[str, Any]], retries: int) -> int:
+        """
+        Записывает пачку постов с повторами.
+
+        Если пачку отклонили из-за данных строк, она делится пополам и
+        половины записываются отдельно: одна сбойная строка не теряет всю
+        пачку. Сетевые и серверные ошибки повторяются с паузой, после чего
+        пачка считается несохраненной без деления - во время сбоя БД деление
+        только умножило бы число запросов.
+
+        Returns:
+            Количество сохраненных постов.
+        """
+        for attempt in range(retries + 1):
+            try:
+                # upsert обновляет статистику уже сохраненных постов
+                result = (
+                    self.client.table("posts")
+                    .upsert(rows, on_conflict="id", ignore_duplicates=False)
+                    .execute()
+                )
+                return len(result.data)
+            except Exception as e:
+                error = e
+                self.mark_query_failed(e)
+                # Повтор не исправит данные строк - сразу делим пачку
+                if self._is_row_level_error(e):
+                    break
+                if attempt < retries:
+                    time.sleep(0.5 * 2**attempt)
+
+        if not self._is_row_level_error(error):
+            logger.error(f"Error saving posts chunk of {len(rows)} rows: {error}")
+            return 0
+
+        if len(rows) == 1:
+            logger.error(f"Error saving post {rows[0]['id']}: {error}")
+            return 0
+
+        middle = len(rows) // 2
+        logger.warning(
+            f"Posts chunk of {len(rows)} rows rejected ({error}), retrying halves separately"
+        )
+        return self._upsert_posts_chunk(rows[:middle], 0) + self._upsert_posts_chunk(
+            rows[middle:], 0
+        )
+
     def save_posts_batch(
         self,
         posts: List[Dict[str, Any]],
         channel_username: str = None,
         channel_info: Dict[str, Any] = None,
     ) -> int:
-        """Сохранить batch постов в базу данных."""
+        """
+        Сохранить batch постов в базу данных.
+
+        Посты отправляются пачками, ограниченными по числу строк и размеру
+        запроса; несколько пачек пишутся параллельно (settings.posts_write_*).
+        """
         if not self.client:
             return 0
 
@@ -245,84 +733,51 @@ class SupabaseClient:
                     channel_username, channel_title, channel_description
                 )
 
-            # Подготовим данные для вставки
             posts_data = []
+            skipped = 0
             for post in posts:
-                logger.info(
-                    f"Подготавливаем пост для сохранения: message_id={post.get('message_id')}, channel={post.get('channel_username')}"
-                )
-                logger.info(f"Поля поста: {list(post.keys())}")
-                logger.info(f"Date в посте: {post.get('date', 'MISSING')}")
-
-                # Убеждаемся, что поле date присутствует
-                if "date" not in post and "raw_data" in post:
-                    raw_data = post.get("raw_data", {})
-                    if isinstance(raw_data, str):
-                        try:
-                            raw_data = json.loads(raw_data)
-                        except Exception as e:
-                            logger.warning(f"Не удалось распарсить raw_data: {e}")
-                            raw_data = {}
-
-                    if "date" in raw_data:
-                        post["date"] = raw_data["date"]
-                        logger.info(f"Восстановили date из raw_data: {post['date']}")
-
-                # Проверяем наличие обязательных полей
-                if "date" not in post:
-                    logger.error(
-                        f"Поле date отсутствует в посте {post.get('message_id', 'unknown')}"
-                    )
+                row = self._prepare_post_row(post)
+                if row is None:
+                    skipped += 1
                     continue
+                posts_data.append(row)
 
-                post_data = {
-                    "id": f"{post['message_id']}_{post['channel_username'] if post['channel_username'].startswith('@') else '@' + post['channel_username']}",
-                    "message_id": post["message_id"],
-                    "channel_username": post["channel_username"]
-                    if post["channel_username"].startswith("@")
-                    else f"@{post['channel_username']}",
-                    "channel_title": post.get("channel_title"),
-                    "date": post["date"],
-                    "text_preview": post.get("text_preview", "")[
-                        :500
-                    ],  # Ограничим длину
-                    "full_text": post.get("text", ""),
-                    "views": post.get("views", 0),
-                    "forwards": post.get("forwards", 0),
-                    "replies": post.get("replies", 0),
-                    "reactions": post.get("reactions", 0),
-                    "participants_count": post.get("participants_count", 0),
-                    "has_media": post.get("has_media", False),
-                    "permalink": post.get("permalink"),
-                    "raw_data": json.dumps(post),
-                }
-                posts_data.append(post_data)
+            if skipped:
+                logger.warning(f"Skipped {skipped} posts without date")
+            if not posts_data:
+                return 0
 
-            if posts_data:
-                # Используем upsert для избежания дубликатов и обновления статистики существующих постов
-                result = (
-                    self.client.table("posts")
-                    .upsert(
-                        posts_data,
-                        on_conflict="id",
-                        ignore_duplicates=False,  # Обновляем существующие записи
-                    )
-                    .execute()
+            started_at = time.monotonic()
+            chunks = self._chunk_rows(
+                posts_data,
+                max(1, settings.posts_write_chunk_rows),
+                settings.posts_write_chunk_bytes,
+            )
+            retries = max(0, settings.posts_write_retries)
+            workers = max(1, min(settings.posts_write_concurrency, len(chunks)))
+
+            if workers == 1:
+                saved_count = sum(
+                    self._upsert_posts_chunk(chunk, retries) for chunk in chunks
                 )
-                saved_count = len(result.data)
-                logger.info(f"Saved/updated {saved_count} posts to database")
-                return saved_count
             else:
-                return 0
+                with ThreadPoolExecutor(max_workers=workers) as executor:
+                    saved_count = sum(
+                        executor.map(
+                            lambda chunk: self._upsert_posts_chunk(chunk, retries),
+                            chunks,
+                        )
+                    )
+
+            elapsed = max(time.monotonic() - started_at, 1e-6)
+            logger.info(
+                f"Saved/updated {saved_count}/{len(posts_data)} posts to database "
+                f"in {len(chunks)} chunks ({saved_count / elapsed:.0f} rows/s)"
+            )
+            return saved_count
 
         except Exception as e:
             logger.error(f"Error saving posts batch: {e}")
-            # Добавим отладочную информацию
-            if posts_data:
-                logger.error(f"First post data: {posts_data[0]}")
-                logger.error(
-                    f"Channel username in post: {posts_data[0].get('channel_username')}"
-                )
             return 0
 
     def get_recent_posts(
@@ -336,7 +791,7 @@ class SupabaseClient:
             since_date = datetime.utcnow() - timedelta(days=days)
             result = (
                 self.client.table("posts")
-                .select("*")
+                .select(self.post_columns("list-card"))
                 .gte("date", since_date.isoformat())
                 .order("date", desc=True)
                 .limit(limit)
@@ -347,6 +802,147 @@ class SupabaseClient:
             logger.error(f"Error fetching recent posts: {e}")
             return []
 
+    def get_posts_page(
+        self,
+        channel_username: str,
+        columns: Optional[str] = None,
+        page_size: int = 1000,
+        cursor: Optional[str] = None,
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        Страница постов канала по убыванию даты с keyset-курсором.
+
+        Args:
+            channel_username: Username канала
+            columns: Список колонок для select (должен включать id и date;
+                по умолчанию профиль "detail")
+            page_size: Размер страницы
+            cursor: Курсор из предыдущего вызова (None - первая страница)
+
+        Returns:
+            Кортеж (посты, курсор следующей страницы или None)
+
+        Raises:
+            Exception: Ошибка запроса пробрасывается, чтобы обход не
+                завершился молча на середине таблицы.
+        """
+        if not self.client:
+            return [], None
+
+        query = (
+            self.client.table("posts")
+            .select(columns or self.post_columns("detail"))
+            .eq("channel_username", channel_username)
+        )
+        try:
+            result = (
+                apply_keyset(query, "date", True, cursor).limit(page_size).execute()
+            )
+        except Exception as e:
+            self.mark_query_failed(e)
+            logger.error(f"Error fetching posts page for {channel_username}: {e}")
+            raise
+
+        posts = result.data or []
+        next_cursor = (
+            encode_cursor(posts[-1], "date") if len(posts) == page_size else None
+        )
+        return posts, next_cursor
+
+    def get_posts_for_metrics_refresh(
+        self,
+        days: int = 7,
+        channel_usernames: Optional[List[str]] = None,
+        limit: int = 10000,
+        page_size: int = 1000,
+    ) -> Dict[str, List[int]]:
+        """
+        Получить message_id недавних постов, сгруппированные по каналам.
+
+        Посты читаются страницами по keyset-курсору (date, id): один запрос
+        PostgREST обрезал бы ответ до лимита строк сервера (1000 по умолчанию).
+        """
+        if not self.client:
+            return {}
+
+        try:
+            since_date = datetime.utcnow() - timedelta(days=days)
+            usernames = (
+                [
+                    username if username.startswith("@") else f"@{username}"
+                    for username in channel_usernames
+                ]
+                if channel_usernames
+                else None
+            )
+
+            posts_by_channel: Dict[str, List[int]] = {}
+            cursor, fetched = None, 0
+            while fetched < limit:
+                query = (
+                    self.client.table("posts")
+                    .select("id, channel_username, message_id, date")
+                    .gte("date", since_date.isoformat())
+                )
+                if usernames:
+                    query = query.in_("channel_username", usernames)
+
+                page_limit = min(page_size, limit - fetched)
+                rows = (
+                    apply_keyset(query, "date", True, cursor)
+                    .limit(page_limit)
+                    .execute()
+                    .data
+                )
+                for row in rows:
+                    posts_by_channel.setdefault(row["channel_username"], []).append(
+                        row["message_id"]
+                    )
+                fetched += len(rows)
+                if len(rows) < page_limit:
+                    break
+                cursor = encode_cursor(rows[-1], "date")
+            return posts_by_channel
+        except Exception as e:
+            logger.error(f"Error fetching posts for metrics refresh: {e}")
+            return {}
+
+    def update_posts_counters(
+        self, channel_username: str, counters: List[Dict[str, Any]]
+    ) -> int:
+        """Обновить счетчики (views, forwards, replies, reactions) существующих постов."""
+        if not self.client or not counters:
+            return 0
+
+        if not channel_username.startswith("@"):
+            channel_username = f"@{channel_username}"
+
+        try:
+            now = datetime.utcnow().isoformat()
+            rows = [
+                {
+                    "id": f"{counter['message_id']}_{channel_username}",
+                    "message_id": counter["message_id"],
+                    "channel_username": channel_username,
+                    "date": counter["date"],
+                    "views": counter.get("views", 0),
+                    "forwards": counter.get("forwards", 0),
+                    "replies": counter.get("replies", 0),
+                    "reactions": counter.get("reactions", 0),
+                    "participants_count": counter.get("participants_count", 0),
+                    "updated_at": now,
+                }
+                for counter in counters
+            ]
+            # Upsert обновляет только переданные колонки, остальные поля поста не трогаются
+            result = (
+                self.client.table("posts").upsert(rows, on_conflict="id").execute()
+            )
+            return len(result.data)
+        except Exception as e:
+            logger.error(f"Error updating posts counters for {channel_username}: {e}")
+            return 0
+
     # ===== МЕТРИКИ =====
 
     def save_post_metrics(self, metrics: List[Dict[str, Any]]) -> int:
@@ -397,9 +993,13 @@ class SupabaseClient:
                 .upsert(analysis_data, on_conflict="post_id,analysis_type")
                 .execute()
             )
+            if result.data and analysis_data.get("post_id"):
+                # Лишний post_id в фильтре безопасен: его проверит запрос к БД
+                self._processed_filter.add(analysis_data["post_id"])
             return len(result.data) > 0
         except Exception as e:
             logger.error(f"Error saving post analysis: {e}")
+            self.mark_query_failed(e)
             return False
 
     def get_post_analysis(
@@ -726,6 +1326,7 @@ class SupabaseClient:
                 .eq("id", channel_id)
                 .execute()
             )
+            self.invalidate_baselines_cache()
             return len(result.data) > 0
         except Exception as e:
             logger.error(f"Error updating channel {channel_id}: {e}")
@@ -740,6 +1341,7 @@ class SupabaseClient:
             result = (
                 self.client.table("channels").delete().eq("id", channel_id).execute()
             )
+            self.invalidate_baselines_cache()
             return len(result.data) > 0
         except Exception as e:
             logger.error(f"Error deleting channel {channel_id}: {e}")
@@ -800,24 +1402,60 @@ class SupabaseClient:
 
     # === МЕТОДЫ ДЛЯ РАБОТЫ С СИСТЕМНЫМИ НАСТРОЙКАМИ ===
 
+    @staticmethod
+    def _parse_setting_value(value: Any) -> Any:
+        """Разбирает значение, сохраненное как JSON-строка объекта или списка."""
+        if isinstance(value, str):
+            try:
+                parsed = json.loads(value)
+            except ValueError:
+                return value
+            if isinstance(parsed, (dict, list)):
+                return parsed
+        return value
+
+    def _get_settings_snapshot(self) -> Optional[Dict[str, Any]]:
+        """
+        Возвращает снимок всех системных настроек.
+
+        Снимок загружается одним запросом и обновляется по истечении
+        settings.system_settings_cache_ttl секунд.
+        """
+        cls = SupabaseClient
+        with cls._settings_lock:
+            age = time.monotonic() - cls._settings_loaded_at
+            if cls._settings_snapshot is not None and age < settings.system_settings_cache_ttl:
+                return cls._settings_snapshot
+
+            try:
+                result = self.client.table("system_settings").select("key, value").execute()
+                cls._settings_snapshot = {
+                    row["key"]: self._parse_setting_value(row["value"])
+                    for row in result.data or []
+                }
+                cls._settings_loaded_at = time.monotonic()
+            except Exception as e:
+                logger.error(f"Error loading system settings snapshot: {e}")
+                self.mark_query_failed(e)
+                # Лучше устаревшие настройки, чем никаких
+            return cls._settings_snapshot
+
+    def invalidate_settings_cache(self) -> None:
+        """Сбрасывает снимок системных настроек (следующее чтение загрузит свежий)."""
+        with SupabaseClient._settings_lock:
+            SupabaseClient._settings_snapshot = None
+            SupabaseClient._settings_loaded_at = 0.0
+
     def get_system_setting(self, key: str) -> Optional[Any]:
-        """Получить системную настройку по ключу."""
+        """Получить системную настройку по ключу (из снимка system_settings)."""
         if not self.client:
             return None
 
-        try:
-            result = (
-                self.client.table("system_settings")
-                .select("value")
-                .eq("key", key)
-                .execute()
-            )
-            if result.data and len(result.data) > 0:
-                return result.data[0]["value"]
-            return None
-        except Exception as e:
-            logger.error(f"Error getting system setting {key}: {e}")
+        snapshot = self._get_settings_snapshot()
+        if snapshot is None:
             return None
+        # Копия: вызывающий код может менять полученный словарь
+        return copy.deepcopy(snapshot.get(key))
 
     def update_system_setting(
         self, key: str, value: Any, description: Optional[str] = None
@@ -834,6 +1472,7 @@ class SupabaseClient:
             self.client.table("system_settings").update(update_data).eq(
                 "key", key
             ).execute()
+            self.invalidate_settings_cache()
             return True
         except Exception as e:
             logger.error(f"Error updating system setting {key}: {e}")
@@ -879,6 +1518,248 @@ class SupabaseClient:
             logger.error(f"Error getting channel baseline for {channel_username}: {e}")
             return None
 
+    def get_posts_count_by_channel(
+        self, channel_usernames: Optional[List[str]] = None
+    ) -> Dict[str, int]:
+        """Количество постов по каналам (RPC count_posts_by_channel, один запрос)."""
+        if not self.client:
+            return {}
+
+        try:
+            result = self.client.rpc(
+                "count_posts_by_channel", {"channel_usernames": channel_usernames}
+            ).execute()
+            return {
+                row["channel_username"]: row["posts_count"] for row in result.data or []
+            }
+        except Exception as e:
+            logger.error(f"Error counting posts by channel: {e}")
+            return {}
+
+    def get_posts_stats(
+        self,
+        channel_username: Optional[str] = None,
+        date_from: Optional[str] = None,
+        date_to: Optional[str] = None,
+        min_views: Optional[int] = None,
+        min_engagement: Optional[float] = None,
+        search_term: Optional[str] = None,
+    ) -> Optional[Dict[str, int]]:
+        """
+        Суммарная статистика по постам, посчитанная в БД.
+
+        Без фильтров читает одну строку posts_totals, с фильтром только по
+        каналу - RPC get_channel_stats_totals по дневным агрегатам
+        channel_daily_stats (обе таблицы поддерживаются триггерами), с
+        остальными фильтрами вызывает RPC get_posts_stats.
+
+        Args:
+            min_engagement: Минимальный engagement_rate в долях (не в процентах).
+
+        Returns:
+            {"total_posts", "total_views", "total_reactions", "total_forwards"}
+            или None при ошибке
+        """
+        if not self.client:
+            return None
+
+        filters = {
+            "p_channel_username": channel_username,
+            "p_date_from": date_from,
+            "p_date_to": date_to,
+            "p_min_views": min_views,
+            "p_min_engagement": min_engagement,
+            "p_search_term": search_term,
+        }
+
+        keys = ("total_posts", "total_views", "total_reactions", "total_forwards")
+        try:
+            if all(value is None for value in filters.values()):
+                result = self.client.table("posts_totals").select("*").execute()
+            elif channel_username and all(
+                value is None
+                for key, value in filters.items()
+                if key != "p_channel_username"
+            ):
+                # Только канал: сумма дневных агрегатов канала считается в БД
+                result = self.client.rpc(
+                    "get_channel_stats_totals",
+                    {"p_channel_username": channel_username},
+                ).execute()
+            else:
+                result = self.client.rpc("get_posts_stats", filters).execute()
+
+            row = (result.data or [{}])[0]
+            return {key: int(row.get(key) or 0) for key in keys}
+        except Exception as e:
+            self.mark_query_failed(e)
+            logger.error(f"Error getting posts stats: {e}")
+            return None
+
+    def get_channel_daily_stats(
+        self,
+        channel_username: Optional[str] = None,
+        date_from: Optional[str] = None,
+        date_to: Optional[str] = None,
+    ) -> Optional[List[Dict[str, Any]]]:
+        """
+        Дневные агрегаты по каналам из channel_daily_stats.
+
+        Args:
+            channel_username: Только этот канал (None - все каналы)
+            date_from: Первый день (YYYY-MM-DD, включительно)
+            date_to: Последний день (YYYY-MM-DD, включительно)
+
+        Returns:
+            Строки по возрастанию дня или None при ошибке
+        """
+        if not self.client:
+            return None
+
+        try:
+            query = self.client.table("channel_daily_stats").select("*")
+            if channel_username:
+                query = query.eq("channel_username", channel_username)
+            if date_from:
+                query = query.gte("day", date_from)
+            if date_to:
+                query = query.lte("day", date_to)
+
+            result = query.order("day").order("channel_username").execute()
+            return result.data or []
+        except Exception as e:
+            self.mark_query_failed(e)
+            logger.error(f"Error getting channel daily stats: {e}")
+            return None
+
+    def get_daily_stats_totals(
+        self, date_from: str, date_to: str
+    ) -> Optional[List[Dict[str, Any]]]:
+        """
+        Дневной ряд по всем каналам (RPC get_daily_stats_totals).
+
+        Суммы по дням считаются в БД: строк (канал, день) может быть больше
+        лимита ответа PostgREST, и сумма по обрезанному ответу была бы неверной.
+
+        Args:
+            date_from: Первый день (YYYY-MM-DD, включительно)
+            date_to: Последний день (YYYY-MM-DD, включительно)
+
+        Returns:
+            Строки по возрастанию дня или None при ошибке
+        """
+        if not self.client:
+            return None
+
+        try:
+            result = self.client.rpc(
+                "get_daily_stats_totals",
+                {"p_date_from": date_from, "p_date_to": date_to},
+            ).execute()
+            return result.data or []
+        except Exception as e:
+            self.mark_query_failed(e)
+            logger.error(f"Error getting daily stats totals: {e}")
+            return None
+
+    @staticmethod
+    def search_term_filter(search_term: str) -> str:
+        """
+        Условие or_() для фильтра search_term по search_vector.
+
+        Запрос разбирается как в search_posts (веб-поиск в русской и английской
+        конфигурациях), поэтому фильтр списка постов идет по GIN-индексу,
+        а не последовательным сканированием ILIKE.
+        """
+        value = quote_filter_value(search_term)
+        return (
+            f"search_vector.wfts(russian).{value},"
+            f"search_vector.wfts(english).{value}"
+        )
+
+    def search_posts(
+        self,
+        query: str,
+        channel_username: Optional[str] = None,
+        limit: int = 20,
+        offset: int = 0,
+    ) -> Optional[List[Dict[str, Any]]]:
+        """
+        Полнотекстовый поиск постов (RPC search_posts).
+
+        Args:
+            query: Поисковый запрос в синтаксисе веб-поиска
+            channel_username: Искать только в канале
+            limit: Количество результатов
+            offset: Смещение
+
+        Returns:
+            Посты по убыванию релевантности с полями rank и snippet
+            (фрагменты текста с <mark>) или None при ошибке
+        """
+        if not self.client:
+            return None
+
+        try:
+            result = self.client.rpc(
+                "search_posts",
+                {
+                    "search_query": query,
+                    "p_channel_username": channel_username,
+                    "p_limit": limit,
+                    "p_offset": offset,
+                },
+            ).execute()
+            return result.data or []
+        except Exception as e:
+            self.mark_query_failed(e)
+            logger.error(f"Error searching posts: {e}")
+            return None
+
+    def get_channels_with_baselines(self) -> List[Dict[str, Any]]:
+        """
+        Получить все каналы с базовыми метриками и количеством постов.
+
+        Три запроса на весь список (каналы, метрики, количество постов)
+        вместо запросов на каждый канал. Результат кэшируется на
+        settings.baselines_cache_ttl секунд и сбрасывается при сохранении метрик.
+
+        Returns:
+            Список {"channel": ..., "baseline": ... или None, "posts_count": int}
+        """
+        if not self.client:
+            return []
+
+        cached = self._baselines_cache.get("all")
+        if cached is not None:
+            return cached
+
+        try:
+            channels = self.client.table("channels").select("*").execute().data or []
+            baselines_result = self.client.table("channel_baselines").select("*").execute()
+            baselines = {
+                row["channel_username"]: row for row in baselines_result.data or []
+            }
+            posts_counts = self.get_posts_count_by_channel()
+
+            result = [
+                {
+                    "channel": channel,
+                    "baseline": baselines.get(channel["username"]),
+                    "posts_count": posts_counts.get(channel["username"], 0),
+                }
+                for channel in channels
+            ]
+            self._baselines_cache.set("all", result)
+            return result
+        except Exception as e:
+            logger.error(f"Error fetching channels with baselines: {e}")
+            return []
+
+    def invalidate_baselines_cache(self) -> None:
+        """Сбрасывает кэш списка базовых метрик каналов."""
+        self._baselines_cache.clear()
+
     def save_channel_baseline(self, baseline_data: Dict[str, Any]) -> bool:
         """Сохранить базовые метрики канала."""
         if not self.client:
@@ -889,6 +1770,7 @@ class SupabaseClient:
             self.client.table("channel_baselines").upsert(
                 baseline_data, on_conflict="channel_username"
             ).execute()
+            self.invalidate_baselines_cache()
             return True
         except Exception as e:
             logger.error(f"Error saving channel baseline: {e}")
@@ -935,6 +1817,66 @@ class SupabaseClient:
             logger.error(f"Error updating viral metrics for post {post_id}: {e}")
             return False
 
+    def bulk_update_post_viral_metrics(
+        self, updates: List[Dict[str, Any]], chunk_size: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        Пакетно обновить viral метрики постов через RPC bulk_update_post_viral_metrics.
+
+        Args:
+            updates: Список {"id", "viral_score", "engagement_rate", "zscore",
+                "median_multiplier"}.
+            chunk_size: Размер пачки (по умолчанию settings.viral_write_chunk_size).
+
+        Returns:
+            {"updated": количество обновленных постов,
+             "failed": [{"id": ..., "error": ...}] по каждому необновленному посту}
+        """
+        stats: Dict[str, Any] = {"updated": 0, "failed": []}
+        if not updates:
+            return stats
+        if not self.client:
+            stats["failed"] = [
+                {"id": update.get("id"), "error": "no database connection"}
+                for update in updates
+            ]
+            return stats
+
+        chunk_size = max(1, chunk_size or settings.viral_write_chunk_size)
+        for start in range(0, len(updates), chunk_size):
+            chunk = updates[start : start + chunk_size]
+            try:
+                result = self.client.rpc(
+                    "bulk_update_post_viral_metrics", {"updates": chunk}
+                ).execute()
+                updated_ids = {row["post_id"] for row in result.data or []}
+                stats["updated"] += len(updated_ids)
+                stats["failed"].extend(
+                    {"id": update["id"], "error": "post not found"}
+                    for update in chunk
+                    if update["id"] not in updated_ids
+                )
+            except Exception as e:
+                # Пачка отклонена целиком - пишем построчно, чтобы найти сбойные посты
+                logger.warning(
+                    f"Bulk viral metrics update failed for {len(chunk)} posts, "
+                    f"falling back to per-row updates: {e}"
+                )
+                for update in chunk:
+                    viral_data = {key: value for key, value in update.items() if key != "id"}
+                    if self.update_post_viral_metrics(update["id"], viral_data):
+                        stats["updated"] += 1
+                    else:
+                        stats["failed"].append(
+                            {"id": update["id"], "error": "update failed"}
+                        )
+
+        if stats["failed"]:
+            logger.warning(
+                f"Viral metrics not saved for {len(stats['failed'])}/{len(updates)} posts"
+            )
+        return stats
+
     def get_viral_posts(
         self,
         channel_username: Optional[str] = None,
@@ -948,7 +1890,7 @@ class SupabaseClient:
         try:
             if min_viral_score <= 0:
                 # Если min_viral_score <= 0, получаем все посты и фильтруем на клиенте
-                query = self.client.table("posts").select("*")
+                query = self.client.table("posts").select(self.post_columns("list-card"))
                 if channel_username:
                     query = query.eq("channel_username", channel_username)
 
@@ -972,7 +1914,7 @@ class SupabaseClient:
                 # Иначе только посты с viral_score >= min_viral_score
                 query = (
                     self.client.table("posts")
-                    .select("*")
+                    .select(self.post_columns("list-card"))
                     .gte("viral_score", min_viral_score)
                 )
                 if channel_username:
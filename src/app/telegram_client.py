@@ -3,16 +3,22 @@
 Telethon - надежная и проверенная библиотека для Telegram API.
 """
 
+import asyncio
 import logging
 import os
 from datetime import datetime, timedelta
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
 
 import pytz
 
 # Импортируем Telethon
 from telethon import TelegramClient
-from telethon.errors import FloodWaitError, SessionPasswordNeededError
+from telethon.errors import (
+    AuthKeyError,
+    FloodWaitError,
+    SessionPasswordNeededError,
+    UnauthorizedError,
+)
 from telethon.tl.functions.channels import GetFullChannelRequest
 from telethon.tl.functions.chatlists import (
     CheckChatlistInviteRequest,
@@ -24,22 +30,38 @@ from telethon.tl.types import Channel, Chat
 from telethon.tl.types import Message as TelethonMessage
 from telethon.tl.types import MessageReactions, PeerChannel, User
 
+from .cache import TTLCache
+from .flood_control import (
+    REQUEST_CLASS_ENTITY,
+    REQUEST_CLASS_FOLDERS,
+    REQUEST_CLASS_FULL_CHANNEL,
+    REQUEST_CLASS_HISTORY,
+    RequestGovernor,
+)
 from .settings import settings
 from .utils import normalize_channel_input, safe_get, setup_logger, truncate_text
 
 # Настройка логирования
 logger = setup_logger(__name__)
 
+# Ошибки самой сессии (соединение, авторизация), а не конкретного канала
+SESSION_ERRORS = (OSError, asyncio.TimeoutError, AuthKeyError, UnauthorizedError)
+
 
 class TelegramAnalyzer:
     """Класс для анализа Telegram-каналов с использованием Telethon."""
 
-    def __init__(self, session_name: Optional[str] = None):
+    def __init__(
+        self,
+        session_name: Optional[str] = None,
+        request_governor: Optional[RequestGovernor] = None,
+    ):
         """
         Инициализирует клиент Telegram.
 
         Args:
             session_name: Имя файла сессии.
+            request_governor: Общий регулятор запросов к Telegram (создается, если не передан).
         """
         api_id = settings.telegram_api_id
         api_hash = settings.telegram_api_hash
@@ -69,6 +91,18 @@ class TelegramAnalyzer:
         self.is_connected = False
         self.api_id = api_id
         self.api_hash = api_hash
+        self.request_governor = request_governor or RequestGovernor()
+
+        # Архив сырых сообщений (до _format_message), если включен
+        self.message_archive = None
+        if settings.message_archive_enabled:
+            from .message_archive import MessageArchive
+
+            self.message_archive = MessageArchive()
+
+        # Кэши сущностей каналов и GetFullChannelRequest (ключ - нормализованный username)
+        self._entity_cache = TTLCache(settings.telegram_entity_cache_ttl)
+        self._channel_info_cache = TTLCache(settings.telegram_info_cache_ttl)
 
     async def needs_authorization(self) -> bool:
         """Проверяет, нужна ли авторизация для сессии."""
@@ -356,40 +390,46 @@ class TelegramAnalyzer:
 
         Returns:
             Сущность канала или None, если канал не найден.
+
+        Raises:
+            Ошибки соединения и авторизации сессии (SESSION_ERRORS).
         """
 
         if not self.is_connected:
             await self.connect()
 
         normalized_channel = normalize_channel_input(channel_input)
+        cache_key = self._channel_cache_key(channel_input)
+
+        cached_channel = self._entity_cache.get(cache_key)
+        if cached_channel is not None:
+            return cached_channel
 
         try:
-            channel = await self.client.get_entity(normalized_channel)
-            return channel
-        except FloodWaitError as e:
-            logger.warning(
-                f"Flood wait {e.seconds} секунд при получении канала '{channel_input}'"
+            channel = await self.request_governor.call(
+                REQUEST_CLASS_ENTITY, self.client.get_entity, normalized_channel
             )
-            await asyncio.sleep(e.seconds)
-            # Повторная попытка
-            try:
-                channel = await self.client.get_entity(normalized_channel)
-                return channel
-            except Exception as e2:
-                logger.error(
-                    f"Ошибка после flood wait при получении канала '{channel_input}': {e2}"
-                )
-                return None
+            self._entity_cache.set(cache_key, channel)
+            return channel
+        except SESSION_ERRORS as e:
+            # Сбой сессии не значит, что канала нет: пробрасываем, при
+            # следующем запросе клиент переподключится
+            logger.error(f"Сессия Telegram не смогла получить канал '{channel_input}': {e}")
+            self.is_connected = False
+            raise
         except Exception as e:
             logger.error(f"Ошибка при получении канала '{channel_input}': {e}")
             return None
 
-    async def get_channel_info(self, channel_input: str) -> Dict[str, Any]:
+    async def get_channel_info(
+        self, channel_input: str, channel_entity: Optional[Channel] = None
+    ) -> Dict[str, Any]:
         """
         Получает информацию о канале.
 
         Args:
             channel_input: Имя канала или URL.
+            channel_entity: Уже полученная сущность канала (чтобы не запрашивать повторно).
 
         Returns:
             Словарь с информацией о канале.
@@ -398,15 +438,24 @@ class TelegramAnalyzer:
         if not self.is_connected:
             await self.connect()
 
-        channel_entity = await self.get_channel_entity(channel_input)
+        cache_key = self._channel_cache_key(channel_input)
+        cached_info = self._channel_info_cache.get(cache_key)
+        if cached_info is not None:
+            # Возвращаем копию: вызывающий код дополняет словарь своими полями
+            return dict(cached_info)
+
+        if channel_entity is None:
+            channel_entity = await self.get_channel_entity(channel_input)
 
         if not channel_entity:
             return {"error": f"Канал не найден: {channel_input}"}
 
         try:
             # Получаем полную информацию о канале
-            full_channel = await self.client(
-                GetFullChannelRequest(channel=channel_entity)
+            full_channel = await self.request_governor.call(
+                REQUEST_CLASS_FULL_CHANNEL,
+                self.client,
+                GetFullChannelRequest(channel=channel_entity),
             )
 
             channel_info = {
@@ -420,39 +469,40 @@ class TelegramAnalyzer:
                 "about": getattr(full_channel.full_chat, "about", None),
             }
 
-            return channel_info
-        except FloodWaitError as e:
-            logger.warning(
-                f"Flood wait {e.seconds} секунд при получении информации о канале '{channel_input}'"
+            self._channel_info_cache.set(cache_key, channel_info)
+            return dict(channel_info)
+        except SESSION_ERRORS as e:
+            logger.error(
+                f"Сессия Telegram не смогла получить информацию о канале '{channel_input}': {e}"
             )
-            await asyncio.sleep(e.seconds)
-            # Повторная попытка
-            try:
-                full_channel = await self.client(
-                    GetFullChannelRequest(channel=channel_entity)
-                )
-                channel_info = {
-                    "id": channel_entity.id,
-                    "title": getattr(channel_entity, "title", None),
-                    "username": getattr(channel_entity, "username", None),
-                    "participants_count": getattr(
-                        full_channel.full_chat, "participants_count", 0
-                    ),
-                    "date": getattr(channel_entity, "date", None),
-                    "about": getattr(full_channel.full_chat, "about", None),
-                }
-                return channel_info
-            except Exception as e2:
-                logger.error(
-                    f"Ошибка после flood wait при получении информации о канале '{channel_input}': {e2}"
-                )
-                return {"error": str(e2)}
+            self.is_connected = False
+            raise
         except Exception as e:
             logger.error(
                 f"Ошибка при получении информации о канале '{channel_input}': {e}"
             )
             return {"error": str(e)}
 
+    def invalidate_channel_cache(self, channel_input: Optional[str] = None) -> None:
+        """
+        Сбрасывает кэш сущности и информации о канале.
+
+        Args:
+            channel_input: Имя канала или URL (None - сбросить кэш всех каналов).
+        """
+        if channel_input is None:
+            self._entity_cache.clear()
+            self._channel_info_cache.clear()
+            return
+
+        cache_key = self._channel_cache_key(channel_input)
+        self._entity_cache.invalidate(cache_key)
+        self._channel_info_cache.invalidate(cache_key)
+
+    def _channel_cache_key(self, channel_input: str) -> str:
+        """Возвращает ключ кэша канала (username без @ в нижнем регистре)."""
+        return normalize_channel_input(channel_input).lstrip("@").lower()
+
     async def get_channels_from_user_folders(self) -> Dict[str, Any]:
         """
         Получает список всех папок пользователя и каналов в них.
@@ -652,7 +702,11 @@ class TelegramAnalyzer:
         try:
             # Сначала пробуем CheckChatlistInviteRequest
             logger.info(f"Пытаемся получить папку с slug: {slug}")
-            invite = await self.client(CheckChatlistInviteRequest(slug=slug))
+            invite = await self.request_governor.call(
+                REQUEST_CLASS_FOLDERS,
+                self.client,
+                CheckChatlistInviteRequest(slug=slug),
+            )
             logger.info(f"Получен ответ от Telegram API: {type(invite).__name__}")
 
             # Если уже присоединились, пробуем альтернативный подход
@@ -742,41 +796,6 @@ class TelegramAnalyzer:
             logger.info(f"Из папки '{invite.title}' получено {len(channels)} каналов")
             return result
 
-        except FloodWaitError as e:
-            logger.warning(
-                f"Flood wait {e.seconds} секунд при получении папки '{folder_link}'"
-            )
-            await asyncio.sleep(e.seconds)
-            # Повторная попытка
-            try:
-                invite = await self.client(CheckChatlistInviteRequest(slug=slug))
-                # Аналогичная обработка...
-                channels = []
-                for chat in invite.chats:
-                    if isinstance(chat, Channel):
-                        channel_info = {
-                            "id": chat.id,
-                            "username": getattr(chat, "username", None),
-                            "title": getattr(chat, "title", ""),
-                            "participants_count": getattr(
-                                chat, "participants_count", 0
-                            ),
-                            "type": "channel",
-                        }
-                        if channel_info["username"]:
-                            channels.append(channel_info)
-
-                return {
-                    "folder_title": invite.title,
-                    "total_channels": len(channels),
-                    "channels": channels,
-                    "slug": slug,
-                }
-            except Exception as e2:
-                logger.error(
-                    f"Ошибка после flood wait при получении папки '{folder_link}': {e2}"
-                )
-                return {"error": str(e2)}
         except Exception as e:
             logger.error(f"Ошибка при получении папки '{folder_link}': {e}")
             return {"error": str(e)}
@@ -810,18 +829,89 @@ class TelegramAnalyzer:
         return None
 
     async def get_messages(
-        self, channel_input: str, days: int = 7, limit: int = 100
+        self,
+        channel_input: str,
+        days: int = 7,
+        limit: int = 100,
+        min_id: Optional[int] = None,
+        refresh_hours: Optional[int] = None,
     ) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
         """
         Получает сообщения из канала за указанный период.
 
+        Если передан min_id (watermark - последний сохраненный message_id),
+        загружаются только новые сообщения с id больше него. Уже известные
+        сообщения дочитываются только в пределах окна refresh_hours, чтобы
+        обновить их метрики (просмотры, реакции, пересылки). Новые сообщения
+        читаются до watermark целиком, без ограничения limit: иначе сообщения
+        между watermark и прочитанной частью истории были бы пропущены.
+
         Args:
             channel_input: Имя канала или URL.
             days: Количество дней для анализа.
             limit: Максимальное количество сообщений для загрузки.
+            min_id: Watermark канала для инкрементальной загрузки.
+            refresh_hours: Окно обновления метрик известных сообщений в часах.
 
         Returns:
-            Кортеж из списка сообщений и информации о канале.
+            Кортеж из списка сообщений и информации о канале. В информацию
+            о канале добавляется last_message_id - максимальный id
+            просмотренного сообщения (новый watermark).
+        """
+        messages = []
+        channel_info: Dict[str, Any] = {}
+
+        # Собираем все пачки в один список (один проход по истории)
+        async for batch, channel_info in self.iter_message_batches(
+            channel_input,
+            days=days,
+            limit=limit,
+            batch_size=limit,
+            min_id=min_id,
+            refresh_hours=refresh_hours,
+        ):
+            messages.extend(batch)
+
+        if "error" not in channel_info:
+            logger.info(
+                f"Загружено {len(messages)} сообщений из канала '{channel_info.get('title') or channel_input}'"
+                + (f" (watermark {min_id})" if min_id else "")
+            )
+        return messages, channel_info
+
+    async def iter_message_batches(
+        self,
+        channel_input: str,
+        days: int = 7,
+        limit: int = 100,
+        batch_size: Optional[int] = None,
+        min_id: Optional[int] = None,
+        refresh_hours: Optional[int] = None,
+        offset_id: int = 0,
+        low_priority: bool = False,
+    ) -> AsyncIterator[Tuple[List[Dict[str, Any]], Dict[str, Any]]]:
+        """
+        Читает историю канала и отдает сообщения пачками фиксированного размера.
+
+        Сообщения не накапливаются: каждая пачка отдается сразу, как только
+        набрана, поэтому ее можно сохранять в БД, не дожидаясь конца канала.
+        Последняя пачка может быть неполной или пустой. При ошибке она
+        содержит ключ "error" в информации о канале.
+
+        Args:
+            channel_input: Имя канала или URL.
+            days: Количество дней для анализа.
+            limit: Максимальное количество сообщений для загрузки
+                (не действует при min_id - история читается до watermark).
+            batch_size: Размер пачки (по умолчанию settings.telegram_ingest_batch_size).
+            min_id: Watermark канала для инкрементальной загрузки.
+            refresh_hours: Окно обновления метрик известных сообщений в часах.
+            offset_id: Начать с сообщений старше этого id (продолжение чтения).
+            low_priority: Фоновое чтение: запросы уступают токены живому парсингу.
+
+        Yields:
+            Кортежи (пачка сообщений, информация о канале с last_message_id
+            и offset_id - id самого старого прочитанного сообщения).
         """
 
         if not self.is_connected:
@@ -830,83 +920,154 @@ class TelegramAnalyzer:
         channel_entity = await self.get_channel_entity(channel_input)
 
         if not channel_entity:
-            return [], {"error": f"Канал не найден: {channel_input}"}
+            yield [], {"error": f"Канал не найден: {channel_input}"}
+            return
 
-        # Получаем информацию о канале
-        channel_info = await self.get_channel_info(channel_input)
+        # Получаем информацию о канале (сущность уже есть, повторно не резолвим)
+        channel_info = await self.get_channel_info(channel_input, channel_entity)
+        batch_size = max(1, batch_size or settings.telegram_ingest_batch_size)
+
+        # Сырые сообщения пачки для архива
+        raw_batch = []
+        if self.message_archive and "error" not in channel_info:
+            self._archive_safely(self.message_archive.save_channel_info, channel_input, channel_info)
 
         # Определяем дату начала периода с учетом часового пояса
         now = datetime.now(pytz.UTC)
         since_date = now - timedelta(days=days)
+        refresh_since = (
+            now - timedelta(hours=refresh_hours) if min_id and refresh_hours else None
+        )
 
-        try:
-            messages = []
-            async for message in self.client.iter_messages(channel_entity, limit=limit):
-                # Проверяем, входит ли сообщение в указанный период
-                # Убеждаемся, что обе даты имеют информацию о часовом поясе
-                message_date = message.date
-                if not message_date.tzinfo:
-                    message_date = message_date.replace(tzinfo=pytz.UTC)
-
-                # Поскольку iter_messages возвращает сообщения от новых к старым,
-                # мы останавливаемся, когда находим сообщение старше нужного периода
-                if message_date < since_date:
-                    logger.info(
-                        f"Останавливаемся на сообщении от {message_date} (старше {since_date})"
-                    )
-                    break
-
-                # Пропускаем сообщения без текста
-                if not message.text:
-                    continue
-
-                # Форматируем сообщение
-                message_data = await self._format_message(message, channel_info)
-                messages.append(message_data)
-
-            logger.info(
-                f"Загружено {len(messages)} сообщений из канала '{channel_entity.title}'"
-            )
-            return messages, channel_info
-
-        except FloodWaitError as e:
-            logger.warning(
-                f"Flood wait {e.seconds} секунд при получении сообщений из канала '{channel_input}'"
-            )
-            await asyncio.sleep(e.seconds)
-            # Повторная попытка с меньшим лимитом
+        iter_kwargs = {}
+        # Без окна обновления метрик известные сообщения не нужны вовсе,
+        # поэтому просим Telegram отдавать только сообщения новее watermark
+        if min_id and not refresh_since:
+            iter_kwargs["min_id"] = min_id
+
+        batch = []
+        last_message_id = None
+        # Позиция в истории: после FloodWait продолжаем с нее, а не с начала.
+        # С watermark читаем до него целиком (в пределах days): если обрезать
+        # по limit, новый watermark перескочил бы непрочитанные сообщения
+        remaining = None if min_id else limit
+        reserve = settings.telegram_backfill_reserve_tokens if low_priority else 0
+        flood_retries = 0
+        finished = False
+
+        while not finished and (remaining is None or remaining > 0):
             try:
-                messages = []
+                await self.request_governor.acquire(REQUEST_CLASS_HISTORY, reserve)
+                finished = True
+                received = 0
                 async for message in self.client.iter_messages(
-                    channel_entity, limit=min(limit, 50)  # Уменьшаем лимит
+                    channel_entity, limit=remaining, offset_id=offset_id, **iter_kwargs
                 ):
+                    offset_id = message.id
+                    if remaining is not None:
+                        remaining -= 1
+                    received += 1
+
+                    # Telethon запрашивает историю порциями по 100 сообщений:
+                    # перед следующей порцией берем новый токен у регулятора
+                    if received % 100 == 0:
+                        await self.request_governor.acquire(
+                            REQUEST_CLASS_HISTORY, reserve
+                        )
+
+                    # Убеждаемся, что обе даты имеют информацию о часовом поясе
                     message_date = message.date
                     if not message_date.tzinfo:
                         message_date = message_date.replace(tzinfo=pytz.UTC)
 
+                    # Поскольку iter_messages возвращает сообщения от новых к старым,
+                    # мы останавливаемся, когда находим сообщение старше нужного периода
                     if message_date < since_date:
+                        logger.info(
+                            f"Останавливаемся на сообщении от {message_date} (старше {since_date})"
+                        )
                         break
 
+                    # Известные сообщения дочитываем только в окне обновления метрик
+                    if min_id and message.id <= min_id:
+                        if not refresh_since or message_date < refresh_since:
+                            break
+
+                    if last_message_id is None or message.id > last_message_id:
+                        last_message_id = message.id
+
+                    if self.message_archive:
+                        raw_batch.append(message)
+
+                    # Пропускаем сообщения без текста
                     if not message.text:
                         continue
 
-                    message_data = await self._format_message(message, channel_info)
-                    messages.append(message_data)
+                    # Форматируем сообщение
+                    batch.append(await self._format_message(message, channel_info))
 
-                logger.info(
-                    f"Загружено {len(messages)} сообщений после flood wait из канала '{channel_entity.title}'"
+                    if len(batch) >= batch_size:
+                        self._archive_messages(channel_input, raw_batch)
+                        channel_info["last_message_id"] = last_message_id or min_id
+                        channel_info["offset_id"] = offset_id
+                        yield batch, channel_info
+                        batch = []
+
+            except FloodWaitError as e:
+                logger.warning(
+                    f"Flood wait {e.seconds} секунд при получении сообщений из канала '{channel_input}'"
                 )
-                return messages, channel_info
-            except Exception as e2:
+                try:
+                    self.request_governor.check_flood_wait(
+                        REQUEST_CLASS_HISTORY, e, flood_retries
+                    )
+                except FloodWaitError:
+                    self._archive_messages(channel_input, raw_batch)
+                    channel_info["last_message_id"] = last_message_id or min_id
+                    channel_info["offset_id"] = offset_id
+                    yield batch, {**channel_info, "error": str(e)}
+                    return
+                # Продолжаем с offset_id с тем же оставшимся лимитом
+                flood_retries += 1
+                finished = False
+            except SESSION_ERRORS as e:
+                # Сбой сессии, а не канала: сущность не сбрасываем, пробрасываем
+                # ошибку, чтобы вызывающий код мог повторить на другой сессии
+                logger.error(
+                    f"Сессия Telegram прервала чтение канала '{channel_input}': {e}"
+                )
+                self._archive_messages(channel_input, raw_batch)
+                self.is_connected = False
+                raise
+            except Exception as e:
                 logger.error(
-                    f"Ошибка после flood wait при получении сообщений из канала '{channel_input}': {e2}"
+                    f"Ошибка при получении сообщений из канала '{channel_input}': {e}"
                 )
-                return [], {"error": str(e2)}
+                # Канал мог стать приватным или сменить username - не держим устаревшую сущность
+                self.invalidate_channel_cache(channel_input)
+                self._archive_messages(channel_input, raw_batch)
+                channel_info["last_message_id"] = last_message_id or min_id
+                channel_info["offset_id"] = offset_id
+                yield batch, {**channel_info, "error": str(e)}
+                return
+
+        self._archive_messages(channel_input, raw_batch)
+        channel_info["last_message_id"] = last_message_id or min_id
+        channel_info["offset_id"] = offset_id
+        yield batch, channel_info
+
+    def _archive_messages(self, channel_input: str, raw_batch: List[TelethonMessage]) -> None:
+        """Дописывает накопленные сырые сообщения в архив и очищает буфер."""
+        if self.message_archive and raw_batch:
+            self._archive_safely(self.message_archive.append, channel_input, list(raw_batch))
+        raw_batch.clear()
+
+    def _archive_safely(self, func, *args) -> None:
+        """Ошибка записи архива не должна прерывать парсинг."""
+        try:
+            func(*args)
         except Exception as e:
-            logger.error(
-                f"Ошибка при получении сообщений из канала '{channel_input}': {e}"
-            )
-            return [], {"error": str(e)}
+            logger.warning(f"Не удалось записать архив сообщений: {e}")
 
     async def _format_message(
         self, message: TelethonMessage, channel_info: Dict[str, Any]
@@ -922,22 +1083,7 @@ class TelegramAnalyzer:
             Словарь с данными о сообщении.
         """
 
-        # Получаем количество просмотров
-        views = getattr(message, "views", 0) or 0
-
-        # Получаем количество пересылок
-        forwards = getattr(message, "forwards", 0) or 0
-
-        # Получаем реакции
-        reactions = 0
-        if message.reactions:
-            for result in message.reactions.results:
-                reactions += result.count
-
-        # Получаем количество комментариев (replies)
-        replies = 0
-        if hasattr(message, "replies") and message.replies:
-            replies = message.replies.replies
+        counters = self._extract_counters(message)
 
         # Формируем пермалинк, если возможно
         permalink = None
@@ -964,18 +1110,120 @@ class TelegramAnalyzer:
             "date": message.date.isoformat(),
             "text": truncate_text(message.text, 2000),
             "text_preview": truncate_text(message.text, 500),
+            **counters,
+            "has_media": has_media,
+            "permalink": permalink,
+        }
+
+        return message_data
+
+    def _extract_counters(self, message: TelethonMessage) -> Dict[str, int]:
+        """
+        Извлекает счетчики вовлеченности сообщения.
+
+        Args:
+            message: Объект сообщения.
+
+        Returns:
+            Словарь views, forwards, replies, reactions.
+        """
+
+        # Получаем количество просмотров
+        views = getattr(message, "views", 0) or 0
+
+        # Получаем количество пересылок
+        forwards = getattr(message, "forwards", 0) or 0
+
+        # Получаем реакции
+        reactions = 0
+        if message.reactions:
+            for result in message.reactions.results:
+                reactions += result.count
+
+        # Получаем количество комментариев (replies)
+        replies = 0
+        if hasattr(message, "replies") and message.replies:
+            replies = message.replies.replies
+
+        return {
             "views": views,
             "forwards": forwards,
             "replies": replies,
             "reactions": reactions,
-            "has_media": has_media,
-            "permalink": permalink,
         }
 
-        return message_data
+    async def get_messages_counters(
+        self, channel_input: str, message_ids: List[int], batch_size: int = 100
+    ) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+        """
+        Получает актуальные счетчики уже известных сообщений канала.
+
+        Сообщения запрашиваются пачками по id (до 100 за запрос), без чтения
+        истории канала.
+
+        Args:
+            channel_input: Имя канала или URL.
+            message_ids: Список id сообщений.
+            batch_size: Количество id в одном запросе (максимум Telegram - 100).
+
+        Returns:
+            Кортеж из списка счетчиков (message_id, date, views, forwards,
+            replies, reactions) и информации о канале.
+        """
+
+        if not self.is_connected:
+            await self.connect()
+
+        channel_entity = await self.get_channel_entity(channel_input)
+
+        if not channel_entity:
+            return [], {"error": f"Канал не найден: {channel_input}"}
+
+        channel_info = await self.get_channel_info(channel_input, channel_entity)
+        batch_size = max(1, min(batch_size, 100))
+
+        counters = []
+        try:
+            for start in range(0, len(message_ids), batch_size):
+                batch_ids = message_ids[start : start + batch_size]
+
+                messages = await self.request_governor.call(
+                    REQUEST_CLASS_HISTORY,
+                    self.client.get_messages,
+                    channel_entity,
+                    ids=batch_ids,
+                )
+
+                # Для удаленных сообщений Telethon возвращает None
+                for message in messages:
+                    if message is None:
+                        continue
+                    counters.append(
+                        {
+                            "message_id": message.id,
+                            "date": message.date.isoformat(),
+                            **self._extract_counters(message),
+                        }
+                    )
+
+            logger.info(
+                f"Обновлены счетчики {len(counters)}/{len(message_ids)} сообщений канала '{channel_input}'"
+            )
+            return counters, channel_info
+
+        except Exception as e:
+            logger.error(
+                f"Ошибка при обновлении счетчиков сообщений канала '{channel_input}': {e}"
+            )
+            return counters, {**channel_info, "error": str(e)}
 
     async def get_channel_posts(
-        self, channel_username: str, days_back: int = 7, max_posts: int = 100
+        self,
+        channel_username: str,
+        days_back: int = 7,
+        max_posts: int = 100,
+        min_id: Optional[int] = None,
+        refresh_hours: Optional[int] = None,
     ) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
         """
         Получает посты из канала (wrapper для совместимости с API).
@@ -984,12 +1232,18 @@ class TelegramAnalyzer:
             channel_username: Username канала
             days_back: Количество дней назад
             max_posts: Максимальное количество постов
+            min_id: Watermark канала для инкрементальной загрузки
+            refresh_hours: Окно обновления метрик известных постов в часах
 
         Returns:
             Tuple (список постов, информация о канале)
         """
         messages, channel_info = await self.get_messages(
-            channel_username, days=days_back, limit=max_posts
+            channel_username,
+            days=days_back,
+            limit=max_posts,
+            min_id=min_id,
+            refresh_hours=refresh_hours,
         )
 
         if "error" in channel_info:
@@ -294,19 +294,22 @@ class ViralPostDetector:
 
         return reasons
 
-    def detect_viral_posts(self, posts: List[Dict[str, Any]], channel_username: str) -> List[ViralPostResult]:
+    def detect_viral_posts(self, posts: List[Dict[str, Any]], channel_username: str,
+                           baseline: Optional[ChannelBaseline] = None) -> List[ViralPostResult]:
         """
         Анализирует список постов на 'залетевшесть'.
 
         Args:
             posts: Список постов для анализа
             channel_username: Username канала
+            baseline: Уже загруженные базовые метрики канала (иначе читаются из БД)
 
         Returns:
             Список результатов анализа
         """
         # Получаем базовые метрики канала
-        baseline = self.baseline_analyzer.get_channel_baseline(channel_username)
+        if baseline is None:
+            baseline = self.baseline_analyzer.get_channel_baseline(channel_username)
 
         if not baseline:
             logger.warning(f"Нет базовых метрик для канала {channel_username}")
@@ -369,3 +372,38 @@ class ViralPostDetector:
         except Exception as e:
             logger.error(f"Ошибка при обновлении метрик поста {post_id}: {e}")
             return False
+
+    def update_posts_viral_metrics(
+        self, posts: List[Dict[str, Any]], results: List[ViralPostResult]
+    ) -> Dict[str, Any]:
+        """
+        Пакетно обновляет метрики 'залетевшести' постов в БД.
+
+        Args:
+            posts: Посты (нужен ключ id), в том же порядке, что и results
+            results: Результаты анализа
+
+        Returns:
+            Статистика записи: {"updated": int, "failed": [{"id", "error"}]}
+        """
+        updates = []
+        for post, result in zip(posts, results):
+            post_id = post.get('id')
+            if not post_id:
+                logger.warning(
+                    f"Пост без ID пропущен: {post.get('message_id', 'unknown')} "
+                    f"в канале {post.get('channel_username', 'unknown')}"
+                )
+                continue
+
+            updates.append({
+                'id': str(post_id),
+                'viral_score': result.viral_score,
+                'engagement_rate': result.engagement_rate,
+                'zscore': result.zscore,
+                'median_multiplier': result.median_multiplier
+            })
+
+        stats = self.baseline_analyzer.supabase.bulk_update_post_viral_metrics(updates)
+        logger.debug(f"Обновлены метрики {stats['updated']}/{len(updates)} постов")
+        return stats
@@ -57,10 +57,30 @@ async def run_analysis(args: argparse.Namespace) -> None:
         # Загрузка плана контента
         content_plan = settings.load_content_plan(args.content_plan)
         
+        # Источник сообщений: Telegram или локальный архив
+        source = None
+        if args.replay_archive:
+            from src.app.archive_replay import ArchiveReplayAnalyzer
+            from src.app.message_archive import MessageArchive
+
+            logger.info(f"Сообщения читаются из архива {args.replay_archive}")
+            source = ArchiveReplayAnalyzer(MessageArchive(args.replay_archive))
+        
+        # Режим загрузки: пачки сообщений сразу пишутся в БД, анализ не выполняется
+        if args.ingest_only:
+            logger.info(f"Потоковая загрузка постов за последние {days} дней (лимит: {limit_per_channel} сообщений)")
+            async with MessageFetcher(telegram=source) as fetcher:
+                await fetcher.ingest_channels(
+                    channels=channels,
+                    days=days,
+                    limit=limit_per_channel
+                )
+            return
+        
         # 1. Сбор данных из каналов
         logger.info(f"Начинаем сбор данных за последние {days} дней (лимит: {limit_per_channel} сообщений)")
         
-        async with MessageFetcher() as fetcher:
+        async with MessageFetcher(telegram=source) as fetcher:
             messages = await fetcher.fetch_channels_data(
                 channels=channels,
                 days=days,
@@ -48,6 +48,11 @@ CREATE TABLE public.channels (
     id SERIAL PRIMARY KEY,
     is_active BOOLEAN DEFAULT true,
     parse_frequency_hours INTEGER DEFAULT 24,
+    last_message_id BIGINT,
+    backfill_status TEXT DEFAULT 'pending',
+    backfill_offset_id BIGINT,
+    backfill_updated_at TIMESTAMP WITH TIME ZONE,
+    backfill_completed_at TIMESTAMP WITH TIME ZONE,
     created_at TIMESTAMP WITH TIME ZONE DEFAULT TIMEZONE('utc'::text, NOW()) NOT NULL,
     updated_at TIMESTAMP WITH TIME ZONE DEFAULT TIMEZONE('utc'::text, NOW()) NOT NULL
 );
@@ -147,6 +152,56 @@ CREATE POLICY "Admins can manage posts" ON posts
 ALTER TABLE public.posts ADD CONSTRAINT fk_posts_channel
     FOREIGN KEY (channel_username) REFERENCES public.channels(username);
 
+-- Полнотекстовый поиск (русская и английская конфигурации)
+ALTER TABLE public.posts ADD COLUMN search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('russian'::regconfig, COALESCE(channel_title, '')), 'A') ||
+        setweight(to_tsvector('russian'::regconfig, COALESCE(full_text, text_preview, '')), 'B') ||
+        setweight(to_tsvector('english'::regconfig, COALESCE(full_text, text_preview, '')), 'C')
+    ) STORED;
+
+-- POSTS_TOTALS TABLE (итоги по posts, поддерживаются триггерами)
+CREATE TABLE public.posts_totals (
+    id BOOLEAN PRIMARY KEY DEFAULT true CHECK (id),
+    total_posts BIGINT NOT NULL DEFAULT 0,
+    total_views BIGINT NOT NULL DEFAULT 0,
+    total_reactions BIGINT NOT NULL DEFAULT 0,
+    total_forwards BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT TIMEZONE('utc'::text, NOW()) NOT NULL
+);
+
+INSERT INTO public.posts_totals (id) VALUES (true);
+
+-- Enable RLS
+ALTER TABLE public.posts_totals ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Authenticated users can view posts_totals" ON posts_totals
+    FOR SELECT TO authenticated USING (true);
+
+-- CHANNEL_DAILY_STATS TABLE (дневные агрегаты по каналам, поддерживаются триггерами)
+CREATE TABLE public.channel_daily_stats (
+    channel_username TEXT NOT NULL,
+    day DATE NOT NULL,
+    posts_count INTEGER NOT NULL DEFAULT 0,
+    total_views BIGINT NOT NULL DEFAULT 0,
+    total_reactions BIGINT NOT NULL DEFAULT 0,
+    total_forwards BIGINT NOT NULL DEFAULT 0,
+    total_replies BIGINT NOT NULL DEFAULT 0,
+    avg_engagement_rate NUMERIC,
+    median_engagement_rate NUMERIC,
+    p90_engagement_rate NUMERIC,
+    max_viral_score NUMERIC,
+    viral_count INTEGER NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT TIMEZONE('utc'::text, NOW()) NOT NULL,
+    PRIMARY KEY (channel_username, day)
+);
+
+-- Enable RLS
+ALTER TABLE public.channel_daily_stats ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Authenticated users can view channel_daily_stats" ON channel_daily_stats
+    FOR SELECT TO authenticated USING (true);
+
 -- POST_METRICS TABLE
 CREATE TABLE public.post_metrics (
     post_id TEXT,
@@ -550,12 +605,417 @@ CREATE POLICY "Admins can manage channel_baselines" ON channel_baselines
 CREATE INDEX idx_posts_channel_username ON posts(channel_username);
 CREATE INDEX idx_posts_date ON posts(date);
 CREATE INDEX idx_posts_viral_score ON posts(viral_score);
+CREATE INDEX idx_posts_date_id ON posts(date, id);
+CREATE INDEX idx_posts_viral_score_id ON posts(viral_score, id);
+CREATE INDEX idx_posts_views_id ON posts(views, id);
+CREATE INDEX idx_posts_engagement_rate_id ON posts(engagement_rate, id);
+CREATE INDEX idx_posts_channel_date_id ON posts(channel_username, date, id);
+CREATE INDEX idx_posts_search_vector ON posts USING GIN (search_vector);
+CREATE INDEX idx_channel_daily_stats_day ON channel_daily_stats(day);
 CREATE INDEX idx_post_analysis_post_id ON post_analysis(post_id);
+CREATE INDEX idx_post_analysis_created_at ON post_analysis(created_at);
 CREATE INDEX idx_scenarios_post_id ON scenarios(post_id);
 CREATE INDEX idx_token_usage_user_id ON token_usage(user_id);
+CREATE INDEX idx_token_usage_created_at ON token_usage(created_at);
 CREATE INDEX idx_parsing_sessions_initiated_by ON parsing_sessions(initiated_by);
 
+-- FUNCTIONS
+-- Пакетная запись метрик виральности
+CREATE OR REPLACE FUNCTION public.bulk_update_post_viral_metrics(updates JSONB)
+RETURNS TABLE (post_id TEXT)
+LANGUAGE sql
+AS $$
+    UPDATE public.posts p
+    SET viral_score = u.viral_score,
+        engagement_rate = u.engagement_rate,
+        zscore = u.zscore,
+        median_multiplier = u.median_multiplier,
+        last_viral_calculation = NOW(),
+        updated_at = NOW()
+    FROM jsonb_to_recordset(updates) AS u(
+        id TEXT,
+        viral_score NUMERIC,
+        engagement_rate NUMERIC,
+        zscore NUMERIC,
+        median_multiplier NUMERIC
+    )
+    WHERE p.id = u.id
+    RETURNING p.id;
+$$;
+
+-- Количество постов по каналам одним запросом
+CREATE OR REPLACE FUNCTION public.count_posts_by_channel(channel_usernames TEXT[] DEFAULT NULL)
+RETURNS TABLE (channel_username TEXT, posts_count BIGINT)
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT p.channel_username, COUNT(*) AS posts_count
+    FROM public.posts p
+    WHERE channel_usernames IS NULL OR p.channel_username = ANY(channel_usernames)
+    GROUP BY p.channel_username;
+$$;
+
+-- Итоги по posts для статистики без фильтров
+CREATE OR REPLACE FUNCTION public.posts_totals_apply()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+BEGIN
+    IF TG_OP = 'TRUNCATE' THEN
+        UPDATE posts_totals
+        SET total_posts = 0, total_views = 0, total_reactions = 0, total_forwards = 0,
+            updated_at = NOW();
+    ELSIF TG_OP = 'INSERT' THEN
+        UPDATE posts_totals t
+        SET total_posts = t.total_posts + d.posts,
+            total_views = t.total_views + d.views,
+            total_reactions = t.total_reactions + d.reactions,
+            total_forwards = t.total_forwards + d.forwards,
+            updated_at = NOW()
+        FROM (
+            SELECT COUNT(*) AS posts, COALESCE(SUM(views), 0) AS views,
+                   COALESCE(SUM(reactions), 0) AS reactions, COALESCE(SUM(forwards), 0) AS forwards
+            FROM new_rows
+        ) d
+        WHERE d.posts > 0;
+    ELSIF TG_OP = 'DELETE' THEN
+        UPDATE posts_totals t
+        SET total_posts = t.total_posts - d.posts,
+            total_views = t.total_views - d.views,
+            total_reactions = t.total_reactions - d.reactions,
+            total_forwards = t.total_forwards - d.forwards,
+            updated_at = NOW()
+        FROM (
+            SELECT COUNT(*) AS posts, COALESCE(SUM(views), 0) AS views,
+                   COALESCE(SUM(reactions), 0) AS reactions, COALESCE(SUM(forwards), 0) AS forwards
+            FROM old_rows
+        ) d
+        WHERE d.posts > 0;
+    ELSIF TG_OP = 'UPDATE' THEN
+        UPDATE posts_totals t
+        SET total_views = t.total_views + d.views,
+            total_reactions = t.total_reactions + d.reactions,
+            total_forwards = t.total_forwards + d.forwards,
+            updated_at = NOW()
+        FROM (
+            SELECT COALESCE(n.views, 0) - COALESCE(o.views, 0) AS views,
+                   COALESCE(n.reactions, 0) - COALESCE(o.reactions, 0) AS reactions,
+                   COALESCE(n.forwards, 0) - COALESCE(o.forwards, 0) AS forwards
+            FROM (SELECT SUM(views) AS views, SUM(reactions) AS reactions, SUM(forwards) AS forwards
+                  FROM new_rows) n,
+                 (SELECT SUM(views) AS views, SUM(reactions) AS reactions, SUM(forwards) AS forwards
+                  FROM old_rows) o
+        ) d
+        WHERE d.views <> 0 OR d.reactions <> 0 OR d.forwards <> 0;
+    END IF;
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS posts_totals_insert ON public.posts;
+CREATE TRIGGER posts_totals_insert
+    AFTER INSERT ON public.posts
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION public.posts_totals_apply();
+
+DROP TRIGGER IF EXISTS posts_totals_update ON public.posts;
+CREATE TRIGGER posts_totals_update
+    AFTER UPDATE ON public.posts
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION public.posts_totals_apply();
+
+DROP TRIGGER IF EXISTS posts_totals_delete ON public.posts;
+CREATE TRIGGER posts_totals_delete
+    AFTER DELETE ON public.posts
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION public.posts_totals_apply();
+
+DROP TRIGGER IF EXISTS posts_totals_truncate ON public.posts;
+CREATE TRIGGER posts_totals_truncate
+    AFTER TRUNCATE ON public.posts
+    FOR EACH STATEMENT EXECUTE FUNCTION public.posts_totals_apply();
+
+-- Суммы по фильтрам списка постов (NULL - фильтр не задан)
+CREATE OR REPLACE FUNCTION public.get_posts_stats(
+    p_channel_username TEXT DEFAULT NULL,
+    p_date_from TIMESTAMP WITH TIME ZONE DEFAULT NULL,
+    p_date_to TIMESTAMP WITH TIME ZONE DEFAULT NULL,
+    p_min_views INTEGER DEFAULT NULL,
+    p_min_engagement NUMERIC DEFAULT NULL,
+    p_search_term TEXT DEFAULT NULL
+)
+RETURNS TABLE (total_posts BIGINT, total_views BIGINT, total_reactions BIGINT, total_forwards BIGINT)
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT COUNT(*), COALESCE(SUM(p.views), 0), COALESCE(SUM(p.reactions), 0), COALESCE(SUM(p.forwards), 0)
+    FROM public.posts p
+    WHERE (p_channel_username IS NULL OR p.channel_username = p_channel_username)
+      AND (p_date_from IS NULL OR p.date >= p_date_from)
+      AND (p_date_to IS NULL OR p.date <= p_date_to)
+      AND (p_min_views IS NULL OR p.views >= p_min_views)
+      AND (p_min_engagement IS NULL OR p.engagement_rate >= p_min_engagement)
+      AND (
+          p_search_term IS NULL
+          OR p.search_vector @@ (
+              websearch_to_tsquery('russian'::regconfig, p_search_term) ||
+              websearch_to_tsquery('english'::regconfig, p_search_term)
+          )
+      );
+$$;
+
+-- Поиск с ранжированием и фрагментами текста
+-- search_query - строка в синтаксисе веб-поиска ("точная фраза", -исключение, or)
+CREATE OR REPLACE FUNCTION public.search_posts(
+    search_query TEXT,
+    p_channel_username TEXT DEFAULT NULL,
+    p_limit INTEGER DEFAULT 20,
+    p_offset INTEGER DEFAULT 0
+)
+RETURNS TABLE (
+    id TEXT,
+    message_id BIGINT,
+    channel_username TEXT,
+    channel_title TEXT,
+    date TIMESTAMP WITH TIME ZONE,
+    text_preview TEXT,
+    permalink TEXT,
+    views INTEGER,
+    forwards INTEGER,
+    reactions INTEGER,
+    viral_score NUMERIC,
+    rank REAL,
+    snippet TEXT
+)
+LANGUAGE sql
+STABLE
+AS $$
+    WITH q AS (
+        SELECT websearch_to_tsquery('russian'::regconfig, search_query) ||
+               websearch_to_tsquery('english'::regconfig, search_query) AS ts
+    ),
+    matches AS (
+        SELECT p.*, ts_rank_cd(p.search_vector, q.ts) AS rank, q.ts
+        FROM public.posts p, q
+        WHERE p.search_vector @@ q.ts
+          AND (p_channel_username IS NULL OR p.channel_username = p_channel_username)
+        ORDER BY rank DESC, p.date DESC
+        LIMIT p_limit OFFSET p_offset
+    )
+    -- ts_headline считается только для строк страницы
+    SELECT m.id, m.message_id, m.channel_username, m.channel_title, m.date,
+           m.text_preview, m.permalink, m.views, m.forwards, m.reactions, m.viral_score,
+           m.rank,
+           ts_headline(
+               'russian'::regconfig, COALESCE(m.full_text, m.text_preview, ''), m.ts,
+               'StartSel=<mark>, StopSel=</mark>, MaxWords=35, MinWords=15, MaxFragments=2'
+           ) AS snippet
+    FROM matches m
+    ORDER BY m.rank DESC, m.date DESC;
+$$;
+
+-- Дневные агрегаты по каналам
+-- Пересчет дней: channel_usernames[i] и days[i] задают один день канала.
+-- Посты пишутся параллельными пачками, и соседние пачки канала попадают в
+-- один день, поэтому дни блокируются advisory-блокировками в фиксированном
+-- порядке: пересчеты одного дня идут по очереди, и следующий видит строки
+-- предыдущего. Строки обновляются через ON CONFLICT, а не DELETE + INSERT
+CREATE OR REPLACE FUNCTION public.refresh_channel_daily_stats(channel_usernames TEXT[], days DATE[])
+RETURNS VOID
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+BEGIN
+    PERFORM pg_advisory_xact_lock(hashtext(b.channel_username), b.day - DATE '2000-01-01')
+    FROM (
+        SELECT DISTINCT * FROM unnest(channel_usernames, days) AS u(channel_username, day)
+        ORDER BY 1, 2
+    ) b;
+
+    INSERT INTO channel_daily_stats (
+        channel_username, day, posts_count, total_views, total_reactions, total_forwards,
+        total_replies, avg_engagement_rate, median_engagement_rate, p90_engagement_rate,
+        max_viral_score, viral_count, updated_at
+    )
+    SELECT b.channel_username, b.day, COUNT(*),
+           COALESCE(SUM(p.views), 0), COALESCE(SUM(p.reactions), 0),
+           COALESCE(SUM(p.forwards), 0), COALESCE(SUM(p.replies), 0),
+           AVG(p.engagement_rate),
+           percentile_cont(0.5) WITHIN GROUP (ORDER BY p.engagement_rate),
+           percentile_cont(0.9) WITHIN GROUP (ORDER BY p.engagement_rate),
+           MAX(p.viral_score),
+           COUNT(*) FILTER (WHERE p.viral_score >= 1.0),
+           NOW()
+    FROM (SELECT DISTINCT * FROM unnest(channel_usernames, days) AS u(channel_username, day)) b
+    JOIN posts p
+      ON p.channel_username = b.channel_username
+     AND p.date >= (b.day::timestamp AT TIME ZONE 'UTC')
+     AND p.date < ((b.day + 1)::timestamp AT TIME ZONE 'UTC')
+    GROUP BY b.channel_username, b.day
+    ON CONFLICT (channel_username, day) DO UPDATE SET
+        posts_count = EXCLUDED.posts_count,
+        total_views = EXCLUDED.total_views,
+        total_reactions = EXCLUDED.total_reactions,
+        total_forwards = EXCLUDED.total_forwards,
+        total_replies = EXCLUDED.total_replies,
+        avg_engagement_rate = EXCLUDED.avg_engagement_rate,
+        median_engagement_rate = EXCLUDED.median_engagement_rate,
+        p90_engagement_rate = EXCLUDED.p90_engagement_rate,
+        max_viral_score = EXCLUDED.max_viral_score,
+        viral_count = EXCLUDED.viral_count,
+        updated_at = EXCLUDED.updated_at;
+
+    -- Дни, в которых не осталось постов
+    DELETE FROM channel_daily_stats s
+    USING unnest(channel_usernames, days) AS b(channel_username, day)
+    WHERE s.channel_username = b.channel_username AND s.day = b.day
+      AND NOT EXISTS (
+          SELECT 1 FROM posts p
+          WHERE p.channel_username = b.channel_username
+            AND p.date >= (b.day::timestamp AT TIME ZONE 'UTC')
+            AND p.date < ((b.day + 1)::timestamp AT TIME ZONE 'UTC')
+      );
+END;
+$$;
+
+-- Дневной ряд по всем каналам: суммы за день, средний engagement
+-- взвешивается по количеству постов (агрегация в БД, без лимита строк API)
+CREATE OR REPLACE FUNCTION public.get_daily_stats_totals(p_date_from DATE, p_date_to DATE)
+RETURNS TABLE (
+    day DATE,
+    channels BIGINT,
+    posts_count BIGINT,
+    total_views BIGINT,
+    total_reactions BIGINT,
+    total_forwards BIGINT,
+    total_replies BIGINT,
+    viral_count BIGINT,
+    max_viral_score NUMERIC,
+    avg_engagement_rate NUMERIC
+)
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT s.day,
+           COUNT(*),
+           SUM(s.posts_count),
+           SUM(s.total_views),
+           SUM(s.total_reactions),
+           SUM(s.total_forwards),
+           SUM(s.total_replies),
+           SUM(s.viral_count),
+           MAX(s.max_viral_score),
+           SUM(s.avg_engagement_rate * s.posts_count)
+               / NULLIF(SUM(s.posts_count) FILTER (WHERE s.avg_engagement_rate IS NOT NULL), 0)
+    FROM public.channel_daily_stats s
+    WHERE s.day >= p_date_from AND s.day <= p_date_to
+    GROUP BY s.day
+    ORDER BY s.day;
+$$;
+
+-- Итоги одного канала по дневным агрегатам (одна строка вместо суммирования
+-- всех дней на клиенте)
+CREATE OR REPLACE FUNCTION public.get_channel_stats_totals(p_channel_username TEXT)
+RETURNS TABLE (
+    total_posts BIGINT,
+    total_views BIGINT,
+    total_reactions BIGINT,
+    total_forwards BIGINT
+)
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT COALESCE(SUM(s.posts_count), 0),
+           COALESCE(SUM(s.total_views), 0),
+           COALESCE(SUM(s.total_reactions), 0),
+           COALESCE(SUM(s.total_forwards), 0)
+    FROM public.channel_daily_stats s
+    WHERE s.channel_username = p_channel_username;
+$$;
+
+CREATE OR REPLACE FUNCTION public.channel_daily_stats_apply()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+    v_channels TEXT[];
+    v_days DATE[];
+BEGIN
+    IF TG_OP = 'TRUNCATE' THEN
+        DELETE FROM channel_daily_stats;
+        RETURN NULL;
+    ELSIF TG_OP = 'INSERT' THEN
+        SELECT array_agg(channel_username), array_agg(day) INTO v_channels, v_days
+        FROM (SELECT DISTINCT channel_username, (date AT TIME ZONE 'UTC')::date AS day FROM new_rows) b;
+    ELSIF TG_OP = 'DELETE' THEN
+        SELECT array_agg(channel_username), array_agg(day) INTO v_channels, v_days
+        FROM (SELECT DISTINCT channel_username, (date AT TIME ZONE 'UTC')::date AS day FROM old_rows) b;
+    ELSE
+        SELECT array_agg(channel_username), array_agg(day) INTO v_channels, v_days
+        FROM (
+            SELECT channel_username, (date AT TIME ZONE 'UTC')::date AS day FROM new_rows
+            UNION
+            SELECT channel_username, (date AT TIME ZONE 'UTC')::date AS day FROM old_rows
+        ) b;
+    END IF;
+
+    IF v_channels IS NOT NULL THEN
+        PERFORM refresh_channel_daily_stats(v_channels, v_days);
+    END IF;
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS channel_daily_stats_insert ON public.posts;
+CREATE TRIGGER channel_daily_stats_insert
+    AFTER INSERT ON public.posts
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION public.channel_daily_stats_apply();
+
+DROP TRIGGER IF EXISTS channel_daily_stats_update ON public.posts;
+CREATE TRIGGER channel_daily_stats_update
+    AFTER UPDATE ON public.posts
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION public.channel_daily_stats_apply();
+
+DROP TRIGGER IF EXISTS channel_daily_stats_delete ON public.posts;
+CREATE TRIGGER channel_daily_stats_delete
+    AFTER DELETE ON public.posts
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION public.channel_daily_stats_apply();
+
+DROP TRIGGER IF EXISTS channel_daily_stats_truncate ON public.posts;
+CREATE TRIGGER channel_daily_stats_truncate
+    AFTER TRUNCATE ON public.posts
+    FOR EACH STATEMENT EXECUTE FUNCTION public.channel_daily_stats_apply();
+
+-- Агрегаты анализа для виджета состояния системы
+CREATE OR REPLACE FUNCTION public.get_analysis_health_stats(p_since TIMESTAMP WITH TIME ZONE)
+RETURNS TABLE (
+    llm_requests BIGINT,
+    analyses_count BIGINT,
+    failed_count BIGINT,
+    avg_processing_time NUMERIC
+)
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT
+        (SELECT COUNT(*) FROM public.token_usage t WHERE t.created_at >= p_since),
+        COUNT(*),
+        COUNT(*) FILTER (WHERE a.status = 'failed'),
+        AVG(a.processing_time_seconds)
+    FROM public.post_analysis a
+    WHERE a.created_at >= p_since;
+$$;
+
 -- Grant necessary permissions
 GRANT USAGE ON SCHEMA public TO anon, authenticated;
 GRANT ALL ON ALL TABLES IN SCHEMA public TO anon, authenticated;
 GRANT ALL ON ALL SEQUENCES IN SCHEMA public TO anon, authenticated;
+GRANT EXECUTE ON ALL FUNCTIONS IN SCHEMA public TO anon, authenticated;
@@ -0,0 +1,49 @@
+"""
+Тесты для фильтра Блума.
+"""
+
+import unittest
+import os
+import sys
+
+# Добавляем родительскую директорию в sys.path для импорта модулей приложения
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.app.bloom_filter import BloomFilter
+
+
+class TestBloomFilter(unittest.TestCase):
+    """Тесты для класса BloomFilter."""
+
+    def test_no_false_negatives(self):
+        """Все добавленные элементы находятся в фильтре."""
+        bloom = BloomFilter(capacity=1000, error_rate=0.01)
+        items = [f"{message_id}_@channel" for message_id in range(1000)]
+        bloom.update(items)
+
+        for item in items:
+            self.assertIn(item, bloom)
+        self.assertEqual(len(bloom), 1000)
+
+    def test_false_positive_rate(self):
+        """Доля ложноположительных ответов близка к заданной."""
+        bloom = BloomFilter(capacity=1000, error_rate=0.01)
+        bloom.update(f"{message_id}_@channel" for message_id in range(1000))
+
+        false_positives = sum(
+            1 for message_id in range(1000, 11000) if f"{message_id}_@channel" in bloom
+        )
+        self.assertLess(false_positives / 10000, 0.03)
+
+    def test_clear(self):
+        """После очистки фильтр пуст."""
+        bloom = BloomFilter(capacity=10)
+        bloom.add("1_@channel")
+        bloom.clear()
+
+        self.assertNotIn("1_@channel", bloom)
+        self.assertEqual(len(bloom), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
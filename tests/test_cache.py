@@ -0,0 +1,87 @@
+"""
+Тесты для TTL кэша.
+"""
+
+import unittest
+import os
+import sys
+from unittest import mock
+
+# Добавляем родительскую директорию в sys.path для импорта модулей приложения
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.app.cache import TTLCache
+
+
+class TestTTLCache(unittest.TestCase):
+    """Тесты для класса TTLCache."""
+
+    def setUp(self):
+        """Подготовка к тестированию."""
+        self.now = 1000.0
+        patcher = mock.patch(
+            "src.app.cache.time.monotonic", side_effect=lambda: self.now
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_get_set(self):
+        """Сохраненное значение доступно до истечения TTL."""
+        cache = TTLCache(ttl_seconds=10)
+        cache.set("dnevteh", {"id": 1})
+
+        self.assertEqual(cache.get("dnevteh"), {"id": 1})
+        self.assertIn("dnevteh", cache)
+        self.assertIsNone(cache.get("unknown"))
+
+    def test_expiration(self):
+        """Значение устаревает по истечении TTL."""
+        cache = TTLCache(ttl_seconds=10)
+        cache.set("dnevteh", 1)
+
+        self.now += 9
+        self.assertEqual(cache.get("dnevteh"), 1)
+
+        self.now += 1
+        self.assertIsNone(cache.get("dnevteh"))
+        self.assertEqual(len(cache), 0)
+
+    def test_per_entry_ttl(self):
+        """TTL записи переопределяет TTL кэша, нулевой TTL не сохраняет значение."""
+        cache = TTLCache(ttl_seconds=10)
+        cache.set("short", 1, ttl_seconds=2)
+        cache.set("skip", 2, ttl_seconds=0)
+
+        self.assertNotIn("skip", cache)
+        self.now += 3
+        self.assertNotIn("short", cache)
+
+    def test_invalidate(self):
+        """Явная инвалидация удаляет запись."""
+        cache = TTLCache(ttl_seconds=10)
+        cache.set("a", 1)
+        cache.set("b", 2)
+
+        cache.invalidate("a")
+        cache.invalidate("missing")
+        self.assertNotIn("a", cache)
+        self.assertEqual(cache.get("b"), 2)
+
+        cache.clear()
+        self.assertEqual(len(cache), 0)
+
+    def test_max_size(self):
+        """При переполнении вытесняется запись, которая устареет раньше всех."""
+        cache = TTLCache(ttl_seconds=10, max_size=2)
+        cache.set("a", 1)
+        self.now += 1
+        cache.set("b", 2)
+        cache.set("c", 3)
+
+        self.assertNotIn("a", cache)
+        self.assertEqual(cache.get("b"), 2)
+        self.assertEqual(cache.get("c"), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,55 @@
+"""
+Тесты для keyset-пагинации.
+"""
+
+import unittest
+import os
+import sys
+
+# Добавляем родительскую директорию в sys.path для импорта модулей приложения
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.app.pagination import decode_cursor, encode_cursor, keyset_filter
+
+
+class TestPagination(unittest.TestCase):
+    """Тесты для курсоров и условий keyset-пагинации."""
+
+    def test_cursor_roundtrip(self):
+        """Курсор восстанавливает значение сортировки и id."""
+        row = {"id": "42_@channel", "date": "2025-01-01T10:00:00+00:00"}
+        cursor = encode_cursor(row, "date")
+
+        self.assertEqual(
+            decode_cursor(cursor), ("2025-01-01T10:00:00+00:00", "42_@channel")
+        )
+
+    def test_invalid_cursor(self):
+        """Поврежденный курсор вызывает ValueError."""
+        with self.assertRaises(ValueError):
+            decode_cursor("not-a-cursor")
+
+    def test_filter_desc(self):
+        """По убыванию: меньшие значения или то же значение с меньшим id."""
+        self.assertEqual(
+            keyset_filter("views", True, 100, "1_@c"),
+            'views.lt."100",and(views.eq."100",id.lt."1_@c")',
+        )
+
+    def test_filter_asc_includes_nulls(self):
+        """По возрастанию NULL идут последними и остаются в выборке."""
+        self.assertEqual(
+            keyset_filter("views", False, 100, "1_@c"),
+            'views.gt."100",and(views.eq."100",id.gt."1_@c"),views.is.null',
+        )
+
+    def test_filter_null_value(self):
+        """Курсор на NULL по убыванию пропускает к не-NULL значениям."""
+        self.assertEqual(
+            keyset_filter("viral_score", True, None, "1_@c"),
+            'and(viral_score.is.null,id.lt."1_@c"),viral_score.not.is.null',
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,105 @@
+"""
+Проверка, что массовые чтения постов не используют select("*").
+"""
+
+import ast
+import os
+import sys
+import unittest
+
+# Добавляем родительскую директорию в sys.path для импорта модулей приложения
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT_DIR)
+
+# Функции, которые читают много строк posts: {файл: [функции]}
+HOT_PATHS = {
+    "src/app/channel_baseline_analyzer.py": ["_get_channel_posts_history"],
+    "src/app/supabase_client.py": [
+        "get_recent_posts",
+        "get_viral_posts",
+        "get_posts_page",
+    ],
+    "src/api_main.py": [
+        "get_posts",
+        "calculate_viral_batch",
+        "calculate_viral_all_posts",
+        "calculate_viral_metrics_batch",
+    ],
+}
+
+
+def find_wide_selects(path, function_names):
+    """Возвращает (функция, строка) для каждого select("*") в функциях."""
+    with open(os.path.join(ROOT_DIR, path), encoding="utf-8") as f:
+        tree = ast.parse(f.read())
+
+    found = []
+    for node in ast.walk(tree):
+        if not isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            continue
+        if node.name not in function_names:
+            continue
+        for call in ast.walk(node):
+            if (
+                isinstance(call, ast.Call)
+                and isinstance(call.func, ast.Attribute)
+                and call.func.attr == "select"
+                and call.args
+                and isinstance(call.args[0], ast.Constant)
+                and call.args[0].value == "*"
+            ):
+                found.append((node.name, call.lineno))
+    return found
+
+
+def load_post_column_profiles():
+    """Читает словарь SupabaseClient.POST_COLUMN_PROFILES из исходника."""
+    with open(
+        os.path.join(ROOT_DIR, "src/app/supabase_client.py"), encoding="utf-8"
+    ) as f:
+        tree = ast.parse(f.read())
+
+    for node in ast.walk(tree):
+        if (
+            isinstance(node, ast.AnnAssign)
+            and isinstance(node.target, ast.Name)
+            and node.target.id == "POST_COLUMN_PROFILES"
+        ):
+            return ast.literal_eval(node.value)
+    raise AssertionError("POST_COLUMN_PROFILES не найден")
+
+
+class TestSelectProfiles(unittest.TestCase):
+    """Массовые чтения берут колонки из профилей SupabaseClient."""
+
+    def test_hot_paths_have_no_wide_selects(self):
+        """В функциях из HOT_PATHS нет select("*")."""
+        for path, function_names in HOT_PATHS.items():
+            with self.subTest(path=path):
+                self.assertEqual(find_wide_selects(path, function_names), [])
+
+    def test_profiles_exclude_search_vector(self):
+        """Профили перечисляют колонки явно и не тянут search_vector."""
+        for profile, columns in load_post_column_profiles().items():
+            with self.subTest(profile=profile):
+                names = [column.strip() for column in columns.split(",")]
+                self.assertNotIn("*", names)
+                self.assertNotIn("search_vector", names)
+
+    def test_hot_paths_exist(self):
+        """Все функции из HOT_PATHS существуют (список не устарел)."""
+        for path, function_names in HOT_PATHS.items():
+            with open(os.path.join(ROOT_DIR, path), encoding="utf-8") as f:
+                tree = ast.parse(f.read())
+            defined = {
+                node.name
+                for node in ast.walk(tree)
+                if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef))
+            }
+            for name in function_names:
+                with self.subTest(path=path, function=name):
+                    self.assertIn(name, defined)
+
+
+if __name__ == "__main__":
+    unittest.main()
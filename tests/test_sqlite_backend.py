@@ -0,0 +1,258 @@
+"""
+Тесты для встроенного хранилища SQLite.
+"""
+
+import unittest
+import os
+import sys
+
+# Добавляем родительскую директорию в sys.path для импорта модулей приложения
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.app.pagination import apply_keyset, encode_cursor
+from src.app.sqlite_backend import SQLiteDatabase
+
+
+def make_post(message_id, channel="@channel", views=100, text="Пост"):
+    return {
+        "id": f"{message_id}_{channel}",
+        "message_id": message_id,
+        "channel_username": channel,
+        "date": f"2025-01-{message_id:02d}T10:00:00+00:00",
+        "full_text": text,
+        "views": views,
+        "forwards": 1,
+        "reactions": 2,
+        "has_media": False,
+        "raw_data": {"message_id": message_id},
+    }
+
+
+class TestSQLiteBackend(unittest.TestCase):
+    """Тесты для SQLiteDatabase."""
+
+    def setUp(self):
+        self.db = SQLiteDatabase(":memory:")
+        self.db.table("channels").insert({"username": "@channel"}).execute()
+        self.db.table("posts").upsert(
+            [make_post(i, views=i * 10) for i in range(1, 6)], on_conflict="id"
+        ).execute()
+
+    def tearDown(self):
+        self.db.close()
+
+    def test_upsert_updates_existing_rows(self):
+        """Повторный upsert обновляет строку, а не дублирует ее."""
+        self.db.table("posts").upsert(
+            make_post(1, views=999), on_conflict="id"
+        ).execute()
+
+        result = (
+            self.db.table("posts")
+            .select("views", count="exact")
+            .eq("message_id", 1)
+            .execute()
+        )
+        self.assertEqual(result.count, 1)
+        self.assertEqual(result.data, [{"views": 999}])
+
+    def test_types_roundtrip(self):
+        """JSONB и BOOLEAN возвращаются как объекты Python."""
+        row = (
+            self.db.table("posts").select("*").eq("id", "1_@channel").execute().data[0]
+        )
+
+        self.assertEqual(row["raw_data"], {"message_id": 1})
+        self.assertIs(row["has_media"], False)
+        self.assertIsNotNone(row["created_at"])
+
+    def test_keyset_pages_cover_table(self):
+        """Страницы по курсору проходят все строки без повторов."""
+        seen, cursor = [], None
+        while True:
+            query = self.db.table("posts").select("id, date")
+            page = apply_keyset(query, "date", True, cursor).limit(2).execute().data
+            seen.extend(row["id"] for row in page)
+            if len(page) < 2:
+                break
+            cursor = encode_cursor(page[-1], "date")
+
+        self.assertEqual(seen, [f"{i}_@channel" for i in range(5, 0, -1)])
+
+    def test_filters(self):
+        """Фильтры gte/in_/ilike и or_ в синтаксисе PostgREST."""
+        self.db.table("posts").update({"full_text": "Большой ПОСТ"}).eq(
+            "message_id", 2
+        ).execute()
+
+        self.assertEqual(
+            len(self.db.table("posts").select("id").gte("views", 30).execute().data), 3
+        )
+        self.assertEqual(
+            len(
+                self.db.table("posts")
+                .select("id")
+                .in_("message_id", [1, 2])
+                .execute()
+                .data
+            ),
+            2,
+        )
+        found = (
+            self.db.table("posts")
+            .select("id")
+            .ilike("full_text", "%большой%")
+            .execute()
+        )
+        self.assertEqual([row["id"] for row in found.data], ["2_@channel"])
+        found = (
+            self.db.table("posts")
+            .select("id")
+            .or_("views.lt.20,message_id.eq.5")
+            .execute()
+        )
+        self.assertEqual(len(found.data), 2)
+
+    def test_rpc_functions(self):
+        """RPC подсчета постов, статистики и пакетной записи виральности."""
+        counts = self.db.rpc(
+            "count_posts_by_channel", {"channel_usernames": None}
+        ).execute()
+        self.assertEqual(
+            counts.data, [{"channel_username": "@channel", "posts_count": 5}]
+        )
+
+        stats = self.db.rpc("get_posts_stats", {"p_min_views": 30}).execute().data[0]
+        self.assertEqual(stats["total_posts"], 3)
+        self.assertEqual(stats["total_views"], 120)
+
+        updated = self.db.rpc(
+            "bulk_update_post_viral_metrics",
+            {"updates": [{"id": "1_@channel", "viral_score": 2.5}, {"id": "missing"}]},
+        ).execute()
+        self.assertEqual(updated.data, [{"post_id": "1_@channel"}])
+
+    def test_channel_daily_stats_view(self):
+        """Дневные агрегаты по каналу считаются по постам."""
+        self.db.table("posts").update({"date": "2025-01-01T20:00:00+00:00"}).eq(
+            "message_id", 2
+        ).execute()
+
+        rows = (
+            self.db.table("channel_daily_stats")
+            .select("*")
+            .eq("day", "2025-01-01")
+            .execute()
+            .data
+        )
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]["posts_count"], 2)
+        self.assertEqual(rows[0]["total_views"], 30)
+
+    def test_search_term_filter(self):
+        """Фильтр search_vector (wfts) в or_ и в статистике ищет по словам."""
+        self.db.table("posts").update({"full_text": "Рост продаж, в марте"}).eq(
+            "message_id", 3
+        ).execute()
+
+        found = (
+            self.db.table("posts")
+            .select("id")
+            .or_(
+                'search_vector.wfts(russian)."рост, марте",search_vector.wfts(english)."рост, марте"'
+            )
+            .execute()
+        )
+        self.assertEqual([row["id"] for row in found.data], ["3_@channel"])
+        stats = self.db.rpc("get_posts_stats", {"p_search_term": "продаж"}).execute()
+        self.assertEqual(stats.data[0]["total_posts"], 1)
+
+    def test_daily_stats_totals(self):
+        """Дневной ряд по всем каналам суммируется в RPC."""
+        self.db.table("channels").insert({"username": "@other"}).execute()
+        self.db.table("posts").insert(make_post(1, channel="@other", views=5)).execute()
+
+        rows = (
+            self.db.rpc(
+                "get_daily_stats_totals",
+                {"p_date_from": "2025-01-01", "p_date_to": "2025-01-02"},
+            )
+            .execute()
+            .data
+        )
+        self.assertEqual([row["day"] for row in rows], ["2025-01-01", "2025-01-02"])
+        self.assertEqual(rows[0]["channels"], 2)
+        self.assertEqual(rows[0]["total_views"], 15)
+
+    def test_channel_stats_totals(self):
+        """Итоги канала суммируются по его дневным агрегатам в RPC."""
+        self.db.table("channels").insert({"username": "@other"}).execute()
+        self.db.table("posts").insert(make_post(1, channel="@other", views=5)).execute()
+
+        totals = (
+            self.db.rpc("get_channel_stats_totals", {"p_channel_username": "@channel"})
+            .execute()
+            .data[0]
+        )
+        self.assertEqual(totals["total_posts"], 5)
+        self.assertEqual(totals["total_views"], 150)
+
+        missing = (
+            self.db.rpc("get_channel_stats_totals", {"p_channel_username": "@missing"})
+            .execute()
+            .data[0]
+        )
+        self.assertEqual(missing["total_posts"], 0)
+
+    def test_search_posts(self):
+        """Поиск находит посты по всем словам и выделяет совпадения."""
+        self.db.table("posts").update({"full_text": "Рост продаж в марте"}).eq(
+            "message_id", 3
+        ).execute()
+
+        found = self.db.rpc("search_posts", {"search_query": "рост МАРТЕ"}).execute()
+        self.assertEqual([post["id"] for post in found.data], ["3_@channel"])
+        self.assertIn("<mark>Рост</mark>", found.data[0]["snippet"])
+
+    def test_head_count_and_analysis_stats(self):
+        """head=True возвращает только количество; агрегаты анализа одним RPC."""
+        result = self.db.table("posts").select("id", count="exact", head=True).execute()
+        self.assertEqual((result.data, result.count), ([], 5))
+
+        self.db.table("post_analysis").insert(
+            [
+                {
+                    "post_id": "1_@channel",
+                    "status": "completed",
+                    "processing_time_seconds": 2,
+                },
+                {
+                    "post_id": "2_@channel",
+                    "status": "failed",
+                    "processing_time_seconds": 4,
+                },
+            ]
+        ).execute()
+        stats = (
+            self.db.rpc("get_analysis_health_stats", {"p_since": "2000-01-01"})
+            .execute()
+            .data[0]
+        )
+        self.assertEqual(stats["analyses_count"], 2)
+        self.assertEqual(stats["failed_count"], 1)
+        self.assertEqual(stats["avg_processing_time"], 3)
+
+    def test_totals_view(self):
+        """posts_totals отражает текущее содержимое posts."""
+        totals = self.db.table("posts_totals").select("*").execute().data[0]
+
+        self.assertEqual(totals["total_posts"], 5)
+        self.assertEqual(totals["total_views"], 150)
+
+        self.db.table("posts").delete().eq("message_id", 5).execute()
+        totals = self.db.table("posts_totals").select("*").execute().data[0]
+        self.assertEqual(totals["total_posts"], 4)
+
+
+if __name__ == "__main__":
+    unittest.main()